@@ -8,13 +8,14 @@ corresponding function defined immediately below. This allows reusing the code i
 
 import logging
 import multiprocessing as mp
+import pathlib
 import threading
 
 import click
 
-from stellarisdashboard import config
+from stellarisdashboard import config, datamodel, export
 
-from stellarisdashboard.dashboard_app import visualization_data
+from stellarisdashboard.dashboard_app import live_updates, visualization_data
 from stellarisdashboard.parsing import save_parser, timeline
 
 logger = logging.getLogger(__name__)
@@ -36,6 +37,17 @@ showeverything_help_string = (
 threads_help_string = (
     "The number of threads that run in parallel when reading save games."
 )
+export_format_help_string = (
+    "The file format of the exported tables. Parquet requires the pyarrow package."
+)
+output_path_help_string = (
+    "The folder where the exported tables are written, one subfolder per game. "
+    "Defaults to the export folder in the dashboard's output path."
+)
+processors_help_string = (
+    "Comma-separated list of the data processors to run again, e.g. "
+    '"--processors pop_stats,internal_market". Only the rows written by these processors are replaced.'
+)
 
 
 @click.group()
@@ -70,6 +82,12 @@ def f_monitor_saves(save_path=None, stop_event: threading.Event = None):
     save_reader.mark_all_existing_saves_processed()
 
     show_wait_message = True
+    # games with new saves, whose old saves are thinned out once no new saves are waiting
+    games_to_compact = set()
+    # The compaction runs on a worker thread, as deleting the rows of many gamestates may take a while. Saves
+    # of other games are processed in the meantime, those of the same game wait for its database lock.
+    # Interrupting the compaction at shutdown is safe, as each step is a transaction.
+    compaction_thread = None
     while not stop_event.is_set():
         nothing_new = True
         for (
@@ -86,7 +104,24 @@ def f_monitor_saves(save_path=None, stop_event: threading.Event = None):
             tle = timeline.TimelineExtractor()
             tle.process_gamestate(game_name, gamestate_dict)
             visualization_data.get_current_execution_plot_data(game_name)
+            if tle.number_of_parsed_saves:
+                live_updates.publish_new_gamestate(
+                    game_name, datamodel.date_to_days(gamestate_dict["date"])
+                )
+            games_to_compact.add(game_name)
             del gamestate_dict
+        compaction_running = (
+            compaction_thread is not None and compaction_thread.is_alive()
+        )
+        if nothing_new and games_to_compact and not compaction_running:
+            game_name = games_to_compact.pop()
+            compaction_thread = threading.Thread(
+                target=_compact_and_maintain_game,
+                args=(game_name,),
+                name=f"compaction-{game_name}",
+                daemon=True,
+            )
+            compaction_thread.start()
         if nothing_new:
             if show_wait_message:
                 show_wait_message = False
@@ -94,6 +129,29 @@ def f_monitor_saves(save_path=None, stop_event: threading.Event = None):
             stop_event.wait(polling_interval)
 
 
+def f_compact_game(game_name: str) -> None:
+    """Apply the retention settings to the saved data of the game."""
+    try:
+        datamodel.apply_retention_policy(game_name)
+    except Exception:
+        logger.exception(f"Failed to apply retention settings to game {game_name}")
+
+
+def _compact_and_maintain_game(game_name: str) -> None:
+    f_compact_game(game_name)
+    f_maintain_game(game_name)
+
+
+def f_maintain_game(
+    game_name: str, analyze: bool = False, enable_vacuum: bool = False
+) -> None:
+    """Update the query planner statistics of the game DB and checkpoint its WAL."""
+    try:
+        datamodel.maintain_db(game_name, analyze=analyze, enable_vacuum=enable_vacuum)
+    except Exception:
+        logger.exception(f"Failed to run database maintenance for game {game_name}")
+
+
 @cli.command()
 @click.option("--threads", type=click.INT, help=threads_help_string)
 @click.option(
@@ -119,6 +177,7 @@ def f_parse_saves(threads=None, save_path=None, game_name_prefix="") -> None:
         save_path,
         game_name_prefix=game_name_prefix,
     )
+    imported_games = set()
     for (
         game_name,
         gamestate_dict,
@@ -127,7 +186,110 @@ def f_parse_saves(threads=None, save_path=None, game_name_prefix="") -> None:
             continue
         tle = timeline.TimelineExtractor()
         tle.process_gamestate(game_name, gamestate_dict)
+        imported_games.add(game_name)
+        del gamestate_dict
+    for game_name in sorted(imported_games):
+        f_maintain_game(game_name, analyze=True)
+
+
+@cli.command()
+@click.option(
+    "--processors", type=click.STRING, help=processors_help_string, required=True
+)
+@click.option("--threads", type=click.INT, help=threads_help_string)
+@click.option(
+    "--save-path",
+    type=click.Path(exists=True, file_okay=False),
+    help=save_path_help_string,
+)
+@click.option("--game-name", type=click.STRING, help=game_name_help_string, default="")
+def reprocess(processors, threads, save_path, game_name):
+    """
+    Re-run selected data processors for saves that are already in the DB.
+    """
+    processor_ids = [p.strip() for p in processors.split(",") if p.strip()]
+    try:
+        timeline.TimelineExtractor.check_reprocessable(processor_ids)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--processors")
+    f_reprocess(processor_ids, threads, save_path, game_name_prefix=game_name)
+
+
+def f_reprocess(
+    processor_ids, threads=None, save_path=None, game_name_prefix=""
+) -> None:
+    if threads is not None:
+        config.CONFIG.threads = threads
+    if save_path is None:
+        save_path = config.CONFIG.save_file_path
+    # saves are parsed in parallel, the database is written by one process at a time
+    save_reader = save_parser.BatchSavePathMonitor(
+        save_path,
+        game_name_prefix=game_name_prefix,
+    )
+    reprocessed_games = set()
+    for (
+        game_name,
+        gamestate_dict,
+    ) in save_reader.get_gamestates_and_check_for_new_files():
+        if gamestate_dict is None:
+            continue
+        tle = timeline.TimelineExtractor()
+        tle.reprocess_gamestate(game_name, gamestate_dict, processor_ids)
+        reprocessed_games.add(game_name)
         del gamestate_dict
+    for game_name in sorted(reprocessed_games):
+        f_maintain_game(game_name, analyze=True)
+
+
+@cli.command()
+@click.option("--game-name", type=click.STRING, help=game_name_help_string, default="")
+def maintain(game_name):
+    """
+    Update the query statistics and checkpoint the write-ahead log of the game DBs. Databases of older
+    versions are vacuumed once, such that they shrink when old gamestates are removed.
+    """
+    f_maintain(game_name_prefix=game_name)
+
+
+def f_maintain(game_name_prefix="") -> None:
+    for game_name in datamodel.get_known_games(game_name_prefix):
+        logger.info(f"Running database maintenance for game {game_name}")
+        f_maintain_game(game_name, analyze=True, enable_vacuum=True)
+
+
+@cli.command(name="export")
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(export.FORMATS),
+    default="csv",
+    help=export_format_help_string,
+)
+@click.option("--game-name", type=click.STRING, help=game_name_help_string, default="")
+@click.option(
+    "--output-path",
+    type=click.Path(file_okay=False),
+    help=output_path_help_string,
+)
+def export_games(export_format, game_name, output_path):
+    """
+    Export the database tables of the games for analysis with other tools.
+    """
+    try:
+        f_export(export_format, game_name_prefix=game_name, output_path=output_path)
+    except ImportError as e:
+        raise click.UsageError(str(e))
+
+
+def f_export(export_format="csv", game_name_prefix="", output_path=None) -> None:
+    if output_path is None:
+        output_path = config.CONFIG.base_output_path / "export"
+    for game_name in datamodel.get_known_games(game_name_prefix):
+        files = export.export_game(
+            game_name, pathlib.Path(output_path) / game_name, export_format
+        )
+        logger.info(f"Exported {len(files)} tables of game {game_name}")
 
 
 if __name__ == "__main__":
@@ -186,6 +186,10 @@ DEFAULT_MARKET_RESOURCES = [
 ]
 DEFAULT_MARKET_FEE = [{"date": "2200.01.01", "fee": 0.3}]
 
+# The production server has a few threads for regular requests and one for each open live update stream
+LIVE_UPDATE_MAX_SUBSCRIBERS = 16
+SERVER_THREADS = 4 + LIVE_UPDATE_MAX_SUBSCRIBERS
+
 
 DEFAULT_SETTINGS = dict(
     save_file_path=_get_default_save_path(),
@@ -207,8 +211,11 @@ DEFAULT_SETTINGS = dict(
     show_all_country_types=False,
     save_name_filter="",
     plot_time_resolution=500,
+    plot_data_cache_size=256,
     read_all_countries=False,
     skip_saves=0,
+    retention_full_resolution_years=0,
+    retention_saves_per_year=1,
     log_to_file=False,
     plot_width=1150,
     plot_height=640,
@@ -250,6 +257,9 @@ class Config:
     save_name_filter: str = None
     skip_saves: int = None
     plot_time_resolution: int = None
+    plot_data_cache_size: int = None
+    retention_full_resolution_years: int = None
+    retention_saves_per_year: int = None
 
     log_to_file: bool = False
     debug_mode: bool = False
@@ -260,6 +270,9 @@ class Config:
 
     production: bool = False
 
+    # incremented whenever a setting changes, e.g. to invalidate cached figures
+    settings_version: int = 0
+
     EXISTING_PATH_KEYS = {
         # these paths should already exist
         # if not, the setting is reset to default
@@ -285,7 +298,10 @@ class Config:
     INT_KEYS = {
         "port",
         "plot_time_resolution",
+        "plot_data_cache_size",
         "skip_saves",
+        "retention_full_resolution_years",
+        "retention_saves_per_year",
         "threads",
         "plot_width",
         "plot_height",
@@ -326,6 +342,7 @@ class Config:
 
             self.__setattr__(key, val)
             if val != old_val:
+                self.settings_version += 1
                 logger.info(
                     f"Updated setting {key.ljust(28)} {str(old_val).rjust(8)} -> {str(val).ljust(8)}"
                 )
@@ -0,0 +1,357 @@
+"""
+Columnar copy of the numeric CountryData columns of each game, stored next to the game's database.
+
+Each column is an append-only binary file in the folder <db_path>/<game_id>.columns/, with one value per
+CountryData row. The rows of each save are appended after the save was committed to the database. The
+per-country line plots read contiguous arrays from these files instead of loading CountryData objects.
+The dashboard keeps the columns of the most recently shown games in memory, and only reads the rows which
+were appended since it last loaded them.
+
+The files are only a cache: meta.json records the number of rows, and the number, highest ID and sum of dates
+of the gamestates at the time of writing. If they no longer match the database, e.g. because gamestates were
+deleted or a save failed to be appended, the files are rebuilt from the database. The files are locked while
+they are read or written, as the save monitor may run in a different process than the dashboard.
+"""
+
+import collections
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import sqlalchemy
+
+from stellarisdashboard import config, datamodel
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify the row, stored as int64
+KEY_COLUMNS = ["date", "country_id"]
+# The attitude is stored as the value of the datamodel.Attitude enum
+ATTITUDE_COLUMN = "attitude_towards_player"
+# All other numeric and boolean columns of CountryData, stored as float64 with NaN for NULL
+VALUE_COLUMNS = [
+    column.name
+    for column in datamodel.CountryData.__table__.columns
+    if not column.primary_key
+    and not column.foreign_keys
+    and column.name not in KEY_COLUMNS
+    and isinstance(
+        column.type, (sqlalchemy.Integer, sqlalchemy.Float, sqlalchemy.Boolean)
+    )
+] + [ATTITUDE_COLUMN]
+
+# The number of games whose columns are kept in memory
+MAX_LOADED_GAMES = 2
+
+# serialize access to the files of each game between the dashboard and the save parser thread, see _locked
+_LOCKS: Dict[str, threading.Lock] = {}
+_LOCKS_LOCK = threading.Lock()
+# The columns which were last loaded for each game, with the generation and number of rows of the files
+_LOADED: "collections.OrderedDict[str, Tuple[str, int, CountryDataColumns]]" = (
+    collections.OrderedDict()
+)
+
+
+class CountryDataColumns:
+    """The columns of all CountryData rows of a game, sorted by date."""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        dates = columns["date"]
+        if np.any(dates[1:] < dates[:-1]):
+            order = np.argsort(dates, kind="stable")
+            columns = {name: values[order] for name, values in columns.items()}
+        self._columns = columns
+
+    def __len__(self):
+        return len(self._columns["date"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def rows_for_date(self, date: int) -> Tuple[int, int]:
+        """Return the start and end index of the rows of the given date."""
+        dates = self._columns["date"]
+        return (
+            int(np.searchsorted(dates, date, side="left")),
+            int(np.searchsorted(dates, date, side="right")),
+        )
+
+    def append(self, columns: Dict[str, np.ndarray]) -> "CountryDataColumns":
+        """Return new columns with the given rows added. These columns are not modified, as they may be in use."""
+        return CountryDataColumns(
+            {
+                name: np.concatenate([values, columns[name]])
+                for name, values in self._columns.items()
+            }
+        )
+
+
+def load(game_id: str) -> Optional[CountryDataColumns]:
+    """Load the columns of the game, rebuilding them from the database if they are outdated."""
+    with datamodel.get_db_session(game_id) as session:
+        fingerprint = _get_fingerprint(session)
+    with _locked(game_id):
+        meta = _read_meta(game_id)
+        if meta is not None and meta["fingerprint"] == fingerprint:
+            return _read_columns(game_id, meta)
+    while True:
+        # Either the files are outdated, or a save was just committed and its rows are about to be appended.
+        # The new files are written from a snapshot of the database, without blocking the save parser.
+        with _read_snapshot(game_id) as session:
+            fingerprint = _get_fingerprint(session)
+            tmp_dir = _write_columns(game_id, session, fingerprint)
+        try:
+            # Holding the write lock of the database waits for the save parser to append its rows, and keeps it
+            # from committing another save until the snapshot is in place.
+            with (
+                datamodel.get_db_session(game_id, write=True) as session,
+                _locked(game_id),
+            ):
+                current_fingerprint = _get_fingerprint(session)
+                meta = _read_meta(game_id)
+                if meta is None or meta["fingerprint"] != current_fingerprint:
+                    if current_fingerprint != fingerprint:
+                        # a save was committed or deleted since the snapshot was taken
+                        continue
+                    logger.info(f"Rebuilding country data columns for game {game_id}")
+                    _replace_columns(game_id, tmp_dir)
+                    meta = _read_meta(game_id)
+                if meta is None:
+                    return None
+                return _read_columns(game_id, meta)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def query(game_id: str, first_date: int, last_date: int) -> CountryDataColumns:
+    """Query the columns of the rows in the given date range from the database, without using the files."""
+    with datamodel.get_db_session(game_id) as session:
+        return CountryDataColumns(
+            _query_columns(
+                session, datamodel.CountryData.date.between(first_date, last_date)
+            )
+        )
+
+
+def append_gamestate(game_id: str, session, gamestate_id: int):
+    """Append the CountryData rows of a newly committed gamestate."""
+    with _locked(game_id):
+        _append_gamestate(game_id, session, gamestate_id)
+
+
+def _append_gamestate(game_id: str, session, gamestate_id: int):
+    fingerprint = _get_fingerprint(session)
+    meta = _read_meta(game_id)
+    previous_fingerprint = _get_fingerprint(session, exclude_gamestate_id=gamestate_id)
+    if meta is None or meta["fingerprint"] != previous_fingerprint:
+        _rebuild(game_id, session, fingerprint)
+        return
+    columns = _query_columns(
+        session, datamodel.CountryData.game_state_id == gamestate_id
+    )
+    column_dir = _get_column_dir(game_id)
+    for name, values in columns.items():
+        with open(column_dir / f"{name}.bin", "r+b") as f:
+            # drop anything that was written after the last complete append
+            f.truncate(meta["num_rows"] * values.itemsize)
+            f.seek(0, os.SEEK_END)
+            values.tofile(f)
+    _write_meta(
+        _get_column_dir(game_id),
+        fingerprint,
+        num_rows=meta["num_rows"] + len(columns["date"]),
+        generation=meta["generation"],
+    )
+
+
+def _read_columns(game_id: str, meta: Dict) -> CountryDataColumns:
+    """Read the columns described by the meta data, reusing the rows which are already in memory."""
+    generation, num_rows, columns = _LOADED.pop(game_id, (None, 0, None))
+    if (
+        columns is None
+        or generation != meta["generation"]
+        or num_rows > meta["num_rows"]
+    ):
+        columns = CountryDataColumns(_read_rows(game_id, 0, meta["num_rows"]))
+    elif num_rows < meta["num_rows"]:
+        columns = columns.append(_read_rows(game_id, num_rows, meta["num_rows"]))
+    _LOADED[game_id] = (meta["generation"], meta["num_rows"], columns)
+    while len(_LOADED) > MAX_LOADED_GAMES:
+        _LOADED.popitem(last=False)
+    return columns
+
+
+def _read_rows(game_id: str, start: int, end: int) -> Dict[str, np.ndarray]:
+    # read into memory instead of memory-mapping, such that the files can be replaced while the arrays are in use
+    column_dir = _get_column_dir(game_id)
+    columns = {}
+    for name in KEY_COLUMNS + VALUE_COLUMNS:
+        dtype = np.dtype(_get_dtype(name))
+        columns[name] = np.fromfile(
+            column_dir / f"{name}.bin",
+            dtype=dtype,
+            count=end - start,
+            offset=start * dtype.itemsize,
+        )
+    return columns
+
+
+def _rebuild(game_id: str, session, fingerprint: List[int]):
+    tmp_dir = _write_columns(game_id, session, fingerprint)
+    try:
+        _replace_columns(game_id, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _write_columns(game_id: str, session, fingerprint: List[int]) -> pathlib.Path:
+    """Write all rows of the database to a new temporary folder next to the column files."""
+    column_dir = _get_column_dir(game_id)
+    column_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = pathlib.Path(
+        tempfile.mkdtemp(prefix=f"{column_dir.name}.", dir=column_dir.parent)
+    )
+    try:
+        columns = _query_columns(session, sqlalchemy.true())
+        for name, values in columns.items():
+            values.tofile(tmp_dir / f"{name}.bin")
+        _write_meta(
+            tmp_dir,
+            fingerprint,
+            num_rows=len(columns["date"]),
+            generation=uuid.uuid4().hex,
+        )
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return tmp_dir
+
+
+def _replace_columns(game_id: str, tmp_dir: pathlib.Path):
+    column_dir = _get_column_dir(game_id)
+    shutil.rmtree(column_dir, ignore_errors=True)
+    os.replace(tmp_dir, column_dir)
+
+
+@contextlib.contextmanager
+def _read_snapshot(game_id: str):
+    """A read session whose queries all see the same state of the database."""
+    with datamodel.get_db_session(game_id) as session:
+        # sqlite3 does not begin a transaction for SELECT statements, so each query would see the latest commit
+        session.connection().exec_driver_sql("BEGIN")
+        yield session
+
+
+@contextlib.contextmanager
+def _locked(game_id: str):
+    """Lock the column files of the game against other threads, and other processes like the CLI."""
+    with _LOCKS_LOCK:
+        lock = _LOCKS.setdefault(game_id, threading.Lock())
+    column_dir = _get_column_dir(game_id)
+    lock_file = column_dir.with_name(f"{column_dir.name}.lock")
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with lock, open(lock_file, "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # gives up after 10 seconds, keep waiting for a rebuild in the other process
+                    pass
+            try:
+                yield
+            finally:
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _query_columns(session, condition) -> Dict[str, np.ndarray]:
+    names = KEY_COLUMNS + VALUE_COLUMNS
+    rows = (
+        session.query(*[getattr(datamodel.CountryData, name) for name in names])
+        .filter(condition)
+        .order_by(datamodel.CountryData.country_data_id)
+        .all()
+    )
+    columns = {}
+    for name, values in zip(names, zip(*rows) if rows else [()] * len(names)):
+        if name == ATTITUDE_COLUMN:
+            values = [
+                (a if a is not None else datamodel.Attitude.unknown).value
+                for a in values
+            ]
+        columns[name] = np.array(values, dtype=_get_dtype(name))
+    return columns
+
+
+def _get_fingerprint(session, exclude_gamestate_id: Optional[int] = None) -> List[int]:
+    """The number, highest ID and sum of dates of the gamestates, optionally leaving out one gamestate."""
+    query = session.query(
+        sqlalchemy.func.count(datamodel.GameState.gamestate_id),
+        sqlalchemy.func.coalesce(
+            sqlalchemy.func.max(datamodel.GameState.gamestate_id), 0
+        ),
+        sqlalchemy.func.coalesce(sqlalchemy.func.sum(datamodel.GameState.date), 0),
+    )
+    if exclude_gamestate_id is not None:
+        query = query.filter(datamodel.GameState.gamestate_id != exclude_gamestate_id)
+    return list(query.one())
+
+
+def _get_dtype(name: str):
+    return np.int64 if name in KEY_COLUMNS else np.float64
+
+
+def _get_column_dir(game_id: str) -> pathlib.Path:
+    return config.CONFIG.db_path / f"{game_id}.columns"
+
+
+def _read_meta(game_id: str) -> Optional[Dict]:
+    try:
+        with open(_get_column_dir(game_id) / "meta.json", "r") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("columns") != KEY_COLUMNS + VALUE_COLUMNS or "generation" not in meta:
+        # the CountryData model or the file format has changed
+        return None
+    return meta
+
+
+def _write_meta(
+    column_dir: pathlib.Path, fingerprint: List[int], num_rows: int, generation: str
+):
+    meta_file = column_dir / "meta.json"
+    tmp_file = column_dir / "meta.json.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(
+            dict(
+                columns=KEY_COLUMNS + VALUE_COLUMNS,
+                fingerprint=fingerprint,
+                num_rows=num_rows,
+                # identifies the files of a rebuild, such that rows in memory are only reused for the same files
+                generation=generation,
+            ),
+            f,
+        )
+    os.replace(tmp_file, meta_file)
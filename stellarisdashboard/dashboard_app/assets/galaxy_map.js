@@ -4,6 +4,7 @@
  * names, territory polygons, hyperlane segments) is fetched once; per-date
  * ownership colors + border ridges are fetched on date-slider changes and
  * recolor the existing geometry client-side. See galaxy_map.py for the endpoints.
+ * New saves arrive as live update events (assets/live_updates.js).
  */
 (function () {
   "use strict";
@@ -328,6 +329,21 @@
     // Load the most recent date first, then reveal the map.
     await fetchData(cfg.maxDate);
     if (loadingEl) loadingEl.style.display = "none";
+
+    if (window.liveUpdates) window.liveUpdates.subscribe(cfg.gameName, onGamestate);
+  }
+
+  // A new save was processed: extend the slider, and if it is at the latest
+  // date, follow along by fetching only the new date.
+  function onGamestate(event) {
+    if (event.days <= cfg.maxDate) return;
+    const atLatest = !slider || Number(slider.value) >= cfg.maxDate;
+    cfg.maxDate = event.days;
+    if (slider) slider.max = event.days;
+    if (atLatest) {
+      if (slider) slider.value = event.days;
+      fetchData(event.days);
+    }
   }
 
   if (slider) {
@@ -0,0 +1,47 @@
+/* Live updates: notifies the page when a new gamestate of its game is available.
+ *
+ * Opens one EventSource on /events/<game_id> (see live_updates.py) and calls the
+ * page's handler with {game_id, days, date} for each new gamestate. The timeline
+ * and galaxy map pages register handlers which fetch only the data of the new
+ * date; the event ledger is rendered on the server and offers a reload instead.
+ * Dash includes this file on the timeline pages automatically; the Flask
+ * templates include it explicitly.
+ */
+(function () {
+  "use strict";
+
+  if (window.liveUpdates) return;
+
+  let source = null;
+  let sourceUrl = null;
+  let handler = null;
+
+  function close() {
+    if (source) source.close();
+    source = null;
+    sourceUrl = null;
+    handler = null;
+  }
+
+  // One stream per page: subscribing again replaces the handler, and only
+  // reconnects if the game changed.
+  function subscribe(gameId, onGamestate) {
+    if (!window.EventSource || !gameId) return;
+    handler = onGamestate;
+    const url = `/events/${encodeURIComponent(gameId)}`;
+    if (url === sourceUrl) return;
+    if (source) source.close();
+    source = new EventSource(url);
+    sourceUrl = url;
+    source.addEventListener("gamestate", (e) => {
+      if (handler) handler(JSON.parse(e.data));
+    });
+  }
+
+  // Boosted htmx navigation replaces the page content without unloading the
+  // page, so the stream of the previous page is closed explicitly. (Other htmx
+  // requests, like saving the settings, don't push history and keep it open.)
+  document.addEventListener("htmx:beforeHistorySave", close);
+
+  window.liveUpdates = { subscribe, close };
+})();
@@ -1,13 +1,18 @@
+import dataclasses
 import json
 import logging
+import threading
 import time
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple, Optional
 from urllib import parse
 
 import dash.exceptions
+import numpy as np
 import plotly.graph_objs as go
 from dash import Dash, callback_context, dcc, html, Input, Output, State, ALL
 from flask import render_template
+from markupsafe import escape
 
 from stellarisdashboard import config, datamodel
 from stellarisdashboard.dashboard_app import (
@@ -57,6 +62,39 @@ GRAPH_CONFIG_COMPACT = {
     "responsive": True,
 }
 COMPACT_PLOT_HEIGHT = 240
+# The hidden axis of the hover traces of stacked and budget plots, see get_hover_trace
+HOVER_YAXIS = dict(overlaying="y", visible=False)
+
+# The figures of recently shown tabs, keyed by game, tab, perspective, normalize flag, settings version
+# and the last loaded gamestate date. See _get_tab_figures.
+_TAB_FIGURE_CACHE: "OrderedDict[Tuple, Dict[str, TabFigure]]" = OrderedDict()
+_TAB_FIGURE_CACHE_LOCK = threading.Lock()
+TAB_FIGURE_CACHE_SIZE = 32
+
+
+@dataclasses.dataclass
+class TabFigure:
+    """The figure of one plot in a tab. The full figure is only serialized when the plot is expanded."""
+
+    plot_spec: visualization_data.PlotSpecification
+    figure_data: List[Dict[str, Any]]
+    compact_figure: Dict[str, Any]
+    full_figure: Optional[Dict[str, Any]] = None
+
+    def get_full_figure(self) -> Dict[str, Any]:
+        if self.full_figure is None:
+            full_layout = get_figure_layout(self.plot_spec)
+            full_layout["title"] = dict(
+                text=self.plot_spec.title,
+                font=dict(size=18, color=TEXT_COLOR, family=FONT_FAMILY),
+                x=0.5,
+                xanchor="center",
+            )
+            self.full_figure = go.Figure(
+                data=self.figure_data, layout=full_layout
+            ).to_plotly_json()
+        return self.full_figure
+
 
 timeline_app = Dash(
     __name__,
@@ -78,6 +116,7 @@ def get_figure_layout(plot_spec: visualization_data.PlotSpecification):
         layout["hovermode"] = "closest"
     else:
         layout["hovermode"] = "x"
+        layout["yaxis2"] = HOVER_YAXIS
     return go.Layout(**layout)
 
 
@@ -94,6 +133,7 @@ def get_compact_figure_layout(plot_spec: visualization_data.PlotSpecification):
         layout["hovermode"] = "closest"
     else:
         layout["hovermode"] = "x"
+        layout["yaxis2"] = HOVER_YAXIS
     return go.Layout(**layout)
 
 
@@ -168,16 +208,20 @@ def _plot_grid_card(plot_spec, compact_figure):
     )
 
 
-@timeline_app.callback(Output("game-name-header", "children"), [Input("url", "search")])
+@timeline_app.callback(
+    [Output("game-name-header", "children"), Output("game-id", "data")],
+    [Input("url", "search")],
+)
 def update_game_header(search):
     game_id, matches = _get_game_ids_matching_url(search)
     if not matches:
         logger.warning(f"Could not find a game matching {game_id}")
-        return "Unknown Game"
+        return "Unknown Game", None
+    # like update_content, this falls back to the most recent game if the URL does not name one
     game_id = matches[0]
     games_dict = datamodel.get_available_games_dict()
     country = games_dict[game_id]["country_name"]
-    return f"{country} ({game_id})"
+    return f"{country} ({game_id})", game_id
 
 
 @timeline_app.callback(Output("ledger-link", "href"), [Input("url", "search")])
@@ -227,9 +271,12 @@ def update_country_select_options(search):
         Input("url", "search"),
         Input("dash-plot-checklist", "value"),
         Input("country-perspective-dropdown", "value"),
+        Input("live-update", "data"),
     ],
 )
-def update_content(tab_value, search, dash_plot_checklist, country_perspective):
+def update_content(
+    tab_value, search, dash_plot_checklist, country_perspective, live_update
+):
     config.CONFIG.normalize_stacked_plots = (
         "normalize_stacked_plots" in dash_plot_checklist
     )
@@ -247,7 +294,47 @@ def update_content(tab_value, search, dash_plot_checklist, country_perspective):
 
     logger.info(f"dash_server.update_content: Tab is {tab_value}, Game is {game_id}")
 
-    children = []
+    # Each plot becomes a compact card in a responsive grid. The full-detail
+    # figure is only sent when the plot is expanded, see toggle_plot_modal.
+    # After a live update, only the new gamestates are loaded into the plot data,
+    # and the figures are rendered once for all clients showing the same tab.
+    grid_children = []
+    for tab_figure in _get_tab_figures(
+        game_id, tab_value, country_perspective
+    ).values():
+        grid_children.append(
+            _plot_grid_card(tab_figure.plot_spec, tab_figure.compact_figure)
+        )
+    return [html.Div(grid_children, className="tl-grid")]
+
+
+# Subscribe to the events of the shown game, and pass them on to update_content.
+timeline_app.clientside_callback(
+    """
+    function(gameId) {
+        if (!window.liveUpdates) {
+            return;
+        }
+        if (gameId) {
+            window.liveUpdates.subscribe(gameId, (event) =>
+                dash_clientside.set_props("live-update", {data: event})
+            );
+        } else {
+            window.liveUpdates.close();
+        }
+    }
+    """,
+    Input("game-id", "data"),
+)
+
+
+def _get_tab_figures(
+    game_id: str, tab_value: str, country_perspective
+) -> Dict[str, TabFigure]:
+    """Return the figures of the plots with data in the tab, by plot ID.
+
+    The figures are cached until a new gamestate is loaded or the settings change.
+    """
     if tab_value == config.MARKET_TAB:
         plots = visualization_data.get_market_graphs(config.CONFIG.market_resources)
     else:
@@ -255,24 +342,52 @@ def update_content(tab_value, search, dash_plot_checklist, country_perspective):
             visualization_data.get_plot_specifications_for_tab_layout().get(tab_value)
             or []
         )
+    # just in case it's possible to sneak in an invalid ID
+    plots = [plot_spec for plot_spec in plots if plot_spec]
+    plot_ids = [plot_spec.plot_id for plot_spec in plots]
     plot_data = visualization_data.get_current_execution_plot_data(
-        game_id, country_perspective
+        game_id, country_perspective, plot_ids
+    )
+
+    key = (
+        game_id,
+        tab_value,
+        country_perspective,
+        config.CONFIG.normalize_stacked_plots,
+        config.CONFIG.settings_version,
+        plot_data.get_last_date(plot_ids),
     )
+    with _TAB_FIGURE_CACHE_LOCK:
+        figures = _TAB_FIGURE_CACHE.get(key)
+        if figures is not None:
+            _TAB_FIGURE_CACHE.move_to_end(key)
+            return figures
+
+    figures = _render_tab_figures(game_id, plot_data, plots)
+    with _TAB_FIGURE_CACHE_LOCK:
+        _TAB_FIGURE_CACHE[key] = figures
+        while len(_TAB_FIGURE_CACHE) > TAB_FIGURE_CACHE_SIZE:
+            _TAB_FIGURE_CACHE.popitem(last=False)
+    return figures
+
+
+def _render_tab_figures(
+    game_id: str,
+    plot_data: visualization_data.PlotDataManager,
+    plots: List[visualization_data.PlotSpecification],
+) -> Dict[str, TabFigure]:
     # Legend label of the player's own country, used to highlight it in the
     # compact thumbnails (see _emphasize_player_in_compact_data).
-    player_country_name = games_dict[game_id].get("country_name")
+    player_country_name = datamodel.get_available_games_dict()[game_id].get(
+        "country_name"
+    )
     player_label = (
         dict_key_to_legend_label(player_country_name)
         if player_country_name
         else None
     )
-    # Each plot becomes a compact card in a responsive grid. The full-detail
-    # figure is stashed in a Store and rendered in the modal on demand.
-    grid_children = []
-    full_figures = {}
+    figures = {}
     for plot_spec in plots:
-        if not plot_spec:
-            continue  # just in case it's possible to sneak in an invalid ID
         start = time.time()
         figure_data = get_raw_plot_data_dicts(game_id, plot_data, plot_spec)
         end = time.time()
@@ -282,26 +397,12 @@ def update_content(tab_value, search, dash_plot_checklist, country_perspective):
         if not figure_data:
             continue
 
-        full_layout = get_figure_layout(plot_spec)
-        full_layout["title"] = dict(
-            text=plot_spec.title,
-            font=dict(size=18, color=TEXT_COLOR, family=FONT_FAMILY),
-            x=0.5,
-            xanchor="center",
-        )
-        full_figures[plot_spec.plot_id] = go.Figure(
-            data=figure_data, layout=full_layout
-        ).to_plotly_json()
-
         compact_data = _emphasize_player_in_compact_data(figure_data, player_label)
         compact_figure = go.Figure(
             data=compact_data, layout=get_compact_figure_layout(plot_spec)
-        )
-        grid_children.append(_plot_grid_card(plot_spec, compact_figure))
-
-    children.append(html.Div(grid_children, className="tl-grid"))
-    children.append(dcc.Store(id="full-figures-store", data=full_figures))
-    return children
+        ).to_plotly_json()
+        figures[plot_spec.plot_id] = TabFigure(plot_spec, figure_data, compact_figure)
+    return figures
 
 
 @timeline_app.callback(
@@ -315,10 +416,23 @@ def update_content(tab_value, search, dash_plot_checklist, country_perspective):
         Input("modal-close", "n_clicks"),
         Input("modal-backdrop", "n_clicks"),
     ],
-    [State("full-figures-store", "data")],
+    [
+        State("tabs-container", "value"),
+        State("url", "search"),
+        State("dash-plot-checklist", "value"),
+        State("country-perspective-dropdown", "value"),
+    ],
     prevent_initial_call=True,
 )
-def toggle_plot_modal(expand_clicks, close_clicks, backdrop_clicks, store):
+def toggle_plot_modal(
+    expand_clicks,
+    close_clicks,
+    backdrop_clicks,
+    tab_value,
+    search,
+    dash_plot_checklist,
+    country_perspective,
+):
     """Open the modal with a plot's full-detail figure, or close it."""
     triggered = callback_context.triggered
     if not triggered:
@@ -338,16 +452,20 @@ def toggle_plot_modal(expand_clicks, close_clicks, backdrop_clicks, store):
     except (ValueError, KeyError):
         raise dash.exceptions.PreventUpdate
 
-    figure = (store or {}).get(plot_id)
-    if figure is None:
+    config.CONFIG.normalize_stacked_plots = "normalize_stacked_plots" in (
+        dash_plot_checklist or []
+    )
+    game_id, matches = _get_game_ids_matching_url(search)
+    if not matches:
         raise dash.exceptions.PreventUpdate
-
-    title = (
-        figure.get("layout", {}).get("title", {}).get("text", "")
-        if isinstance(figure, dict)
-        else ""
+    # Usually served from the figure cache filled when the tab was shown.
+    tab_figure = _get_tab_figures(matches[0], tab_value, country_perspective).get(
+        plot_id
     )
-    return "tl-modal", figure, title
+    if tab_figure is None:
+        raise dash.exceptions.PreventUpdate
+
+    return "tl-modal", tab_figure.get_full_figure(), tab_figure.plot_spec.title
 
 
 def _get_url_params(url: str) -> Dict[str, List[str]]:
@@ -387,14 +505,11 @@ def get_raw_plot_data_dicts(
         logger.warning(f"Unknown Plot type {plot_spec}")
         return []
     # The data x-values count years since game start; shift them to the in-game
-    # year for display. Hover labels are already-formatted strings, so this only
+    # year for display. Hover labels use the customdata dates, so this only
     # affects the axis. (Done here so every plot style is covered in one place.)
+    # The x and y values are numpy arrays, which plotly sends as typed arrays.
     for trace in data:
-        x_values = trace.get("x")
-        if x_values:
-            trace["x"] = [
-                GAME_START_YEAR + v if v is not None else None for v in x_values
-            ]
+        trace["x"] = GAME_START_YEAR + trace["x"]
     return data
 
 
@@ -404,18 +519,21 @@ def _get_raw_data_for_line_plot(
     plot_spec: visualization_data.PlotSpecification,
 ) -> List[Dict[str, Any]]:
     plot_list = []
-    for key, x_values, y_values in plot_data.get_data_for_plot(plot_spec):
-        if all(y != y for y in y_values):
+    for key, x_values, y_values in plot_data.get_data_for_plot(
+        plot_spec, num_points=config.CONFIG.plot_time_resolution
+    ):
+        x_values = np.array(x_values, dtype=float)
+        y_values = np.array(y_values, dtype=float)
+        if np.isnan(y_values).all():
             continue
-        if not x_values:
+        if not len(x_values):
             continue
         line = dict(
             x=x_values,
             y=y_values,
             name=dict_key_to_legend_label(key),
             line={"color": get_country_color(game_id, key, 1.0)},
-            text=get_plot_value_labels(x_values, y_values, key),
-            hoverinfo="text",
+            **get_hover_data(x_values, key),
         )
         plot_list.append(line)
     return plot_list
@@ -432,30 +550,29 @@ def _get_raw_data_for_stacked_and_budget_plots(
         config.CONFIG.normalize_stacked_plots
         and plot_spec.style == visualization_data.PlotStyle.stacked
     )
-    for key, x_values, y_values in plot_data.get_data_for_plot(plot_spec):
-        if not any(y_values):
+    for key, x_values, y_values in plot_data.get_data_for_plot(
+        plot_spec, num_points=config.CONFIG.plot_time_resolution
+    ):
+        x_values = np.array(x_values, dtype=float)
+        y_values = np.array(y_values, dtype=float)
+        if not np.any(y_values):
             continue
         if plot_spec.style == visualization_data.PlotStyle.budget:
             if net_gain is None:
-                net_gain = [0.0 for _ in x_values]
-            net_gain = [net + y for (net, y) in zip(net_gain, y_values)]
+                net_gain = np.zeros(len(x_values))
+            net_gain = net_gain + y_values
 
         # Usually, each budget item contributes only positively or only negatively to the budget. To make this clear,
         # we separate them to separate stack groups that are drawn on the plot independently.
         # We must handle the edge case where a budget item has both positive and negative contributions at different times:
-        if min(y_values) < 0 < max(y_values):
+        is_negative = y_values < 0
+        if is_negative.any() and (y_values > 0).any():
             # split negative and positive values, add them to separate groups and only show one legend entry
-            neg, pos = [], []
-            for y in y_values:
-                if y < 0:
-                    neg.append(y)
-                    pos.append(0)
-                else:
-                    neg.append(0)
-                    pos.append(y)
+            pos = np.where(is_negative, 0.0, y_values)
+            neg = np.where(is_negative, y_values, 0.0)
             series = [(pos, "pos"), (neg, "neg")]
         else:
-            if min(y_values) < 0:
+            if is_negative.any():
                 stackgroup = "neg"
             else:
                 stackgroup = "pos"
@@ -467,29 +584,35 @@ def _get_raw_data_for_stacked_and_budget_plots(
                     y=yv,
                     name=dict_key_to_legend_label(key),
                     legendgroup=key,  # ensure that budget contributions with mixed signs still behave as a single entry
-                    hoverinfo="text",
                     mode="lines",
                     line=dict(width=0.5, color=get_country_color(game_id, key, 1.0)),
                     stackgroup=stackgroup,
                     groupnorm="percent" if normalized else "",
                     fillcolor=get_country_color(game_id, key, 0.5),
-                    text=get_plot_value_labels(x_values, yv, key),
                     showlegend=i == 0,  # only show one legend entry
+                    hoverinfo="skip",
                 )
             )
+        lines.append(
+            get_hover_trace(
+                x_values, y_values, key, get_country_color(game_id, key, 1.0)
+            )
+        )
 
     if lines and plot_spec.style == visualization_data.PlotStyle.budget:
         # Add net value over time
         name = "Net result"
+        color = "rgba(255,255,255,1)"
         line = dict(
             x=lines[0]["x"],
             y=net_gain,
             name=name,
-            line=dict(color="rgba(255,255,255,1)"),
-            text=get_plot_value_labels(lines[0]["x"], net_gain, "Net result"),
-            hoverinfo="text",
+            legendgroup=name,
+            line=dict(color=color),
+            hoverinfo="skip",
         )
         lines.append(line)
+        lines.append(get_hover_trace(lines[0]["x"], net_gain, name, color))
     return lines
 
 
@@ -500,13 +623,43 @@ def dict_key_to_legend_label(key: str):
     return " ".join(words)
 
 
-def get_plot_value_labels(x_values, y_values, key):
-    return [
-        f"{datamodel.days_to_date(360 * x)}: {y:.2f} - {dict_key_to_legend_label(key)}"
-        if (y and y == y)
-        else ""
-        for (x, y) in zip(x_values, y_values)
-    ]
+def get_hover_data(x_values: np.ndarray, key: str) -> Dict[str, Any]:
+    """
+    Return the customdata and hovertemplate which label each point like "2301.04.01: 123.45 - Name".
+    The in-game date of each point is sent as numbers instead of one formatted string per point.
+    """
+    # dates are never NaN, nan_to_num only keeps a NaN from becoming an undefined integer
+    days = np.rint(np.nan_to_num(x_values * 360)).astype(np.int32)
+    customdata = np.stack(
+        [GAME_START_YEAR + days // 360, 1 + days % 360 // 30, 1 + days % 30], axis=1
+    ).astype(np.int16)
+    date = "%{customdata[0]}.%{customdata[1]:02d}.%{customdata[2]:02d}"
+    # names may contain text that plotly would read as markup or as a template variable
+    label = str(escape(dict_key_to_legend_label(key))).replace("%", "&#37;")
+    return dict(
+        customdata=customdata,
+        hovertemplate=f"{date}: %{{y:.2f}} - {label}<extra></extra>",
+    )
+
+
+def get_hover_trace(
+    x_values: np.ndarray, y_values: np.ndarray, key: str, color: str
+) -> Dict[str, Any]:
+    """
+    Return an invisible trace which shows the hover labels of a stacked plot item, leaving out the points where
+    it is zero. The values are not stacked, so the trace is drawn on its own hidden axis instead of the plot's.
+    """
+    return dict(
+        x=x_values,
+        y=np.where(y_values == 0, np.nan, y_values),
+        name=dict_key_to_legend_label(key),
+        legendgroup=key,
+        showlegend=False,
+        mode="markers",
+        marker=dict(opacity=0, color=color),
+        yaxis="y2",
+        **get_hover_data(x_values, key),
+    )
 
 
 def get_country_color(game_id: int, country_name: str, alpha: float = 1.0) -> str:
@@ -524,7 +677,13 @@ def start_dash_app(host, port):
     if config.CONFIG.production == True:
         from waitress import serve
 
-        serve(timeline_app.server, host=host, port=port)
+        # every open live update stream occupies one of the threads
+        serve(
+            timeline_app.server,
+            host=host,
+            port=port,
+            threads=config.SERVER_THREADS,
+        )
     else:
         timeline_app.run(host=host, port=port)
 
@@ -664,6 +823,10 @@ def get_layout():
         className="tl-app",
         children=[
             dcc.Location(id="url", refresh=False),
+            # the game which is shown, also if the URL does not name one, see update_game_header
+            dcc.Store(id="game-id"),
+            # set by the live update events, see the clientside callback
+            dcc.Store(id="live-update"),
             sidebar,
             main,
             modal,
@@ -4,6 +4,7 @@ import logging
 from typing import Dict
 
 from flask import render_template, request
+from sqlalchemy.orm import selectinload
 
 from stellarisdashboard import config, datamodel, game_info
 from stellarisdashboard.dashboard_app import flask_app, utils, event_registry
@@ -158,6 +159,7 @@ class EventFilter:
         )
 
     def include_event(self, event: datamodel.HistoricalEvent) -> bool:
+        # whether the filtered country is involved in the event is checked in the query, see get_event_and_link_dicts
         result = all(
             [
                 self.min_date <= event.start_date_days <= self.max_date,
@@ -165,10 +167,6 @@ class EventFilter:
                 event.event_type.scope >= self.scope_threshold,
             ]
         )
-        if self.country_filter is not None:
-            result &= self.country_filter in {
-                c.country_id for c in event.involved_countries()
-            }
         if self.leader_filter is not None:
             result &= event.leader_id == self.leader_filter
         if self.system_filter is not None:
@@ -256,16 +254,26 @@ class EventTemplateDictBuilder:
         self._titles = {}
 
         for key in key_objects:
-            event_list = (
+            event_query = (
                 self._session.query(datamodel.HistoricalEvent)
                 .order_by(
                     datamodel.HistoricalEvent.start_date_days.asc(),
                     datamodel.HistoricalEvent.event_type.asc(),
                 )
                 .filter_by(**{event_query_kwargs: key})
-                .all()
+                # the involved countries are checked for every event, load them in one query
+                .options(selectinload(datamodel.HistoricalEvent.participants))
             )
-            self.collect_event_dicts(event_list, key)
+            if self.event_filter.country_filter is not None:
+                event_query = event_query.join(
+                    datamodel.HistoricalEventParticipant,
+                    datamodel.HistoricalEventParticipant.historical_event_id
+                    == datamodel.HistoricalEvent.historical_event_id,
+                ).filter(
+                    datamodel.HistoricalEventParticipant.country_id
+                    == self.event_filter.country_filter
+                )
+            self.collect_event_dicts(event_query.all(), key)
         return self._events, self._titles, self._details, self._formatted_urls
 
     def collect_event_dicts(self, event_list, key_object):
@@ -280,7 +288,7 @@ class EventTemplateDictBuilder:
                 continue
             if (
                 event.country
-                and any(c.is_hidden_country() for c in event.involved_countries())
+                and any(c.is_hidden_country() for c in event.participants)
                 and not event.event_is_known_to_player
             ):
                 continue
@@ -363,7 +371,7 @@ class EventTemplateDictBuilder:
             return {}
 
     def _preformat_urls(self, event):
-        for country in event.involved_countries():
+        for country in event.participants:
             self._formatted_urls[country] = self._get_url_for(country)
         if event.planet:
             self._formatted_urls[event.planet] = self._get_url_for(event.planet)
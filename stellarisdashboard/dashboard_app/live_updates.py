@@ -0,0 +1,94 @@
+"""Server-sent events which notify the browser when a new gamestate of a game is available.
+
+After each processed save, f_monitor_saves publishes an event with the game and the date of the new gamestate.
+The timeline, galaxy map and event ledger pages subscribe to the events of their game through
+assets/live_updates.js. The timeline and galaxy map then request only the data of the new date instead
+of being reloaded, and the event ledger offers to reload the page.
+
+The events are kept in memory, so they only reach the pages served by the process which also monitors the saves.
+"""
+
+import json
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Tuple
+
+import flask
+
+from stellarisdashboard import config, datamodel
+from stellarisdashboard.dashboard_app import flask_app
+
+logger = logging.getLogger(__name__)
+
+# Each open event stream occupies a server thread, so the number of streams is limited
+MAX_SUBSCRIBERS = config.LIVE_UPDATE_MAX_SUBSCRIBERS
+# Seconds between the comments which keep idle streams from being closed by the browser or proxies
+KEEPALIVE_INTERVAL = 15
+# Events which a slow client has not received yet are dropped beyond this number
+EVENT_QUEUE_SIZE = 8
+
+_SUBSCRIBERS: List[Tuple[str, queue.Queue]] = []
+_SUBSCRIBERS_LOCK = threading.Lock()
+
+
+def publish_new_gamestate(game_id: str, date: int):
+    """Notify the subscribers of the game that a gamestate at the given date (in days) was committed."""
+    event = _format_event(
+        "gamestate",
+        dict(game_id=game_id, days=date, date=datamodel.days_to_date(date)),
+    )
+    with _SUBSCRIBERS_LOCK:
+        subscribers = [events for g, events in _SUBSCRIBERS if g == game_id]
+    for events in subscribers:
+        try:
+            events.put_nowait(event)
+        except queue.Full:
+            # the client is not reading, the next event makes it catch up anyway
+            pass
+
+
+@flask_app.route("/events/<game_id>")
+def gamestate_events(game_id):
+    """Stream the gamestate events of the game."""
+    matches = datamodel.get_known_games(game_id)
+    if not matches:
+        return flask.jsonify({"error": "unknown game"}), 404
+    subscription = (matches[0], queue.Queue(maxsize=EVENT_QUEUE_SIZE))
+    # checking the limit and registering in one step, such that concurrent requests can't exceed it
+    with _SUBSCRIBERS_LOCK:
+        if len(_SUBSCRIBERS) >= MAX_SUBSCRIBERS:
+            logger.info(
+                f"Refusing event stream for {matches[0]}, too many open streams"
+            )
+            return flask.jsonify({"error": "too many open event streams"}), 503
+        _SUBSCRIBERS.append(subscription)
+    response = flask.Response(
+        _stream_events(subscription),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # called by the server when the stream ends, also if it was never started
+    response.call_on_close(lambda: _unsubscribe(subscription))
+    return response
+
+
+def _stream_events(subscription: Tuple[str, queue.Queue]):
+    game_id, events = subscription
+    # the first message makes the browser report the stream as open
+    yield f": subscribed to {game_id}\n\n"
+    while True:
+        try:
+            yield events.get(timeout=KEEPALIVE_INTERVAL)
+        except queue.Empty:
+            yield ": keepalive\n\n"
+
+
+def _unsubscribe(subscription: Tuple[str, queue.Queue]):
+    with _SUBSCRIBERS_LOCK:
+        if subscription in _SUBSCRIBERS:
+            _SUBSCRIBERS.remove(subscription)
+
+
+def _format_event(event_type: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
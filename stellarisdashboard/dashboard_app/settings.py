@@ -96,8 +96,32 @@ def _build_settings_dict():
                 "value": current_values["plot_time_resolution"],
                 "min": 0,
                 "max": 10000,
-                "name": "Initial graph resolution",
-                "description": "Number of points used when first loading the graphs. Set to 0 to load full data.",
+                "name": "Graph resolution",
+                "description": "Maximum number of points per line in the graphs. Longer lines are downsampled such that peaks are kept. Set to 0 to show the full data.",
+            },
+            "plot_data_cache_size": {
+                "type": t_int,
+                "value": current_values["plot_data_cache_size"],
+                "min": 1,
+                "max": 100000,
+                "name": "Graph data cache size (MB)",
+                "description": "Memory used to keep the graph data of recently viewed games and country perspectives, such that switching between them is fast.",
+            },
+            "retention_full_resolution_years": {
+                "type": t_int,
+                "value": current_values["retention_full_resolution_years"],
+                "min": 0,
+                "max": 1000,
+                "name": "Keep all saves for the last X years",
+                "description": "Older saves are thinned out in the database after processing, see the setting below. History events are always kept. Set to 0 to keep all saves.",
+            },
+            "retention_saves_per_year": {
+                "type": t_int,
+                "value": current_values["retention_saves_per_year"],
+                "min": 1,
+                "max": 360,
+                "name": "Saves kept per year for older saves",
+                "description": "Number of saves per in-game year that are kept when thinning out old saves.",
             },
             "threads": {
                 "type": t_int,
@@ -8,16 +8,17 @@ import logging
 import pathlib
 import random
 import re
+import threading
 import time
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from typing import List, Dict, Callable, Tuple, Iterable, Union, Set, Optional, Any
 
 import networkx as nx
 import numpy as np
 from scipy.spatial import Voronoi
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload
 
-from stellarisdashboard import datamodel, config, game_info
+from stellarisdashboard import datamodel, config, game_info, country_data_columns
 from stellarisdashboard.parsing.save_parser import rust_parser
 
 logger = logging.getLogger(__name__)
@@ -63,38 +64,83 @@ def get_plot_specifications_for_tab_layout():
     }
 
 
-# The PlotDataManager is cached in memory for each "active" game
-# (one that was requested or had a save file parsed in the current execution).
-_CURRENT_EXECUTION_PLOT_DATA: Dict[str, "PlotDataManager"] = {}
+# The PlotDataManagers are cached in memory for each "active" game (one that was requested or had a save
+# file parsed in the current execution), country perspective and combination of the settings which change
+# the plot data. They are kept in least recently used order, and the least recently used managers are
+# dropped once all managers together use more than plot_data_cache_size megabytes.
+_CURRENT_EXECUTION_PLOT_DATA: "OrderedDict[Tuple, PlotDataManager]" = OrderedDict()
+# only guards the OrderedDict, the data of each manager is guarded by its own lock
+_CURRENT_EXECUTION_PLOT_DATA_LOCK = threading.Lock()
 
 
 def get_current_execution_plot_data(
-    game_name: str, country_perspective: Optional[int] = None
+    game_name: str,
+    country_perspective: Optional[int] = None,
+    plot_ids: Optional[Iterable[str]] = None,
 ) -> "PlotDataManager":
-    """Update and retrieve the PlotDataManager object stored for the requested game.
+    """Update and retrieve the PlotDataManager object stored for the requested game and perspective.
 
     :param game_name: The exact name of a game for which a database is available
+    :param country_perspective: The country ID for which budgets and pop stats are shown, None for the player
+    :param plot_ids: The plots which are about to be shown. If None, only the plots which were shown before are updated.
     :return:
     """
-    global _CURRENT_EXECUTION_PLOT_DATA
-    if game_name not in _CURRENT_EXECUTION_PLOT_DATA:
-        with datamodel.get_db_session(game_name) as session:
-            game = session.query(datamodel.Game).filter_by(game_name=game_name).first()
-        if not game:
-            logger.warning(f"Warning: Game {game_name} could not be found in database!")
-        plot_specifications = [
-            ps
-            for pslist in get_plot_specifications_for_tab_layout().values()
-            for ps in pslist
-        ]
-        plot_specifications += get_market_graphs(config.CONFIG.market_resources)
-        _CURRENT_EXECUTION_PLOT_DATA[game_name] = PlotDataManager(
-            game_name, plot_specifications
-        )
-        _CURRENT_EXECUTION_PLOT_DATA[game_name].initialize()
-    _CURRENT_EXECUTION_PLOT_DATA[game_name].country_perspective = country_perspective
-    _CURRENT_EXECUTION_PLOT_DATA[game_name].update_with_new_gamestate()
-    return _CURRENT_EXECUTION_PLOT_DATA[game_name]
+    key = (
+        game_name,
+        country_perspective,
+        config.CONFIG.show_everything,
+        config.CONFIG.show_all_country_types,
+    )
+    with _CURRENT_EXECUTION_PLOT_DATA_LOCK:
+        plot_data = _CURRENT_EXECUTION_PLOT_DATA.pop(key, None)
+        if plot_data is not None:
+            _CURRENT_EXECUTION_PLOT_DATA[key] = plot_data
+    if plot_data is None:
+        new_plot_data = _create_plot_data_manager(game_name, country_perspective)
+        with _CURRENT_EXECUTION_PLOT_DATA_LOCK:
+            # another thread may have created the manager in the meantime
+            plot_data = _CURRENT_EXECUTION_PLOT_DATA.pop(key, new_plot_data)
+            _CURRENT_EXECUTION_PLOT_DATA[key] = plot_data
+    # loading the new gamestates only blocks the threads which use the same manager
+    plot_data.update_with_new_gamestate(plot_ids)
+    with _CURRENT_EXECUTION_PLOT_DATA_LOCK:
+        _evict_plot_data()
+    return plot_data
+
+
+def _create_plot_data_manager(
+    game_name: str, country_perspective: Optional[int]
+) -> "PlotDataManager":
+    with datamodel.get_db_session(game_name) as session:
+        game = session.query(datamodel.Game).filter_by(game_name=game_name).first()
+    if not game:
+        logger.warning(f"Warning: Game {game_name} could not be found in database!")
+    plot_specifications = [
+        ps
+        for pslist in get_plot_specifications_for_tab_layout().values()
+        for ps in pslist
+    ]
+    plot_specifications += get_market_graphs(config.CONFIG.market_resources)
+    plot_data = PlotDataManager(
+        game_name, plot_specifications, country_perspective=country_perspective
+    )
+    plot_data.initialize()
+    return plot_data
+
+
+def _evict_plot_data():
+    """Drop the least recently used PlotDataManagers until the others fit into the cache size.
+
+    The most recently used manager is always kept, even if it is larger than the cache size.
+    """
+    max_bytes = config.CONFIG.plot_data_cache_size * 2**20
+    total_bytes = sum(
+        m.get_memory_usage() for m in _CURRENT_EXECUTION_PLOT_DATA.values()
+    )
+    while total_bytes > max_bytes and len(_CURRENT_EXECUTION_PLOT_DATA) > 1:
+        key, plot_data = _CURRENT_EXECUTION_PLOT_DATA.popitem(last=False)
+        total_bytes -= plot_data.get_memory_usage()
+        logger.info(f"Dropping cached plot data of game {key[0]}, perspective {key[1]}")
 
 
 _GAME_COUNTRY_COLORS = {}
@@ -160,31 +206,27 @@ class PlotDataManager:
     ):
         self.game_name: str = game_name
         self.plot_specifications = plot_specifications
+        self._plot_specifications_by_id = {ps.plot_id: ps for ps in plot_specifications}
 
-        self.last_date = None
-        self._loaded_gamestates = None
         self.show_everything = None
         self.show_all_country_types = None
-        self.plot_time_resolution = None
 
         self._country_perspective: int = country_perspective
 
+        # The containers are only created once their plot is requested, see update_with_new_gamestate
         self.data_containers_by_plot_id: Dict[str, AbstractPlotDataContainer] = None
+        # The country info of the last update, which is extended with the rows of the new gamestates
+        self._countries: Optional[CountryColumnInfo] = None
+        # Serializes the updates of the containers with the reads of their data, which happen in the request
+        # threads of the dashboard and in the save monitor thread. Reentrant, as reads may trigger an update.
+        self._lock = threading.RLock()
 
     def initialize(self):
-        self.last_date = -float("inf")
-        self._loaded_gamestates = 0
-        self.show_everything = config.CONFIG.show_everything
-        self.show_all_country_types = config.CONFIG.show_all_country_types
-        self.plot_time_resolution = config.CONFIG.plot_time_resolution
-
-        self.data_containers_by_plot_id = {}
-        for plot_spec in self.plot_specifications:
-            self.data_containers_by_plot_id[
-                plot_spec.plot_id
-            ] = plot_spec.data_container_factory(
-                self.country_perspective, **plot_spec.data_container_factory_kwargs
-            )
+        with self._lock:
+            self.show_everything = config.CONFIG.show_everything
+            self.show_all_country_types = config.CONFIG.show_all_country_types
+
+            self.data_containers_by_plot_id = {}
 
     @property
     def country_perspective(self) -> Optional[int]:
@@ -192,292 +234,1058 @@ class PlotDataManager:
 
     @country_perspective.setter
     def country_perspective(self, value: Optional[int]):
-        if value != self._country_perspective:
-            logger.info(
-                f"Switching perspective to Country {value if value is not None else 'Observer'}"
-            )
-            self._country_perspective = value
-            self.initialize()
+        with self._lock:
+            if value != self._country_perspective:
+                logger.info(
+                    f"Switching perspective to Country {value if value is not None else 'Observer'}"
+                )
+                self._country_perspective = value
+                self.initialize()
+
+    def update_with_new_gamestate(self, plot_ids: Optional[Iterable[str]] = None):
+        """
+        Catch up the data containers of the given plots with the gamestates which were added to the database
+        since each container was last updated. The container of a plot is created when the plot is first
+        requested. If no plots are given, only the containers which were already created are updated.
+        """
+        with self._lock:
+            self._update_with_new_gamestate(plot_ids)
 
-    def update_with_new_gamestate(self):
+    def _update_with_new_gamestate(self, plot_ids: Optional[Iterable[str]]):
         if (
             self.show_everything != config.CONFIG.show_everything
             or self.show_all_country_types != config.CONFIG.show_all_country_types
-            or self.plot_time_resolution != config.CONFIG.plot_time_resolution
         ):
             # reset everything due to changed setting: This forces the program to redraw all plots with the appropriate data:
             logger.info("Detected changed visibility settings: Reassembling plot data")
             self.initialize()
-            self.show_everything = config.CONFIG.show_everything
-            self.show_all_country_types = config.CONFIG.show_all_country_types
 
-        num_new_gs = datamodel.count_gamestates_since(self.game_name, self.last_date)
-        if self.plot_time_resolution == 0 or num_new_gs < self.plot_time_resolution:
-            use_every_nth_gamestate = 1
+        if plot_ids is None:
+            data_containers = list(self.data_containers_by_plot_id.values())
         else:
-            use_every_nth_gamestate = (num_new_gs // self.plot_time_resolution) + 1
-        t_start = time.time()
-        num_loaded_gs = 0
-        for i, gs in enumerate(
-            datamodel.get_gamestates_since(self.game_name, self.last_date)
-        ):
-            if gs.date <= self.last_date:
-                logger.warning(
-                    f"Received gamestate with date {datamodel.days_to_date(gs.date)}, last known date is {datamodel.days_to_date(self.last_date)}"
+            data_containers = [
+                self._get_or_create_container(self._plot_specifications_by_id[plot_id])
+                for plot_id in plot_ids
+                if plot_id in self._plot_specifications_by_id
+            ]
+
+        # Containers which were created or updated together are at the same date, so they share the queries.
+        containers_by_last_date = defaultdict(list)
+        for data_container in data_containers:
+            containers_by_last_date[data_container.last_date].append(data_container)
+        for last_date, containers in containers_by_last_date.items():
+            self._update_containers(containers, last_date)
+
+    def _get_or_create_container(
+        self, plot_spec: PlotSpecification
+    ) -> "AbstractPlotDataContainer":
+        if plot_spec.plot_id not in self.data_containers_by_plot_id:
+            self.data_containers_by_plot_id[plot_spec.plot_id] = (
+                plot_spec.data_container_factory(
+                    self.country_perspective, **plot_spec.data_container_factory_kwargs
                 )
-                continue
-            if (
-                self.plot_time_resolution == 0
-                or num_new_gs < self.plot_time_resolution
-                or i % use_every_nth_gamestate == 0
-                or (num_new_gs - i + self._loaded_gamestates)
-                <= self.plot_time_resolution
-            ):
-                num_loaded_gs += 1
-                self._loaded_gamestates += 1
-                for data_container in self.data_containers_by_plot_id.values():
-                    data_container.extract_data_from_gamestate(gs)
-            self.last_date = gs.date
+            )
+        return self.data_containers_by_plot_id[plot_spec.plot_id]
+
+    def _update_containers(
+        self, data_containers: List["AbstractPlotDataContainer"], last_date: float
+    ):
+        t_start = time.time()
+        new_dates = datamodel.get_gamestate_dates_since(self.game_name, last_date)
+        if new_dates:
+            self._load_gamestates(new_dates, data_containers)
+            for data_container in data_containers:
+                data_container.last_date = new_dates[-1]
         logger.info(
-            f"Loaded {num_loaded_gs} new gamestates from the database in {time.time() - t_start:5.3f} seconds. ({self._loaded_gamestates} gamestates in total)"
+            f"Loaded {len(new_dates)} new gamestates for {len(data_containers)} plots from the database in {time.time() - t_start:5.3f} seconds."
+        )
+
+    def get_last_date(self, plot_ids: Iterable[str]) -> float:
+        """Return the latest date loaded into the containers of the given plots."""
+        with self._lock:
+            return self._get_last_date(plot_ids)
+
+    def _get_last_date(self, plot_ids: Iterable[str]) -> float:
+        return max(
+            (
+                self.data_containers_by_plot_id[plot_id].last_date
+                for plot_id in plot_ids
+                if plot_id in self.data_containers_by_plot_id
+            ),
+            default=-float("inf"),
         )
 
+    def get_memory_usage(self) -> int:
+        """
+        Return the approximate number of bytes used by the data of all plots. This does not wait for a running
+        update, so it may not include the containers which are just being created or grown.
+        """
+        if self.data_containers_by_plot_id is None:
+            return 0
+        return sum(c.nbytes for c in self.data_containers_by_plot_id.values())
+
+    def _load_gamestates(
+        self, dates: List[int], data_containers: List["AbstractPlotDataContainer"]
+    ):
+        tables = PlotDataTables(
+            self.game_name, dates, self.country_perspective, self._countries
+        )
+        for context in tables.iterate_gamestates():
+            for data_container in data_containers:
+                data_container.extract_data_from_gamestate(context)
+        self._countries = tables.countries
+
     def get_data_for_plot(
-        self, ps: PlotSpecification
+        self, ps: PlotSpecification, num_points: int = 0
     ) -> Iterable[Tuple[str, List[int], List[float]]]:
         """
         Used to access the raw data for the provided plot specification. Individual traces to be plotted are
         yielded one-by-one as tuples in the form (legend key_object, x values, y values).
 
         :param ps:
+        :param num_points: If positive, longer traces are downsampled to this many points, see iterate_traces
         :return:
         """
-        container = self.data_containers_by_plot_id.get(ps.plot_id)
-        if container is None:
+        if ps.plot_id not in self._plot_specifications_by_id:
             logger.info(f"No data available for plot {ps.title} ({ps.plot_id}).")
             return
-        yield from container.iterate_traces()
+        # the traces are collected under the lock, such that it is not held while the caller consumes them
+        with self._lock:
+            container = self.data_containers_by_plot_id.get(ps.plot_id)
+            if container is None:
+                self._update_with_new_gamestate([ps.plot_id])
+                container = self.data_containers_by_plot_id[ps.plot_id]
+            traces = list(
+                container.iterate_traces(
+                    num_points, shared_dates=ps.style != PlotStyle.line
+                )
+            )
+        yield from traces
+
+
+class PlotDataTables:
+    """
+    The data of the selected gamestates, shared by all data containers. Each family of data, i.e. the
+    CountryData columns, the budgets, each PopStats table and the market prices, is loaded with one query
+    for all dates when a container first accesses it. The rows are identified by date and country ID,
+    such that the containers read arrays instead of walking the CountryData objects of each gamestate.
+
+    The containers receive the data one gamestate at a time, as a GamestateContext.
+    """
+
+    def __init__(
+        self,
+        game_name: str,
+        dates: List[int],
+        country_perspective: Optional[int],
+        previous_countries: Optional["CountryColumnInfo"] = None,
+    ):
+        self.game_name = game_name
+        self.dates = dates
+        self.country_perspective = country_perspective
+        self._previous_countries = previous_countries
+        self._pop_stats: Dict[Any, PopStatsTable] = {}
+        self._column_sums: Dict[Tuple[str, ...], np.ndarray] = {}
+        self._visibility_masks: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    def iterate_gamestates(self) -> Iterable["GamestateContext"]:
+        for date_index in range(len(self.dates)):
+            yield GamestateContext(self, date_index)
+
+    @functools.cached_property
+    def columns(self) -> country_data_columns.CountryDataColumns:
+        columns = None
+        try:
+            columns = country_data_columns.load(self.game_name)
+        except Exception:
+            logger.exception(
+                f"Could not load country data columns for game {self.game_name}"
+            )
+        if columns is None:
+            # fall back to querying the rows of the selected dates
+            columns = country_data_columns.query(
+                self.game_name, self.dates[0], self.dates[-1]
+            )
+        return columns
+
+    @functools.cached_property
+    def countries(self) -> "CountryColumnInfo":
+        return CountryColumnInfo.load(
+            self.game_name, self.columns, self._previous_countries
+        )
+
+    @functools.cached_property
+    def player_rows(self) -> np.ndarray:
+        """For each date, the row of the perspective country in the columns, or -1 if there is none."""
+        countries = self.countries
+        if self.country_perspective is None:
+            is_perspective = countries.is_player
+        else:
+            is_perspective = countries.country_ids_in_game == self.country_perspective
+        is_perspective = is_perspective & ~countries.is_hidden
+        rows = np.full(len(self.dates), -1)
+        for date_index, date in enumerate(self.dates):
+            start, end = self.columns.rows_for_date(date)
+            matches = np.flatnonzero(is_perspective[start:end])
+            if len(matches):
+                rows[date_index] = start + matches[0]
+        return rows
+
+    @functools.cached_property
+    def row_range(self) -> Tuple[int, int]:
+        """The start and end index of the rows of the selected dates in the columns."""
+        start, _ = self.columns.rows_for_date(self.dates[0])
+        _, end = self.columns.rows_for_date(self.dates[-1])
+        return start, end
+
+    def get_column_sum(self, columns: Tuple[str, ...]) -> np.ndarray:
+        """Return the sum of the columns for the rows in row_range."""
+        if columns not in self._column_sums:
+            start, end = self.row_range
+            self._column_sums[columns] = sum(
+                self.columns[column][start:end] for column in columns
+            )
+        return self._column_sums[columns]
+
+    def get_visibility_mask(self, visibility: str, show_everything: bool) -> np.ndarray:
+        """
+        Return which rows in row_range are visible, which is a vectorized version of the show_*_info methods of
+        CountryData for the visibility level, one of "geography", "tech", "economic" or "military". If
+        show_everything is set, all countries which are not hidden are visible.
+        """
+        key = (visibility, show_everything)
+        if key not in self._visibility_masks:
+            self._visibility_masks[key] = self._get_visibility_mask(
+                visibility, show_everything
+            )
+        return self._visibility_masks[key]
+
+    def _get_visibility_mask(self, visibility: str, show_everything: bool):
+        start, end = self.row_range
+
+        def flag(column):
+            return self.columns[column][start:end] == 1
+
+        visible = self.countries.is_player[start:end] | np.isin(
+            self.columns[country_data_columns.ATTITUDE_COLUMN][start:end],
+            _REVEALING_ATTITUDES[visibility],
+        )
+        if visibility == "tech":
+            visible |= flag("has_research_agreement_with_player")
+        elif visibility == "economic":
+            visible |= flag("has_sensor_link_with_player")
+        elif visibility == "military":
+            visible |= (
+                flag("has_sensor_link_with_player")
+                | flag("has_defensive_pact_with_player")
+                | flag("has_federation_with_player")
+            )
+        if show_everything:
+            visible |= ~self.countries.is_hidden[start:end]
+        if not config.CONFIG.show_all_country_types:
+            visible &= self.countries.is_default_type[start:end]
+        return visible
+
+    def get_player_key(self, date_index: int) -> Optional[Tuple[int, int]]:
+        """Return the date and country ID of the perspective country's row, if there is one."""
+        row = self.player_rows[date_index]
+        if row < 0:
+            return None
+        return self.dates[date_index], int(self.columns["country_id"][row])
+
+    def get_player_value(self, date_index: int, column: str) -> Optional[float]:
+        value = float(self.columns[column][self.player_rows[date_index]])
+        return None if np.isnan(value) else value
+
+    @functools.cached_property
+    def player_budgets(self) -> "BudgetTable":
+        return BudgetTable.load(self.game_name, self.dates, self._player_keys)
+
+    @functools.cached_property
+    def budgets(self) -> "BudgetTable":
+        """The budgets of all countries, not only of the perspective country."""
+        return BudgetTable.load(self.game_name, self.dates)
+
+    def get_pop_stats(self, model) -> "PopStatsTable":
+        if model not in self._pop_stats:
+            self._pop_stats[model] = PopStatsTable.load(
+                self.game_name, model, self.dates, self._player_keys
+            )
+        return self._pop_stats[model]
+
+    @functools.cached_property
+    def galactic_market(self) -> Dict[int, List[Tuple[int, float]]]:
+        """The availability and fluctuation of each galactic market resource by date, ordered by resource index."""
+        market = defaultdict(list)
+        with datamodel.get_db_session(self.game_name) as session:
+            rows = (
+                session.query(
+                    datamodel.GameState.date,
+                    datamodel.GalacticMarketResource.resource_index,
+                    datamodel.GalacticMarketResource.availability,
+                    datamodel.GalacticMarketResource.fluctuation,
+                )
+                .join(datamodel.GalacticMarketResource.game_state)
+                .filter(datamodel.GameState.date.between(self.dates[0], self.dates[-1]))
+                .all()
+            )
+        for date, resource_index, availability, fluctuation in sorted(
+            rows, key=lambda row: (row[0], row[1])
+        ):
+            market[date].append((availability, fluctuation))
+        return market
+
+    @functools.cached_property
+    def internal_market(self) -> Dict[Tuple[int, int], Dict[str, float]]:
+        """The fluctuation of the perspective country's internal market resources, by date and country ID."""
+        market = defaultdict(dict)
+        with datamodel.get_db_session(self.game_name) as session:
+            rows = (
+                session.query(
+                    datamodel.InternalMarketResource.internal_market_resource_id,
+                    datamodel.CountryData.date,
+                    datamodel.CountryData.country_id,
+                    datamodel.SharedDescription.text,
+                    datamodel.InternalMarketResource.fluctuation,
+                )
+                .join(datamodel.InternalMarketResource.country_data)
+                .join(datamodel.InternalMarketResource.resource_name)
+                .filter(self._player_condition())
+                .all()
+            )
+        for _, date, country_id, resource_name, fluctuation in sorted(rows):
+            if (date, country_id) in self._player_keys:
+                market[date, country_id].setdefault(resource_name, fluctuation)
+        return market
+
+    @functools.cached_property
+    def _player_keys(self) -> Set[Tuple[int, int]]:
+        keys = (self.get_player_key(i) for i in range(len(self.dates)))
+        return {key for key in keys if key is not None}
+
+    def _player_condition(self):
+        return _country_data_condition(self.dates, self._player_keys)
+
+
+class GamestateContext:
+    """
+    The data of a single gamestate which is shared by the data containers: the row of the perspective country,
+    the rows of the visible countries, and the budget and pop stats of the perspective country. They are
+    computed once per gamestate instead of once per container.
+    """
+
+    def __init__(self, tables: PlotDataTables, date_index: int):
+        self.tables = tables
+        self.date_index = date_index
+        self.date = tables.dates[date_index]
+        # the date and country ID of the perspective country, or None if it has no data for this gamestate
+        self.player_key = tables.get_player_key(date_index)
+        self._visible_rows: Dict[Tuple[str, bool], np.ndarray] = {}
+        self._pop_stats: Dict[Any, Tuple[List[str], Dict[str, np.ndarray]]] = {}
+
+    def get_player_value(self, column: str) -> Optional[float]:
+        return self.tables.get_player_value(self.date_index, column)
+
+    @functools.cached_property
+    def player_budget(self) -> Optional[Tuple[List[str], np.ndarray]]:
+        """The item names and values of the perspective country's budget, see BudgetTable."""
+        return self.tables.player_budgets.get(*self.player_key)
+
+    def get_player_pop_stats(self, model) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Return the trace names and the value arrays of the perspective country's rows in the PopStats table."""
+        if model not in self._pop_stats:
+            pop_stats = self.tables.get_pop_stats(model)
+            start, end = pop_stats.rows_for(*self.player_key)
+            self._pop_stats[model] = (
+                pop_stats.keys[start:end],
+                {name: values[start:end] for name, values in pop_stats.values.items()},
+            )
+        return self._pop_stats[model]
+
+    def get_visible_rows(self, visibility: str, show_everything: bool) -> np.ndarray:
+        """Return the rows of the countries which are visible at the visibility level, see PlotDataTables.get_visibility_mask."""
+        key = (visibility, show_everything)
+        if key not in self._visible_rows:
+            range_start, _ = self.tables.row_range
+            start, end = self.tables.columns.rows_for_date(self.date)
+            mask = self.tables.get_visibility_mask(visibility, show_everything)
+            self._visible_rows[key] = start + np.flatnonzero(
+                mask[start - range_start : end - range_start]
+            )
+        return self._visible_rows[key]
+
+
+def _country_data_condition(dates: List[int], keys: Optional[Set[Tuple[int, int]]]):
+    """Select the CountryData rows in the date range, optionally only those of the countries in keys."""
+    condition = datamodel.CountryData.date.between(dates[0], dates[-1])
+    if keys is not None:
+        condition &= datamodel.CountryData.country_id.in_(
+            {country_id for _, country_id in keys}
+        )
+    return condition
+
+
+def _get_wanted_keys(
+    dates: List[int], keys: Optional[Set[Tuple[int, int]]]
+) -> Callable[[int, int], bool]:
+    selected = set(dates)
+    if keys is None:
+        return lambda date, country_id: date in selected
+    return lambda date, country_id: (date, country_id) in keys
+
+
+@dataclasses.dataclass
+class CountryColumnInfo:
+    """
+    Attributes of the country of each row in country_data_columns.CountryDataColumns. The PlotDataManager keeps
+    the info between updates, and it is only extended with the rows which were added to the columns since.
+    """
+
+    names: List[str]
+    country_ids_in_game: np.ndarray
+    is_player: np.ndarray
+    is_default_type: np.ndarray
+    is_hidden: np.ndarray
+    # the date and country ID columns of the covered rows, to check that the columns still start with them
+    dates: np.ndarray = dataclasses.field(repr=False)
+    country_ids: np.ndarray = dataclasses.field(repr=False)
+    # the in-game ID and whether the country has the default type, which do not change for a country
+    _static_by_id: Dict[int, Tuple[int, bool]] = dataclasses.field(repr=False)
+
+    @classmethod
+    def load(
+        cls,
+        game_name: str,
+        columns: country_data_columns.CountryDataColumns,
+        previous: Optional["CountryColumnInfo"] = None,
+    ) -> "CountryColumnInfo":
+        """
+        Return the info for the rows of the columns. If the columns start with the rows of the previous info,
+        only the remaining rows are added. The name, player flag and visibility can change between gamestates
+        (e.g. when the player meets a country), so they are queried for the countries of the new rows.
+        """
+        if previous is None or not previous._covers_start_of(columns):
+            previous = cls._empty()
+        num_known = len(previous.country_ids)
+        dates = columns["date"][num_known:]
+        country_ids = columns["country_id"][num_known:]
+        static_by_id = previous._static_by_id
+        current_by_id = {}
+        if len(country_ids):
+            current_by_id, new_static_by_id = cls._query_info(
+                game_name,
+                set(np.unique(country_ids).tolist()),
+                static_by_id.keys(),
+                everything=not num_known,
+            )
+            if new_static_by_id:
+                static_by_id = {**static_by_id, **new_static_by_id}
+        current = [current_by_id[c_id] for c_id in country_ids.tolist()]
+        static = [static_by_id[c_id] for c_id in country_ids.tolist()]
+        return cls(
+            names=previous.names + [row[0] for row in current],
+            country_ids_in_game=cls._extend(
+                previous.country_ids_in_game, [row[0] for row in static], np.int64
+            ),
+            is_player=cls._extend(
+                previous.is_player, [row[1] for row in current], bool
+            ),
+            is_default_type=cls._extend(
+                previous.is_default_type, [row[1] for row in static], bool
+            ),
+            is_hidden=cls._extend(
+                previous.is_hidden, [row[2] for row in current], bool
+            ),
+            dates=np.concatenate([previous.dates, dates]),
+            country_ids=np.concatenate([previous.country_ids, country_ids]),
+            _static_by_id=static_by_id,
+        )
+
+    @classmethod
+    def _empty(cls) -> "CountryColumnInfo":
+        return cls(
+            names=[],
+            country_ids_in_game=np.zeros(0, dtype=np.int64),
+            is_player=np.zeros(0, dtype=bool),
+            is_default_type=np.zeros(0, dtype=bool),
+            is_hidden=np.zeros(0, dtype=bool),
+            dates=np.zeros(0, dtype=np.int64),
+            country_ids=np.zeros(0, dtype=np.int64),
+            _static_by_id={},
+        )
+
+    @staticmethod
+    def _query_info(
+        game_name: str,
+        country_ids: Set[int],
+        known_static_ids: Iterable[int],
+        everything: bool,
+    ) -> Tuple[Dict[int, Tuple[str, bool, bool]], Dict[int, Tuple[int, bool]]]:
+        """
+        Return the current name, player flag and visibility of the countries, and the static attributes
+        of those countries which are not in known_static_ids.
+        """
+        missing_static = country_ids - set(known_static_ids)
+        loaded_columns = [
+            datamodel.Country.country_name,
+            datamodel.Country.country_id_in_game,
+            datamodel.Country.is_player,
+            datamodel.Country.is_other_player,
+            datamodel.Country.first_player_contact_date,
+        ]
+        if missing_static:
+            loaded_columns.append(datamodel.Country.country_type)
+        current_by_id = {}
+        static_by_id = {}
+        with datamodel.get_db_session(game_name) as session:
+            query = session.query(datamodel.Country).options(load_only(*loaded_columns))
+            if not everything:
+                query = query.filter(datamodel.Country.country_id.in_(country_ids))
+            for c in query:
+                current_by_id[c.country_id] = (
+                    c.rendered_name,
+                    bool(c.is_player),
+                    c.is_hidden_country(),
+                )
+                if c.country_id in missing_static:
+                    static_by_id[c.country_id] = (
+                        (
+                            c.country_id_in_game
+                            if c.country_id_in_game is not None
+                            else -1
+                        ),
+                        c.country_type == "default",
+                    )
+        return current_by_id, static_by_id
+
+    @staticmethod
+    def _extend(values: np.ndarray, new_values: List, dtype) -> np.ndarray:
+        return np.concatenate([values, np.array(new_values, dtype=dtype)])
+
+    def _covers_start_of(
+        self, columns: country_data_columns.CountryDataColumns
+    ) -> bool:
+        # the columns are rebuilt from scratch e.g. after gamestates were removed, and then the rows can move
+        num_rows = len(self.country_ids)
+        return (
+            num_rows <= len(columns)
+            and np.array_equal(self.dates, columns["date"][:num_rows])
+            and np.array_equal(self.country_ids, columns["country_id"][:num_rows])
+        )
+
+
+class BudgetTable:
+    """
+    The budgets of CountryData rows by date and country ID. Each budget consists of the names of its items
+    and a matrix with the net income of each item (rows) for each resource in datamodel.BUDGET_RESOURCES (columns).
+    """
+
+    def __init__(self, budgets: Dict[Tuple[int, int], Tuple[List[str], np.ndarray]]):
+        self._budgets = budgets
+
+    def get(self, date: int, country_id: int) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Return the budget of the country on the given date, or None if the country has no budget."""
+        return self._budgets.get((date, country_id))
+
+    @classmethod
+    def load(
+        cls,
+        game_name: str,
+        dates: List[int],
+        keys: Optional[Set[Tuple[int, int]]] = None,
+    ) -> "BudgetTable":
+        """Load the budgets of the given dates, optionally only those identified by keys."""
+        is_wanted = _get_wanted_keys(dates, keys)
+        condition = _country_data_condition(dates, keys)
+        budgets = {}
+        with datamodel.get_db_session(game_name) as session:
+            packed = [
+                (
+                    date,
+                    country_id,
+                    np.frombuffer(description_ids, dtype=np.int32),
+                    values,
+                )
+                for date, country_id, description_ids, values in session.query(
+                    datamodel.CountryData.date,
+                    datamodel.CountryData.country_id,
+                    datamodel.PackedBudget.description_ids,
+                    datamodel.PackedBudget.values,
+                )
+                .join(datamodel.PackedBudget.country_data)
+                .filter(condition)
+                if is_wanted(date, country_id)
+            ]
+            description_ids = {
+                int(d) for _, _, ids, _ in packed for d in np.unique(ids)
+            }
+            names = {}
+            if description_ids:
+                names = dict(
+                    session.query(
+                        datamodel.SharedDescription.description_id,
+                        datamodel.SharedDescription.text,
+                    ).filter(
+                        datamodel.SharedDescription.description_id.in_(description_ids)
+                    )
+                )
+            # Budgets that were stored before the PackedBudget table existed consist of BudgetItem rows
+            legacy_items = (
+                session.query(
+                    datamodel.BudgetItem.budget_item_id,
+                    datamodel.CountryData.date,
+                    datamodel.CountryData.country_id,
+                    datamodel.SharedDescription.text,
+                    *[
+                        getattr(datamodel.BudgetItem, f"net_{resource}")
+                        for resource in datamodel.BUDGET_RESOURCES
+                    ],
+                )
+                .join(datamodel.BudgetItem.country_data)
+                .join(datamodel.BudgetItem.db_budget_item_name)
+                .filter(condition)
+                .all()
+            )
+        for date, country_id, ids, values in packed:
+            budgets[date, country_id] = (
+                [names[d] for d in ids.tolist()],
+                np.frombuffer(values, dtype=np.float32).reshape(
+                    len(ids), len(datamodel.BUDGET_RESOURCES)
+                ),
+            )
+        legacy_budgets = defaultdict(list)
+        for _, date, country_id, name, *values in sorted(legacy_items):
+            if is_wanted(date, country_id) and (date, country_id) not in budgets:
+                legacy_budgets[date, country_id].append((name, values))
+        for key, items in legacy_budgets.items():
+            budgets[key] = (
+                [name for name, _ in items],
+                np.array([values for _, values in items], dtype=np.float64),
+            )
+        return cls(budgets)
+
+
+# For each PopStats table: the relationship to the object from which the name of each trace is rendered,
+# the columns used for rendering the name, and the rendering function
+_POP_STATS_KEYS = {
+    datamodel.PopStatsBySpecies: (
+        datamodel.PopStatsBySpecies.species,
+        [datamodel.Species.species_name, datamodel.Species.species_id_in_game],
+        lambda name, id_in_game: f"{game_info.render_name(name)} ({id_in_game})",
+    ),
+    datamodel.PopStatsByFaction: (
+        datamodel.PopStatsByFaction.faction,
+        [datamodel.PoliticalFaction.faction_name],
+        game_info.render_name,
+    ),
+    datamodel.PopStatsByJob: (
+        datamodel.PopStatsByJob.db_job_description,
+        [datamodel.SharedDescription.text],
+        str,
+    ),
+    datamodel.PopStatsByStratum: (
+        datamodel.PopStatsByStratum.db_stratum_description,
+        [datamodel.SharedDescription.text],
+        str,
+    ),
+    datamodel.PopStatsByEthos: (
+        datamodel.PopStatsByEthos.db_ethos_description,
+        [datamodel.SharedDescription.text],
+        str,
+    ),
+    datamodel.PlanetStats: (
+        datamodel.PlanetStats.planet,
+        [datamodel.Planet.planet_name, datamodel.Planet.planet_id_in_game],
+        lambda name, id_in_game: f"{game_info.render_name(name)} ({id_in_game})",
+    ),
+}
+
+
+class PopStatsTable:
+    """
+    The rows of one PopStats table by date and country ID: the trace name of each row, and an array
+    for each value column, e.g. "pop_count" or "happiness", with NaN for missing values.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        values: Dict[str, np.ndarray],
+        row_ranges: Dict[Tuple[int, int], Tuple[int, int]],
+    ):
+        self.keys = keys
+        self.values = values
+        self._row_ranges = row_ranges
+
+    def rows_for(self, date: int, country_id: int) -> Tuple[int, int]:
+        """Return the start and end index of the rows of the country on the given date."""
+        return self._row_ranges.get((date, country_id), (0, 0))
+
+    @classmethod
+    def load(
+        cls,
+        game_name: str,
+        model,
+        dates: List[int],
+        keys: Optional[Set[Tuple[int, int]]] = None,
+    ) -> "PopStatsTable":
+        key_relationship, key_columns, render_key = _POP_STATS_KEYS[model]
+        value_columns = [
+            column
+            for column in model.__table__.columns
+            if not column.primary_key and not column.foreign_keys
+        ]
+        (primary_key,) = model.__table__.primary_key.columns
+        is_wanted = _get_wanted_keys(dates, keys)
+        with datamodel.get_db_session(game_name) as session:
+            rows = (
+                session.query(
+                    datamodel.CountryData.date,
+                    datamodel.CountryData.country_id,
+                    primary_key,
+                    *key_columns,
+                    *value_columns,
+                )
+                .join(model.country_data)
+                .join(key_relationship)
+                .filter(_country_data_condition(dates, keys))
+                .all()
+            )
+        rows = sorted(row for row in rows if is_wanted(row[0], row[1]))
+
+        num_key_columns = len(key_columns)
+        rendered_keys = {}
+        row_keys = []
+        row_ranges = {}
+        for index, (date, country_id, _, *columns) in enumerate(rows):
+            key_values = tuple(columns[:num_key_columns])
+            if key_values not in rendered_keys:
+                rendered_keys[key_values] = render_key(*key_values)
+            row_keys.append(rendered_keys[key_values])
+            start, _ = row_ranges.get((date, country_id), (index, index))
+            row_ranges[date, country_id] = (start, index + 1)
+        values = {
+            column.name: np.array(
+                [row[3 + num_key_columns + i] for row in rows], dtype=np.float64
+            )
+            for i, column in enumerate(value_columns)
+        }
+        return cls(keys=row_keys, values=values, row_ranges=row_ranges)
+
+
+def _lttb_indices(x: np.ndarray, y: np.ndarray, num_points: int) -> np.ndarray:
+    """
+    Select num_points indices of the points (x, y) with the Largest-Triangle-Three-Buckets algorithm: The
+    first and last points are kept, and the others are split into equally sized buckets. From each bucket,
+    the point which forms the largest triangle with the point selected from the previous bucket and the
+    average of the next bucket is selected.
+    """
+    num_points = max(num_points, 3)
+    if len(x) <= num_points:
+        return np.arange(len(x))
+    bucket_bounds = np.linspace(1, len(x) - 1, num_points - 1).astype(int)
+    # the average point of each bucket, including the last point as a bucket of its own
+    bucket_sizes = np.diff(np.append(bucket_bounds, len(x)))
+    mean_x = np.add.reduceat(x, bucket_bounds) / bucket_sizes
+    mean_y = np.add.reduceat(y, bucket_bounds) / bucket_sizes
+    indices = np.empty(num_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = len(x) - 1
+    previous = 0
+    for bucket in range(num_points - 2):
+        start, end = bucket_bounds[bucket], bucket_bounds[bucket + 1]
+        bucket_x, bucket_y = x[start:end], y[start:end]
+        next_x, next_y = mean_x[bucket + 1], mean_y[bucket + 1]
+        # twice the triangle areas, the constant factor does not change the maximum
+        areas = np.abs(
+            (x[previous] - next_x) * (bucket_y - y[previous])
+            - (x[previous] - bucket_x) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def _lttb_indices_with_gaps(
+    x: np.ndarray, y: np.ndarray, num_points: int
+) -> np.ndarray:
+    """
+    Downsample the points which have a value, and keep the first NaN after each of them, such that
+    the gaps in the trace are still shown.
+    """
+    is_valid = ~np.isnan(y)
+    valid_indices = np.flatnonzero(is_valid)
+    selected = valid_indices[
+        _lttb_indices(x[valid_indices], y[valid_indices], num_points)
+    ]
+    gap_starts = np.flatnonzero(~is_valid[1:] & is_valid[:-1]) + 1
+    return np.union1d(selected, gap_starts)
 
 
 class AbstractPlotDataContainer(abc.ABC):
+    """
+    Stores one series of values per key, e.g. per country, sharing the list of dates.
+
+    The values are stored in a matrix with one row per key and one column per date. Rows and columns
+    are preallocated and grown geometrically, and each new column is filled with DEFAULT_VAL, such that
+    keys without a value for a date are padded without touching the other keys.
+    """
+
     DEFAULT_VAL = float("nan")
+    INITIAL_CAPACITY = 16
 
     def __init__(self, country_perspective: Optional[int], **kwargs):
-        self.dates: List[float] = []
-        self.data_dict: Dict[str, List[float]] = {}
+        self._dates = np.empty(self.INITIAL_CAPACITY)
+        self._values = np.empty((self.INITIAL_CAPACITY, self.INITIAL_CAPACITY))
+        self._num_dates = 0
+        self._key_rows: Dict[str, int] = {}
+        # the column of the latest value of each row, to detect duplicate values
+        self._last_columns: List[int] = []
         self._country_perspective = country_perspective
+        # the last date read from the database, see PlotDataManager
+        self.last_date = -float("inf")
 
-    def iterate_traces(self) -> Iterable[Tuple[str, List[int], List[float]]]:
-        for key, values in self.data_dict.items():
-            yield key, self.dates, values
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[: self._num_dates]
 
-    def _add_new_value_to_data_dict(self, key, new_val, default_val=DEFAULT_VAL):
-        if key not in self.data_dict:
-            if new_val == default_val:
+    @property
+    def nbytes(self) -> int:
+        return self._dates.nbytes + self._values.nbytes
+
+    def iterate_traces(
+        self, num_points: int = 0, shared_dates: bool = False
+    ) -> Iterable[Tuple[str, List[int], List[float]]]:
+        """
+        Yield the key, dates and values of each trace. If num_points is positive, traces with more dates are
+        downsampled with the Largest-Triangle-Three-Buckets algorithm, which keeps spikes in the data. With
+        shared_dates, e.g. for stacked plots, all traces are downsampled at the same dates, which are chosen
+        from the sum of the absolute values of all traces.
+        """
+        dates = self.dates
+        values = self._values[: len(self._key_rows), : self._num_dates]
+        if num_points <= 0 or self._num_dates <= num_points:
+            date_list = dates.tolist()
+            for key, row in self._key_rows.items():
+                yield key, date_list, values[row].tolist()
+        elif shared_dates:
+            indices = _lttb_indices(
+                dates, np.nansum(np.abs(values), axis=0), num_points
+            )
+            date_list = dates[indices].tolist()
+            for key, row in self._key_rows.items():
+                yield key, date_list, values[row, indices].tolist()
+        else:
+            for key, row in self._key_rows.items():
+                indices = _lttb_indices_with_gaps(dates, values[row], num_points)
+                yield key, dates[indices].tolist(), values[row, indices].tolist()
+
+    def _append_date(self, date: int):
+        if self._num_dates == self._values.shape[1]:
+            self._values = self._grow(self._values, axis=1)
+            self._dates = self._grow(self._dates, axis=0)
+        self._dates[self._num_dates] = date / 360.0
+        self._values[: len(self._key_rows), self._num_dates] = self.DEFAULT_VAL
+        self._num_dates += 1
+
+    def _add_new_value(self, key: str, new_val: float):
+        """Set the value of the key for the latest date."""
+        column = self._num_dates - 1
+        row = self._key_rows.get(key)
+        if row is None:
+            if new_val == self.DEFAULT_VAL:
                 return
-            self.data_dict[key] = [default_val for _ in range(len(self.dates) - 1)]
-        if len(self.data_dict[key]) >= len(self.dates):
+            row = len(self._key_rows)
+            if row == self._values.shape[0]:
+                self._values = self._grow(self._values, axis=0)
+            self._key_rows[key] = row
+            self._last_columns.append(column)
+            self._values[row, : self._num_dates] = self.DEFAULT_VAL
+        elif self._last_columns[row] == column:
             logger.info(
                 f"{self.__class__.__qualname__} Ignoring duplicate value for {key}."
             )
             return
-        self.data_dict[key].append(new_val)
+        self._values[row, column] = new_val
+        self._last_columns[row] = column
 
-    def _pad_data_dict(self, default_val=DEFAULT_VAL):
-        # Pad every dict with the default value if no real value was added, to keep them consistent with the dates list
-        for key in self.data_dict:
-            while len(self.data_dict[key]) < len(self.dates):
-                self.data_dict[key].append(default_val)
+    @staticmethod
+    def _grow(array: np.ndarray, axis: int) -> np.ndarray:
+        shape = list(array.shape)
+        shape[axis] *= 2
+        grown = np.empty(shape, dtype=array.dtype)
+        grown[tuple(slice(0, n) for n in array.shape)] = array
+        return grown
 
     @abc.abstractmethod
-    def extract_data_from_gamestate(self, gs: datamodel.GameState):
+    def extract_data_from_gamestate(self, context: GamestateContext):
         pass
 
 
 class AbstractPerCountryDataContainer(AbstractPlotDataContainer, abc.ABC):
-    def extract_data_from_gamestate(self, gs: datamodel.GameState):
-        added_new_val = False
-        self.dates.append(gs.date / 360.0)
-        for cd in gs.country_data:
-            country_name = cd.country.rendered_name
-            try:
-                if (
-                    not config.CONFIG.show_all_country_types
-                    and cd.country.country_type != "default"
-                ):
-                    continue
-                new_val = self._get_value_from_countrydata(cd)
-                if new_val is not None:
-                    added_new_val = True
-                    self._add_new_value_to_data_dict(
-                        country_name, new_val, default_val=self.DEFAULT_VAL
-                    )
-            except Exception as e:
-                logger.exception(country_name)
-        if not added_new_val:
-            self.dates.pop()  # if nothing was added, we don't need to remember the date.
-        self._pad_data_dict(default_val=self.DEFAULT_VAL)
+    """Plots one value for each country which is visible at the VISIBILITY level."""
+
+    # one of "geography", "tech", "economic" or "military", see PlotDataTables.get_visibility_mask
+    VISIBILITY: str = None
+
+    def extract_data_from_gamestate(self, context: GamestateContext):
+        rows = context.get_visible_rows(self.VISIBILITY, self._show_everything())
+        values = self._get_values(context, rows)
+        is_valid = ~np.isnan(values)
+        if not is_valid.any():
+            return  # if nothing was added, we don't need to remember the date.
+        self._append_date(context.date)
+        names = context.tables.countries.names
+        for row, value in zip(rows[is_valid].tolist(), values[is_valid].tolist()):
+            self._add_new_value(names[row], value)
+
+    def _show_everything(self) -> bool:
+        return False
 
     @abc.abstractmethod
-    def _get_value_from_countrydata(
-        self, cd: datamodel.CountryData
-    ) -> Union[None, float]:
+    def _get_values(self, context: GamestateContext, rows: np.ndarray) -> np.ndarray:
+        """Return the values of the given rows of the CountryData columns, NaN values are not plotted."""
         pass
 
 
-def _override_visibility(cd: datamodel.CountryData):
-    return not cd.country.is_hidden_country() and config.CONFIG.show_everything
+# Attitudes which reveal the information of each visibility level, see the show_*_info methods of CountryData
+_REVEALING_ATTITUDES = {
+    "geography": [a.value for a in datamodel.Attitude if a.is_known()],
+    "tech": [a.value for a in datamodel.Attitude if a.reveals_technology_info()],
+    "economic": [a.value for a in datamodel.Attitude if a.reveals_economy_info()],
+    "military": [a.value for a in datamodel.Attitude if a.reveals_military_info()],
+}
 
 
-class PlanetCountDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_geography_info():
-            return cd.owned_planets
+class AbstractCountryDataColumnContainer(AbstractPerCountryDataContainer, abc.ABC):
+    """Plots the sum of the CountryData COLUMNS for every country whose information is visible."""
 
+    COLUMNS: List[str] = []
 
-class SystemCountDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_geography_info():
-            return cd.controlled_systems
+    def _get_values(self, context: GamestateContext, rows: np.ndarray) -> np.ndarray:
+        range_start, _ = context.tables.row_range
+        return context.tables.get_column_sum(tuple(self.COLUMNS))[rows - range_start]
 
+    def _show_everything(self) -> bool:
+        return config.CONFIG.show_everything
 
-class TotalEnergyIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_energy
 
+class PlanetCountDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["owned_planets"]
+    VISIBILITY = "geography"
 
-class TotalMineralsIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_minerals
 
+class SystemCountDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["controlled_systems"]
+    VISIBILITY = "geography"
 
-class TotalAlloysIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_alloys
 
+class TotalEnergyIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_energy"]
+    VISIBILITY = "economic"
 
-class TotalConsumerGoodsIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_consumer_goods
 
+class TotalMineralsIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_minerals"]
+    VISIBILITY = "economic"
 
-class TotalTradeIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_trade
 
+class TotalAlloysIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_alloys"]
+    VISIBILITY = "economic"
 
-class TotalFoodIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_food
 
+class TotalConsumerGoodsIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_consumer_goods"]
+    VISIBILITY = "economic"
 
-class TotalBiomassIncomeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.net_biomass
 
+class TotalTradeIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_trade"]
+    VISIBILITY = "economic"
 
-class EmpireSizeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_economic_info():
-            return cd.empire_size
 
+class TotalFoodIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_food"]
+    VISIBILITY = "economic"
 
-class TechCountDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_tech_info():
-            return cd.tech_count
 
+class TotalBiomassIncomeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["net_biomass"]
+    VISIBILITY = "economic"
 
-class ExploredSystemsCountDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_tech_info():
-            return cd.exploration_progress
 
+class EmpireSizeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["empire_size"]
+    VISIBILITY = "economic"
 
-class TotalScienceOutputDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_tech_info():
-            return (
-                cd.net_physics_research
-                + cd.net_society_research
-                + cd.net_engineering_research
-            )
 
+class TechCountDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["tech_count"]
+    VISIBILITY = "tech"
 
-class FleetSizeDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_military_info():
-            return cd.fleet_size
 
+class ExploredSystemsCountDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["exploration_progress"]
+    VISIBILITY = "tech"
 
-class MilitaryPowerDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_military_info():
-            return cd.military_power
 
+class TotalScienceOutputDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = [
+        "net_physics_research",
+        "net_society_research",
+        "net_engineering_research",
+    ]
+    VISIBILITY = "tech"
 
-class VictoryScoreDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_geography_info():
-            return cd.victory_score
 
+class FleetSizeDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["fleet_size"]
+    VISIBILITY = "military"
 
-class EconomyScoreDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_geography_info():
-            return cd.economy_power
 
+class MilitaryPowerDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["military_power"]
+    VISIBILITY = "military"
 
-class VictoryRankDataContainer(AbstractPerCountryDataContainer):
-    def _get_value_from_countrydata(self, cd: datamodel.CountryData):
-        if _override_visibility(cd) or cd.show_geography_info():
-            return cd.victory_rank
 
+class VictoryScoreDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["victory_score"]
+    VISIBILITY = "geography"
+
+
+class EconomyScoreDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["economy_power"]
+    VISIBILITY = "geography"
+
+
+class VictoryRankDataContainer(AbstractCountryDataColumnContainer):
+    COLUMNS = ["victory_rank"]
+    VISIBILITY = "geography"
 
-class AbstractPlayerInfoDataContainer(AbstractPlotDataContainer, abc.ABC):
-    def extract_data_from_gamestate(self, gs: datamodel.GameState):
-        player_cd = self._get_player_countrydata(gs)
 
-        if player_cd is None or not self._include(player_cd):
+class AbstractPlayerInfoDataContainer(AbstractPlotDataContainer, abc.ABC):
+    def extract_data_from_gamestate(self, context: GamestateContext):
+        if context.player_key is None or not self._include(context):
             return
 
-        self.dates.append(gs.date / 360.0)
+        self._append_date(context.date)
         try:
-            for key, new_val in self._iterate_budgetitems(player_cd):
+            for key, new_val in self._iterate_budgetitems(context):
                 if new_val is not None:
-                    self._add_new_value_to_data_dict(
-                        key, new_val, default_val=self.DEFAULT_VAL
-                    )
+                    self._add_new_value(key, new_val)
         except Exception as e:
-            logger.exception(player_cd.country.rendered_country_name)
-        self._pad_data_dict(self.DEFAULT_VAL)
-
-    def _get_player_countrydata(self, gs: datamodel.GameState) -> datamodel.CountryData:
-        player_cd = None
-        for cd in gs.country_data:
-            if cd.country.is_hidden_country():
-                continue
-            if (
-                self._country_perspective is None and cd.country.is_player
-            ) or cd.country.country_id_in_game == self._country_perspective:
-                player_cd = cd
-                break
-        return player_cd
+            logger.exception(
+                f"{self.__class__.__qualname__} {datamodel.days_to_date(context.date)}"
+            )
 
     @abc.abstractmethod
     def _iterate_budgetitems(
-        self, cd: datamodel.CountryData
+        self, context: GamestateContext
     ) -> Iterable[Tuple[str, float]]:
         pass
 
-    def _include(self, player_cd: datamodel.CountryData) -> bool:
+    def _include(self, context: GamestateContext) -> bool:
         return True
 
 
@@ -485,25 +1293,28 @@ class ScienceOutputByFieldDataContainer(AbstractPlayerInfoDataContainer):
     DEFAULT_VAL = 0.0
 
     def _iterate_budgetitems(
-        self, cd: datamodel.CountryData
+        self, context: GamestateContext
     ) -> Iterable[Tuple[str, float]]:
-        yield "Physics", cd.net_physics_research
-        yield "Society", cd.net_society_research
-        yield "Engineering", cd.net_engineering_research
+        yield "Physics", context.get_player_value("net_physics_research")
+        yield "Society", context.get_player_value("net_society_research")
+        yield "Engineering", context.get_player_value("net_engineering_research")
 
 
 class FleetCompositionDataContainer(AbstractPlayerInfoDataContainer):
     DEFAULT_VAL = 0.0
 
     def _iterate_budgetitems(
-        self, cd: datamodel.CountryData
+        self, context: GamestateContext
     ) -> Iterable[Tuple[str, float]]:
-        yield "corvettes", cd.ship_count_corvette
-        yield "destroyers", cd.ship_count_destroyer * 2
-        yield "cruisers", cd.ship_count_cruiser * 4
-        yield "battleships", cd.ship_count_battleship * 8
-        yield "titans", cd.ship_count_titan * 16
-        yield "colossi", cd.ship_count_colossus * 32
+        def ship_count(ship_class):
+            return context.get_player_value(f"ship_count_{ship_class}")
+
+        yield "corvettes", ship_count("corvette")
+        yield "destroyers", ship_count("destroyer") * 2
+        yield "cruisers", ship_count("cruiser") * 4
+        yield "battleships", ship_count("battleship") * 8
+        yield "titans", ship_count("titan") * 16
+        yield "colossi", ship_count("colossus") * 32
 
 
 class MarketPriceDataContainer(AbstractPlayerInfoDataContainer):
@@ -518,51 +1329,51 @@ class MarketPriceDataContainer(AbstractPlayerInfoDataContainer):
         self.resource_index = resource_index
 
     def _iterate_budgetitems(
-        self, cd: datamodel.CountryData
+        self, context: GamestateContext
     ) -> Iterable[Tuple[str, float]]:
-        gs = cd.game_state
-        if cd.has_galactic_market_access:
-            yield from self._iter_galactic_market_price(gs, cd)
+        if context.get_player_value("has_galactic_market_access"):
+            yield from self._iter_galactic_market_price(
+                context.date, context.tables.galactic_market.get(context.date, [])
+            )
         else:
-            yield from self._iter_internal_market_price(gs, cd)
+            yield from self._iter_internal_market_price(
+                context.date,
+                context.tables.internal_market.get(context.player_key, {}),
+            )
 
     def _iter_galactic_market_price(
-        self, gs: datamodel.GameState, cd: datamodel.CountryData
+        self, date: int, market_resources: List[Tuple[int, float]]
     ) -> Iterable[Tuple[str, float]]:
-        market_fee = self.get_market_fee(gs)
-        market_resources: List[datamodel.GalacticMarketResource] = sorted(
-            gs.galactic_market_resources, key=lambda r: r.resource_index
-        )
-        for res, res_data in zip(market_resources, config.CONFIG.market_resources):
-            if res_data["name"] == self.resource_name and res.availability != 0:
+        market_fee = self.get_market_fee(date)
+        for (availability, fluctuation), res_data in zip(
+            market_resources, config.CONFIG.market_resources
+        ):
+            if res_data["name"] == self.resource_name and availability != 0:
                 yield from self._get_resource_prices(
-                    market_fee, res_data["base_price"], res.fluctuation
+                    market_fee, res_data["base_price"], fluctuation
                 )
                 yield self.galactic_market_indicator_key, -0.001
                 yield self.internal_market_indicator_key, self.DEFAULT_VAL
                 break
 
-    def _iter_internal_market_price(
-        self, gs: datamodel.GameState, cd: datamodel.CountryData
-    ):
-        market_fee = self.get_market_fee(gs)
+    def _iter_internal_market_price(self, date: int, fluctuations: Dict[str, float]):
+        market_fee = self.get_market_fee(date)
         res_data = None
         for r in config.CONFIG.market_resources:
             if r["name"] == self.resource_name:
                 res_data = r
                 break
         if res_data is None:
-            logger.info(f"Could not find configuration for resource {self.resource_name}")
+            logger.info(
+                f"Could not find configuration for resource {self.resource_name}"
+            )
             return
         if res_data["base_price"] is None:
             return
 
         always_tradeable = ["energy", "minerals", "food", "consumer_goods", "alloys"]
         fluctuation = 0.0 if self.resource_name in always_tradeable else None
-        for resource in cd.internal_market_resources:
-            if resource.resource_name.text == self.resource_name:
-                fluctuation = resource.fluctuation
-                break
+        fluctuation = fluctuations.get(self.resource_name, fluctuation)
         if fluctuation is None:
             return
 
@@ -584,11 +1395,11 @@ class MarketPriceDataContainer(AbstractPlayerInfoDataContainer):
             yield f"{self.resource_name}_buy_price", buy_price
             yield f"{self.resource_name}_sell_price", sell_price
 
-    def get_market_fee(self, gs):
+    def get_market_fee(self, date: int):
         market_fees = config.CONFIG.market_fee
         current_fee = {"date": 0, "fee": 0.3}  # default
         for fee in sorted(market_fees, key=lambda f: f["date"]):
-            if datamodel.date_to_days(fee["date"]) > gs.date:
+            if datamodel.date_to_days(fee["date"]) > date:
                 break
             current_fee = fee
         market_fee = current_fee["fee"]
@@ -598,130 +1409,125 @@ class MarketPriceDataContainer(AbstractPlayerInfoDataContainer):
 class AbstractPlayerBudgetDataContainer(AbstractPlayerInfoDataContainer, abc.ABC):
     DEFAULT_VAL = 0.0
 
+    # one of datamodel.BUDGET_RESOURCES
+    RESOURCE = None
+
     def _iterate_budgetitems(
-        self, cd: datamodel.CountryData
+        self, context: GamestateContext
     ) -> Iterable[Tuple[str, float]]:
-        for budget_item in cd.budget:
-            val = self._get_value_from_budgetitem(budget_item)
-            if val == 0.0:
+        names, values = context.player_budget
+        column = values[:, datamodel.BUDGET_RESOURCES.index(self.RESOURCE)]
+        for name, val in zip(names, column.tolist()):
+            if val == 0.0 or np.isnan(val):
                 val = None
-            yield budget_item.name, val
-
-    @abc.abstractmethod
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem) -> float:
-        pass
+            yield name, val
 
-    def _include(self, player_cd):
-        return len(player_cd.budget) != 0
+    def _include(self, context: GamestateContext) -> bool:
+        return context.player_budget is not None
 
 
 class EnergyBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_energy
+    RESOURCE = "energy"
 
 
 class MineralsBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_minerals
+    RESOURCE = "minerals"
 
 
 class AlloysBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_alloys
+    RESOURCE = "alloys"
 
 
 class ConsumerGoodsBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_consumer_goods
+    RESOURCE = "consumer_goods"
 
 
 class TradeBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_trade
+    RESOURCE = "trade"
 
 
 class FoodBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_food
+    RESOURCE = "food"
 
 
 class VolatileMotesBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_volatile_motes
+    RESOURCE = "volatile_motes"
 
 
 class ExoticGasesBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_exotic_gases
+    RESOURCE = "exotic_gases"
 
 
 class RareCrystalsBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_rare_crystals
+    RESOURCE = "rare_crystals"
 
 
 class LivingMetalBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_living_metal
+    RESOURCE = "living_metal"
 
 
 class ZroBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_zro
+    RESOURCE = "zro"
 
 
 class DarkMatterBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_dark_matter
+    RESOURCE = "dark_matter"
 
 
 class NanitesBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_nanites
+    RESOURCE = "nanites"
 
 
 class MinorArtifactsBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_minor_artifacts
+    RESOURCE = "minor_artifacts"
 
 
 class AstralThreadsBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_astral_threads
+    RESOURCE = "astral_threads"
 
 
 class BiomassBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_biomass
+    RESOURCE = "biomass"
 
 
 class UnityBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_unity
+    RESOURCE = "unity"
 
 
 class InfluenceBudgetDataContainer(AbstractPlayerBudgetDataContainer):
-    def _get_value_from_budgetitem(self, bi: datamodel.BudgetItem):
-        return bi.net_influence
+    RESOURCE = "influence"
 
 
 class BudgetSumDataContainer(AbstractPerCountryDataContainer, abc.ABC):
     DEFAULT_VAL = float("nan")
+    VISIBILITY = "economic"
 
     def __init__(
         self,
-        function_from_budgetitem: Callable[[datamodel.BudgetItem], float],
+        resource: str,
+        function_from_budget_value: Callable[[float], float],
         country_perspective: Optional[int],
         **kwargs,
     ):
         super().__init__(country_perspective, **kwargs)
-        self.function_from_budgetitem = function_from_budgetitem
-
-    def _get_value_from_countrydata(
-        self, cd: datamodel.CountryData
-    ) -> Union[None, float]:
-        if cd.show_economic_info():
-            return sum(self.function_from_budgetitem(bi) for bi in cd.budget)
+        self.resource = resource
+        self.function_from_budget_value = function_from_budget_value
+
+    def _get_values(self, context: GamestateContext, rows: np.ndarray) -> np.ndarray:
+        resource_index = datamodel.BUDGET_RESOURCES.index(self.resource)
+        country_ids = context.tables.columns["country_id"][rows].tolist()
+        values = np.zeros(len(rows))
+        for i, country_id in enumerate(country_ids):
+            budget = context.tables.budgets.get(context.date, country_id)
+            if budget is not None:
+                _, budget_values = budget
+                values[i] = sum(
+                    map(
+                        self.function_from_budget_value,
+                        budget_values[:, resource_index].tolist(),
+                    )
+                )
+        return values
 
 
 PopStatsType = Union[
@@ -734,262 +1540,171 @@ PopStatsType = Union[
 
 
 class AbstractPopStatsDataContainer(AbstractPlayerInfoDataContainer, abc.ABC):
+    # one of the tables in PopStatsType, and the name of one of its value columns
+    POP_STATS = None
+    VALUE = None
+
     def _iterate_budgetitems(
-        self, cd: datamodel.CountryData
+        self, context: GamestateContext
     ) -> Iterable[Tuple[str, float]]:
-        for pop_stats in self._iterate_popstats(cd):
-            key = self._get_key_from_popstats(pop_stats)
-            val = self._get_value_from_popstats(pop_stats)
-            yield (key, val)
-
-    @abc.abstractmethod
-    def _iterate_popstats(self, cd: datamodel.CountryData) -> Iterable[PopStatsType]:
-        pass
-
-    @abc.abstractmethod
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        pass
-
-    @abc.abstractmethod
-    def _get_value_from_popstats(self, ps: PopStatsType) -> float:
-        pass
+        keys, values = context.get_player_pop_stats(self.POP_STATS)
+        for key, val in zip(keys, values[self.VALUE].tolist()):
+            yield key, None if np.isnan(val) else val
 
-    def _include(self, player_cd):
-        try:
-            next(self._iterate_popstats(player_cd))
-            return True
-        except StopIteration:
-            return False
+    def _include(self, context: GamestateContext) -> bool:
+        keys, _ = context.get_player_pop_stats(self.POP_STATS)
+        return len(keys) > 0
 
 
 class AbstractPopStatsBySpeciesDataContainer(AbstractPopStatsDataContainer, abc.ABC):
-    def _iterate_popstats(
-        self, cd: datamodel.CountryData
-    ) -> Iterable[datamodel.PopStatsBySpecies]:
-        return iter(cd.pop_stats_species)
-
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        assert isinstance(ps, datamodel.PopStatsBySpecies)
-        return f"{ps.species.rendered_name} ({ps.species.species_id_in_game})"
+    POP_STATS = datamodel.PopStatsBySpecies
 
 
 class SpeciesDistributionDataContainer(AbstractPopStatsBySpeciesDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsBySpecies):
-        return ps.pop_count
+    VALUE = "pop_count"
 
 
 class SpeciesHappinessDataContainer(AbstractPopStatsBySpeciesDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsBySpecies):
-        return ps.happiness
+    VALUE = "happiness"
 
 
 class SpeciesPowerDataContainer(AbstractPopStatsBySpeciesDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsBySpecies):
-        return ps.power
+    VALUE = "power"
 
 
 class SpeciesCrimeDataContainer(AbstractPopStatsBySpeciesDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsBySpecies):
-        return ps.crime
+    VALUE = "crime"
 
 
 class AbstractPopStatsByFactionDataContainer(AbstractPopStatsDataContainer, abc.ABC):
-    def _iterate_popstats(
-        self, cd: datamodel.CountryData
-    ) -> Iterable[datamodel.PopStatsByFaction]:
-        return iter(cd.pop_stats_faction)
-
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        assert isinstance(ps, datamodel.PopStatsByFaction)
-        return ps.faction.rendered_name
+    POP_STATS = datamodel.PopStatsByFaction
 
 
 class FactionDistributionDataContainer(AbstractPopStatsByFactionDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByFaction):
-        return ps.pop_count
+    VALUE = "pop_count"
 
 
 class FactionSupportDataContainer(AbstractPopStatsByFactionDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByFaction):
-        return ps.support
+    VALUE = "support"
 
 
 class FactionApprovalDataContainer(AbstractPopStatsByFactionDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByFaction):
-        return ps.faction_approval
+    VALUE = "faction_approval"
 
 
 class FactionHappinessDataContainer(AbstractPopStatsByFactionDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByFaction):
-        return ps.happiness
+    VALUE = "happiness"
 
 
 class FactionPowerDataContainer(AbstractPopStatsByFactionDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByFaction):
-        return ps.power
+    VALUE = "power"
 
 
 class FactionCrimeDataContainer(AbstractPopStatsByFactionDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByFaction):
-        return ps.crime
+    VALUE = "crime"
 
 
 class AbstractPopStatsByJobDataContainer(AbstractPopStatsDataContainer, abc.ABC):
-    def _iterate_popstats(
-        self, cd: datamodel.CountryData
-    ) -> Iterable[datamodel.PopStatsByJob]:
-        return iter(cd.pop_stats_job)
-
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        assert isinstance(ps, datamodel.PopStatsByJob)
-        return ps.job_description
+    POP_STATS = datamodel.PopStatsByJob
 
 
 class JobDistributionDataContainer(AbstractPopStatsByJobDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByJob):
-        return ps.pop_count
+    VALUE = "pop_count"
 
 
 class JobHappinessDataContainer(AbstractPopStatsByJobDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByJob):
-        return ps.happiness
+    VALUE = "happiness"
 
 
 class JobPowerDataContainer(AbstractPopStatsByJobDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByJob):
-        return ps.power
+    VALUE = "power"
 
 
 class JobCrimeDataContainer(AbstractPopStatsByJobDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByJob):
-        return ps.crime
+    VALUE = "crime"
 
 
 class AbstractPopStatsByPlanetDataContainer(AbstractPopStatsDataContainer, abc.ABC):
-    def _iterate_popstats(
-        self, cd: datamodel.CountryData
-    ) -> Iterable[datamodel.PlanetStats]:
-        return iter(cd.pop_stats_planets)
-
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        assert isinstance(ps, datamodel.PlanetStats)
-        return f"{ps.planet.rendered_name} ({ps.planet.planet_id_in_game})"
+    POP_STATS = datamodel.PlanetStats
 
 
 class PlanetDistributionDataContainer(AbstractPopStatsByPlanetDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.pop_count
+    VALUE = "pop_count"
 
 
 class PlanetHappinessDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.happiness
+    VALUE = "happiness"
 
 
 class PlanetPowerDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.power
+    VALUE = "power"
 
 
 class PlanetCrimeDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.crime
+    VALUE = "crime"
 
 
 class PlanetMigrationDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.migration
+    VALUE = "migration"
 
 
 class PlanetAmenitiesDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.free_amenities
+    VALUE = "free_amenities"
 
 
 class PlanetHousingDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.free_housing
+    VALUE = "free_housing"
 
 
 class PlanetStabilityDataContainer(AbstractPopStatsByPlanetDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PlanetStats):
-        return ps.stability
+    VALUE = "stability"
 
 
 class AbstractPopStatsByEthosDataContainer(AbstractPopStatsDataContainer, abc.ABC):
-    def _iterate_popstats(
-        self, cd: datamodel.CountryData
-    ) -> Iterable[datamodel.PopStatsByEthos]:
-        return iter(cd.pop_stats_ethos)
-
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        assert isinstance(ps, datamodel.PopStatsByEthos)
-        return ps.ethos
+    POP_STATS = datamodel.PopStatsByEthos
 
 
 class EthosDistributionDataContainer(AbstractPopStatsByEthosDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByEthos):
-        return ps.pop_count
+    VALUE = "pop_count"
 
 
 class EthosHappinessDataContainer(AbstractPopStatsByEthosDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByEthos):
-        return ps.happiness
+    VALUE = "happiness"
 
 
 class EthosPowerDataContainer(AbstractPopStatsByEthosDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByEthos):
-        return ps.power
+    VALUE = "power"
 
 
 class EthosCrimeDataContainer(AbstractPopStatsByEthosDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByEthos):
-        return ps.crime
+    VALUE = "crime"
 
 
 class AbstractPopStatsByStratumDataContainer(AbstractPopStatsDataContainer, abc.ABC):
-    def _iterate_popstats(
-        self, cd: datamodel.CountryData
-    ) -> Iterable[datamodel.PopStatsByStratum]:
-        return iter(cd.pop_stats_stratum)
-
-    def _get_key_from_popstats(self, ps: PopStatsType) -> str:
-        assert isinstance(ps, datamodel.PopStatsByStratum)
-        return ps.stratum
+    POP_STATS = datamodel.PopStatsByStratum
 
 
 class StratumDistributionDataContainer(AbstractPopStatsByStratumDataContainer):
     DEFAULT_VAL = 0.0
-
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByStratum):
-        return ps.pop_count
+    VALUE = "pop_count"
 
 
 class StratumHappinessDataContainer(AbstractPopStatsByStratumDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByStratum):
-        return ps.happiness
+    VALUE = "happiness"
 
 
 class StratumPowerDataContainer(AbstractPopStatsByStratumDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByStratum):
-        return ps.power
+    VALUE = "power"
 
 
 class StratumCrimeDataContainer(AbstractPopStatsByStratumDataContainer):
-    def _get_value_from_popstats(self, ps: datamodel.PopStatsByStratum):
-        return ps.crime
+    VALUE = "crime"
 
 
 """ Define PlotSpecifications for all currently supported plots: """
@@ -1412,7 +2127,7 @@ TOTAL_MINERAL_INCOME_GRAPH = PlotSpecification(
     plot_id="total-mineral-income",
     title="Total Mineral Income",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: max(0.0, bi.net_minerals)
+        BudgetSumDataContainer, "minerals", lambda val: max(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1420,7 +2135,7 @@ TOTAL_ENERGY_INCOME_GRAPH = PlotSpecification(
     plot_id="total-energy-income",
     title="Total Energy Income",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: max(0.0, bi.net_energy)
+        BudgetSumDataContainer, "energy", lambda val: max(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1428,7 +2143,7 @@ TOTAL_ALLOYS_INCOME_GRAPH = PlotSpecification(
     plot_id="total-alloys-income",
     title="Total Alloys Income",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: max(0.0, bi.net_alloys)
+        BudgetSumDataContainer, "alloys", lambda val: max(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1436,7 +2151,7 @@ TOTAL_CONSUMER_GOODS_INCOME_GRAPH = PlotSpecification(
     plot_id="total-consumer-goods-income",
     title="Total Consumer Goods Income",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: max(0.0, bi.net_consumer_goods)
+        BudgetSumDataContainer, "consumer_goods", lambda val: max(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1444,7 +2159,7 @@ TOTAL_FOOD_INCOME_GRAPH = PlotSpecification(
     plot_id="total-food-income",
     title="Total Food Income",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: max(0.0, bi.net_food)
+        BudgetSumDataContainer, "food", lambda val: max(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1453,7 +2168,7 @@ TOTAL_MINERAL_EXPENSE_GRAPH = PlotSpecification(
     plot_id="total-mineral-expense",
     title="Total Mineral Expenses",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: min(0.0, bi.net_minerals)
+        BudgetSumDataContainer, "minerals", lambda val: min(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1461,7 +2176,7 @@ TOTAL_ENERGY_EXPENSE_GRAPH = PlotSpecification(
     plot_id="total-energy-expense",
     title="Total Energy Expenses",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: min(0.0, bi.net_energy)
+        BudgetSumDataContainer, "energy", lambda val: min(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1469,7 +2184,7 @@ TOTAL_ALLOYS_EXPENSE_GRAPH = PlotSpecification(
     plot_id="total-alloys-expense",
     title="Total Alloys Expenses",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: min(0.0, bi.net_alloys)
+        BudgetSumDataContainer, "alloys", lambda val: min(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1477,7 +2192,7 @@ TOTAL_CONSUMER_GOODS_EXPENSE_GRAPH = PlotSpecification(
     plot_id="total-consumer-goods-expense",
     title="Total Consumer Goods Expenses",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: min(0.0, bi.net_consumer_goods)
+        BudgetSumDataContainer, "consumer_goods", lambda val: min(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1485,7 +2200,7 @@ TOTAL_FOOD_EXPENSE_GRAPH = PlotSpecification(
     plot_id="total-food-expense",
     title="Total Food Expenses",
     data_container_factory=functools.partial(
-        BudgetSumDataContainer, lambda bi: min(0.0, bi.net_food)
+        BudgetSumDataContainer, "food", lambda val: min(0.0, val)
     ),
     style=PlotStyle.line,
 )
@@ -1856,7 +2571,7 @@ class CountryColors:
                     break
             self._used_hsv.add(self._round_hsv(h, s, v))
         return tuple(int(v * 255) for v in colorsys.hsv_to_rgb(h, s, v))
-    
+
     @staticmethod
     def _round_hsv(h: float, s: float, v: float):
         return round(h, 1), round(s, 1), round(v, 1)
@@ -1,15 +1,33 @@
 import contextlib
+import datetime
 import enum
+import functools
+import hashlib
 import itertools
+import json
 import logging
+import os
 import pathlib
+import sqlite3
 import threading
-from typing import Dict, List, Union, Optional, Iterable, Collection
+from typing import Dict, List, Union, Optional, Iterable, Collection, Tuple
 
+import numpy as np
 import sqlalchemy
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Boolean, Enum
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Float,
+    Boolean,
+    Enum,
+    LargeBinary,
+    Index,
+)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, scoped_session, selectinload
+from sqlalchemy.orm import sessionmaker, relationship, scoped_session
 
 from alembic.autogenerate import produce_migrations
 from alembic.migration import MigrationContext
@@ -24,9 +42,18 @@ logger = logging.getLogger(__name__)
 Base = declarative_base()
 _ENGINES = {}
 _SESSIONMAKERS = {}
+_READ_SESSIONMAKERS = {}  # sessions of the read-only engine, see get_db_session
 _DB_LOCKS = {}  # per-game lock; under WAL only writers take it (see get_db_session)
 _ENGINE_SETUP_LOCK = threading.Lock()  # guards lazy engine setup below
 _SQLITE_BUSY_TIMEOUT_MS = 30_000
+# read-only connections per game which are kept open, shared by the dashboard's request threads. Up to
+# one connection per server thread is opened when the server is busy, and closed again when it is returned.
+_READ_POOL_SIZE = 8
+_READ_POOL_MAX_OVERFLOW = max(config.SERVER_THREADS - _READ_POOL_SIZE, 0)
+_READ_CACHE_SIZE_KIB = 32 * 1024
+_READ_MMAP_SIZE_BYTES = 256 * 2**20
+# the WAL is truncated by maintain_db once it grows beyond this size
+_WAL_CHECKPOINT_THRESHOLD_BYTES = 64 * 2**20
 
 
 def _set_sqlite_pragmas(dbapi_connection, connection_record):
@@ -39,18 +66,50 @@ def _set_sqlite_pragmas(dbapi_connection, connection_record):
     cursor.close()
 
 
-def _get_or_create_sessionmaker(game_id):
+def _set_sqlite_read_pragmas(dbapi_connection, connection_record):
+    # the journal mode is stored in the DB file, so readers only tune their own connection: a larger
+    # page cache and memory-mapped I/O for the large scans of the dashboard, and in-memory temp B-trees
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.execute(f"PRAGMA cache_size=-{_READ_CACHE_SIZE_KIB}")
+    cursor.execute(f"PRAGMA mmap_size={_READ_MMAP_SIZE_BYTES}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA busy_timeout={_SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _get_or_create_sessionmaker(game_id, write: bool = True):
     if game_id not in _SESSIONMAKERS:
         with _ENGINE_SETUP_LOCK:
             if game_id not in _SESSIONMAKERS:  # double-checked
                 _setup_engine(game_id)
-    return _SESSIONMAKERS[game_id]
+    return _SESSIONMAKERS[game_id] if write else _READ_SESSIONMAKERS[game_id]
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_fingerprint() -> int:
+    """
+    Hash of the DDL of all tables and indices defined in Base.metadata, stored in PRAGMA user_version
+    of each game DB after it was migrated. Fits into the signed 32 bit integer of user_version and is never 0,
+    which is the user_version of new or previously unversioned DBs.
+    """
+    dialect = sqlite.dialect()
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(sqlalchemy.schema.CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            ddl.append(
+                str(sqlalchemy.schema.CreateIndex(index).compile(dialect=dialect))
+            )
+    digest = hashlib.blake2b("\n".join(ddl).encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big", signed=True) or 1
 
 
 def _setup_engine(game_id):
     db_file = config.CONFIG.db_path / f"{game_id}.db"
     if not db_file.exists():
         logger.info(f"Creating database for game {game_id} in file {db_file}.")
+        _create_db_file(db_file)
     engine = sqlalchemy.create_engine(
         f"sqlite:///{db_file}",
         echo=False,
@@ -58,6 +117,39 @@ def _setup_engine(game_id):
     )
     sqlalchemy.event.listen(engine, "connect", _set_sqlite_pragmas)
 
+    with engine.connect() as connection:
+        user_version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+    if user_version != _schema_fingerprint():
+        _migrate_db(engine)
+
+    # created after the migration, which the read-only connections could not run
+    read_engine = sqlalchemy.create_engine(
+        f"sqlite:///{db_file}",
+        echo=False,
+        connect_args={"timeout": _SQLITE_BUSY_TIMEOUT_MS / 1000},
+        poolclass=sqlalchemy.pool.QueuePool,
+        pool_size=_READ_POOL_SIZE,
+        max_overflow=_READ_POOL_MAX_OVERFLOW,
+        pool_timeout=_SQLITE_BUSY_TIMEOUT_MS / 1000,
+    )
+    sqlalchemy.event.listen(read_engine, "connect", _set_sqlite_read_pragmas)
+
+    _ENGINES[game_id] = engine
+    _DB_LOCKS[game_id] = threading.Lock()
+    _READ_SESSIONMAKERS[game_id] = scoped_session(sessionmaker(bind=read_engine))
+    # assigned last, other threads only wait for _ENGINE_SETUP_LOCK while this is unset
+    _SESSIONMAKERS[game_id] = scoped_session(sessionmaker(bind=engine))
+
+
+def _create_db_file(db_file: pathlib.Path):
+    # Incremental auto-vacuum can only be enabled before the first table is created, and before switching
+    # to WAL. Databases which were created without it are switched by the maintain command, see maintain_db.
+    with contextlib.closing(sqlite3.connect(db_file)) as connection:
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.execute("PRAGMA journal_mode=WAL")
+
+
+def _migrate_db(engine):
     # auto-migrate the DB
     # based on https://alembic.sqlalchemy.org/en/latest/cookbook.html#run-alembic-operation-objects-directly-as-in-from-autogenerate
     with engine.connect() as connection:
@@ -85,17 +177,19 @@ def _setup_engine(game_id):
         # block exit unless committed, which silently discarded the schema
         # changes for pre-existing DBs (new columns never landed).
         connection.commit()
-
-    _ENGINES[game_id] = engine
-    _SESSIONMAKERS[game_id] = scoped_session(sessionmaker(bind=engine))
-    _DB_LOCKS[game_id] = threading.Lock()
+        # fill tables which are derived from existing data
+        update_historical_event_participants(connection)
+        # the migration is skipped on the next startup unless the models change
+        connection.exec_driver_sql(f"PRAGMA user_version={_schema_fingerprint()}")
+        connection.commit()
 
 
 @contextlib.contextmanager
 def get_db_session(game_id, write: bool = False) -> sqlalchemy.orm.Session:
     # write=True serializes on the per-game lock; readers rely on WAL snapshots
-    # so they don't block while the parser ingests.
-    session_factory = _get_or_create_sessionmaker(game_id)
+    # so they don't block while the parser ingests. Readers use a separate pool of
+    # read-only connections, so they never see the writer's uncommitted changes.
+    session_factory = _get_or_create_sessionmaker(game_id, write=write)
     lock = _DB_LOCKS[game_id] if write else contextlib.nullcontext()
     with lock:
         s = session_factory()
@@ -400,46 +494,270 @@ def get_known_games(game_name_prefix: str = "") -> List[str]:
 
 def get_available_games_dict() -> Dict[str, Dict[str, str]]:
     """Returns a dictionary mapping game id to some basic info about the game."""
+    with _GAME_CATALOG_LOCK:
+        catalog = _load_game_catalog()
+        known_games = get_known_games()
+        changed = False
+        for game_id in known_games:
+            entry = catalog.get(game_id)
+            if entry is None or entry["db_mtime"] != _get_db_mtime(game_id):
+                catalog[game_id] = _read_game_catalog_entry(game_id)
+                changed = True
+        for game_id in set(catalog) - set(known_games):
+            del catalog[game_id]
+            changed = True
+        if changed:
+            _save_game_catalog(catalog)
+
     games = {}
-    for game_id in get_known_games():
-        with get_db_session(game_id) as session:
-            game = session.query(Game).one_or_none()
-            if game is None:
-                continue
-            most_recent_gamestate = (
-                session.query(GameState).order_by(GameState.date.desc()).first()
-            )
-            games[game_id] = dict(
-                game_id=game_id,
-                game_date=days_to_date(most_recent_gamestate.date),
-                num_saves=session.query(GameState.gamestate_id).count(),
-                country_name=game_info.render_name(game.player_country_name),
-                difficulty=game.difficulty,
-                galaxy=game.galaxy,
-                last_updated=game.last_updated,
-            )
+    for game_id in known_games:
+        entry = catalog[game_id]
+        if entry["latest_date"] is None:
+            continue
+        last_updated = datetime.datetime.fromisoformat(entry["last_updated"])
+        games[game_id] = dict(
+            game_id=game_id,
+            game_date=days_to_date(entry["latest_date"]),
+            num_saves=entry["num_saves"],
+            country_name=game_info.render_name(entry["player_country_name"]),
+            difficulty=game_info.lookup_key(entry["difficulty"]),
+            galaxy=f"{game_info.lookup_key(entry['galaxy_template'])} {game_info.lookup_key(entry['galaxy_shape'])}",
+            last_updated=f"{last_updated:%Y.%m.%d %H:%M}",
+        )
     return games
 
 
-def count_gamestates_since(game_name: str, date: float) -> int:
-    with get_db_session(game_name) as session:
-        return session.query(GameState).filter(GameState.date > date).count()
+def update_game_catalog(game_id: str, session: sqlalchemy.orm.Session):
+    """Refresh the catalog entry of a game after new data was committed to its database."""
+    with _GAME_CATALOG_LOCK:
+        catalog = _load_game_catalog()
+        entry = _query_game_catalog_entry(session)
+        entry["db_mtime"] = _get_db_mtime(game_id)
+        catalog[game_id] = entry
+        _save_game_catalog(catalog)
+
+
+# The game catalog caches the basic game info shown on the index page, such that it is not necessary
+# to open every game database on each request. Entries are stored with the modification time of the
+# database files and are re-read from the database if they are outdated.
+_GAME_CATALOG_LOCK = threading.Lock()
+_GAME_CATALOG: Dict[str, Dict] = {}
+_GAME_CATALOG_MTIME: Optional[float] = None
+
+
+def _get_game_catalog_file() -> pathlib.Path:
+    return config.CONFIG.db_path / "game_catalog.json"
+
+
+def _get_db_mtime(game_id: str) -> float:
+    # changes are written to the WAL file first, the main file is only modified on checkpoints
+    db_file = config.CONFIG.db_path / f"{game_id}.db"
+    wal_file = db_file.with_name(f"{db_file.name}-wal")
+    return max(get_last_modified_time(f) for f in [db_file, wal_file] if f.exists())
+
+
+def _load_game_catalog() -> Dict[str, Dict]:
+    global _GAME_CATALOG, _GAME_CATALOG_MTIME
+    catalog_file = _get_game_catalog_file()
+    mtime = get_last_modified_time(catalog_file) if catalog_file.exists() else None
+    if mtime != _GAME_CATALOG_MTIME:
+        # the file may have been updated by another process, e.g. the CLI parsing saves
+        try:
+            with open(catalog_file, "r") as f:
+                _GAME_CATALOG = json.load(f)
+        except (OSError, ValueError):
+            _GAME_CATALOG = {}
+        _GAME_CATALOG_MTIME = mtime
+    return _GAME_CATALOG
+
+
+def _save_game_catalog(catalog: Dict[str, Dict]):
+    global _GAME_CATALOG_MTIME
+    catalog_file = _get_game_catalog_file()
+    tmp_file = catalog_file.with_name(f"{catalog_file.name}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(catalog, f)
+    os.replace(tmp_file, catalog_file)
+    _GAME_CATALOG_MTIME = get_last_modified_time(catalog_file)
+
+
+def _read_game_catalog_entry(game_id: str) -> Dict:
+    with get_db_session(game_id) as session:
+        entry = _query_game_catalog_entry(session)
+    # opening the database can create the WAL file, so the modification time is checked afterwards
+    entry["db_mtime"] = _get_db_mtime(game_id)
+    return entry
+
+
+def _query_game_catalog_entry(session: sqlalchemy.orm.Session) -> Dict:
+    game = session.query(Game).one_or_none()
+    latest_date = session.query(sqlalchemy.func.max(GameState.date)).scalar()
+    if game is None or latest_date is None:
+        return dict(latest_date=None)
+    return dict(
+        latest_date=latest_date,
+        num_saves=session.query(GameState.gamestate_id).count(),
+        player_country_name=game.player_country_name,
+        difficulty=game.db_difficulty,
+        galaxy_template=game.db_galaxy_template,
+        galaxy_shape=game.db_galaxy_shape,
+        last_updated=game.db_last_updated.isoformat(),
+    )
 
 
-def get_gamestates_since(game_name: str, date: float):
+def get_gamestate_dates_since(game_name: str, date: float) -> List[int]:
     with get_db_session(game_name) as session:
-        game = session.query(Game).one()
-        for gs in (
-            session.query(GameState)
-            .filter(GameState.game == game, GameState.date > date)
+        return [
+            gs_date
+            for (gs_date,) in session.query(GameState.date)
+            .filter(GameState.date > date)
+            .order_by(GameState.date)
+        ]
+
+
+def apply_retention_policy(game_id: str) -> int:
+    """
+    Thin out old gamestates according to the retention settings: All gamestates from the last
+    retention_full_resolution_years years before the latest gamestate are kept, and only
+    retention_saves_per_year gamestates per year are kept before that. The deleted gamestates are
+    removed together with all data that belongs to them, history events are not affected. Their dates are
+    recorded as RemovedGameState, such that the saves are not imported again.
+
+    :return: The number of deleted gamestates
+    """
+    full_resolution_years = config.CONFIG.retention_full_resolution_years
+    if not full_resolution_years:
+        return 0
+    bucket_days = 360 / max(1, config.CONFIG.retention_saves_per_year)
+    with get_db_session(game_id, write=True) as session:
+        gamestates = (
+            session.query(GameState.gamestate_id, GameState.game_id, GameState.date)
             .order_by(GameState.date)
-            # eager-load to avoid an N+1 lazy SELECT per country per gamestate
-            .options(
-                selectinload(GameState.country_data).selectinload(CountryData.country)
-            )
             .all()
-        ):
-            yield gs
+        )
+        if not gamestates:
+            return 0
+        cutoff_date = gamestates[-1].date - 360 * full_resolution_years
+        kept_buckets = set()
+        surplus = []
+        for gamestate in gamestates:
+            if gamestate.date >= cutoff_date:
+                break
+            bucket = int(gamestate.date // bucket_days)
+            if bucket in kept_buckets:
+                surplus.append(gamestate)
+            else:
+                kept_buckets.add(bucket)
+        if not surplus:
+            return 0
+        logger.info(
+            f"Deleting {len(surplus)} old gamestates of game {game_id} due to the retention settings."
+        )
+        surplus_ids = [gamestate.gamestate_id for gamestate in surplus]
+        for i in range(0, len(surplus_ids), 500):
+            _delete_gamestates(session, surplus_ids[i : i + 500])
+        session.execute(
+            sqlalchemy.insert(RemovedGameState),
+            [dict(game_id=gs.game_id, date=gs.date) for gs in surplus],
+        )
+        session.commit()
+        update_game_catalog(game_id, session)
+    _incremental_vacuum(game_id)
+    return len(surplus)
+
+
+def _delete_gamestates(session, gamestate_ids: List[int]):
+    gamestate_id_column = GameState.__table__.c.gamestate_id
+    country_data_id_column = CountryData.__table__.c.country_data_id
+    country_data_ids = sqlalchemy.select(CountryData.country_data_id).where(
+        CountryData.game_state_id.in_(gamestate_ids)
+    )
+    # delete the rows of every table that references the CountryData first, then those referencing the GameState
+    for referenced_column, ids in [
+        (country_data_id_column, country_data_ids),
+        (gamestate_id_column, gamestate_ids),
+    ]:
+        for table in Base.metadata.sorted_tables:
+            for foreign_key in table.foreign_keys:
+                if foreign_key.column is referenced_column:
+                    session.execute(
+                        sqlalchemy.delete(table).where(foreign_key.parent.in_(ids))
+                    )
+    session.execute(
+        sqlalchemy.delete(GameState.__table__).where(
+            gamestate_id_column.in_(gamestate_ids)
+        )
+    )
+
+
+def _incremental_vacuum(game_id: str):
+    """Return the free pages of the database file to the file system."""
+    engine = _ENGINES[game_id]
+    with (
+        _DB_LOCKS[game_id],
+        engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection,
+    ):
+        if not _has_incremental_vacuum(connection):
+            # switching requires a full VACUUM, which blocks the game's DB for a long time on large files
+            logger.info(
+                f"The database of game {game_id} does not shrink after deleting gamestates. "
+                f"Run the maintain command once to enable it."
+            )
+            return
+        # the pragma frees one page per step, and sqlite3's execute() only runs a single step for
+        # statements that don't return any rows. executescript() runs the statement to completion.
+        connection.connection.driver_connection.executescript(
+            "PRAGMA incremental_vacuum;"
+        )
+
+
+def _has_incremental_vacuum(connection) -> bool:
+    return connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+
+
+def maintain_db(game_id: str, analyze: bool = False, enable_vacuum: bool = False):
+    """
+    Update the query planner statistics of the game DB and truncate its WAL file if it has grown too large.
+
+    :param analyze: Run a full ANALYZE, e.g. after importing many saves. Otherwise, PRAGMA optimize only
+    analyzes the tables whose statistics are missing or outdated.
+    :param enable_vacuum: Switch databases which were created before incremental auto-vacuum was used, with
+    a full VACUUM that may take several minutes on large DBs.
+    """
+    _get_or_create_sessionmaker(game_id)
+    engine = _ENGINES[game_id]
+    wal_file = config.CONFIG.db_path / f"{game_id}.db-wal"
+    with (
+        _DB_LOCKS[game_id],
+        engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection,
+    ):
+        driver_connection = connection.connection.driver_connection
+        if enable_vacuum and not _has_incremental_vacuum(connection):
+            logger.info(
+                f"Enabling incremental vacuum for game {game_id}, this may take a while."
+            )
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+        if analyze:
+            driver_connection.executescript("ANALYZE;")
+        else:
+            # limit the rows scanned per index, such that this stays cheap on large DBs
+            driver_connection.executescript(
+                "PRAGMA analysis_limit=1000; PRAGMA optimize;"
+            )
+        try:
+            wal_size = wal_file.stat().st_size
+        except OSError:
+            wal_size = 0
+        if wal_size > _WAL_CHECKPOINT_THRESHOLD_BYTES:
+            # waits up to the busy timeout for the dashboard's readers to finish
+            busy, _, _ = connection.exec_driver_sql(
+                "PRAGMA wal_checkpoint(TRUNCATE)"
+            ).one()
+            if busy:
+                logger.info(
+                    f"Could not checkpoint the WAL of game {game_id}, it is still in use."
+                )
 
 
 class Game(Base):
@@ -584,9 +902,15 @@ class SystemOwnership(Base):
     """Represent the timespan during which some empire owned a given system."""
 
     __tablename__ = "system_ownership"
+    __table_args__ = (
+        # ownership history of a system, ordered by date
+        Index(
+            "ix_system_ownership_system_id_end_date_days", "system_id", "end_date_days"
+        ),
+    )
     system_ownership_id = Column(Integer, primary_key=True)
 
-    system_id = Column(ForeignKey(System.system_id), index=True)
+    system_id = Column(ForeignKey(System.system_id))
     owner_country_id = Column(ForeignKey("country.country_id"))
 
     start_date_days = Column(Integer, index=True)
@@ -679,6 +1003,15 @@ class GameState(Base):
         return f"Gamestate of {self.game.game_name} @ {days_to_date(self.date)}"
 
 
+class RemovedGameState(Base):
+    """The date of a gamestate which was deleted by the retention policy, such that its save is not imported again."""
+
+    __tablename__ = "removed_gamestate"
+    removed_gamestate_id = Column(Integer, primary_key=True)
+    game_id = Column(ForeignKey(Game.game_id))
+    date = Column(Integer, index=True, nullable=False)  # Days since 2200.1.1
+
+
 class Country(Base):
     __tablename__ = "country"
     country_id = Column(Integer, primary_key=True)
@@ -697,6 +1030,11 @@ class Country(Base):
     secondary_color = Column(String(80))
     origin = Column(String(80))
 
+    # digests of the last processed government, policies and council positions, to skip unchanged countries
+    government_hash = Column(Integer, default=0)
+    policies_hash = Column(Integer, default=0)
+    council_hash = Column(Integer, default=0)
+
     game = relationship("Game", back_populates="countries")
     capital = relationship("Planet", foreign_keys=[capital_planet_id], post_update=True)
 
@@ -1120,6 +1458,12 @@ class CountryData(Base):
     game_state = relationship("GameState", back_populates="country_data")
 
     budget = relationship("BudgetItem", cascade="all,delete,delete-orphan")
+    packed_budget = relationship(
+        "PackedBudget",
+        back_populates="country_data",
+        uselist=False,
+        cascade="all,delete,delete-orphan",
+    )
 
     internal_market_resources = relationship(
         "InternalMarketResource",
@@ -1277,6 +1621,68 @@ class BudgetItem(Base):
         return self.db_budget_item_name.text
 
 
+# The resources stored for each budget item, in the order of the columns of PackedBudget.values
+BUDGET_RESOURCES = [
+    "energy",
+    "minerals",
+    "food",
+    "alloys",
+    "consumer_goods",
+    "trade",
+    "volatile_motes",
+    "exotic_gases",
+    "rare_crystals",
+    "living_metal",
+    "zro",
+    "dark_matter",
+    "nanites",
+    "minor_artifacts",
+    "astral_threads",
+    "biomass",
+    "physics_research",
+    "society_research",
+    "engineering_research",
+    "unity",
+    "influence",
+]
+
+
+class PackedBudget(Base):
+    """
+    Compact storage of the complete budget of a CountryData in a single row, replacing one BudgetItem row
+    per item. The budget is stored as a float32 matrix with one row per budget item and one column
+    per resource in BUDGET_RESOURCES, and the description IDs of the budget item names as an int32 vector.
+    """
+
+    __tablename__ = "packed_budget"
+    packed_budget_id = Column(Integer, primary_key=True)
+    country_data_id = Column(ForeignKey(CountryData.country_data_id), index=True)
+
+    description_ids = Column(LargeBinary)
+    values = Column(LargeBinary)
+
+    country_data = relationship("CountryData", back_populates="packed_budget")
+
+    @classmethod
+    def from_items(
+        cls, items: List[Tuple[SharedDescription, Dict[str, float]]], **kwargs
+    ) -> "PackedBudget":
+        """Pack the given items, consisting of the item name's SharedDescription and the net income by resource."""
+        description_ids = np.array(
+            [description.description_id for description, _ in items], dtype=np.int32
+        )
+        values = np.array(
+            [
+                [resources.get(resource, 0.0) for resource in BUDGET_RESOURCES]
+                for _, resources in items
+            ],
+            dtype=np.float32,
+        )
+        return cls(
+            description_ids=description_ids.tobytes(), values=values.tobytes(), **kwargs
+        )
+
+
 class Species(Base):
     """Represents a species in a game. Not tied to any specific time."""
 
@@ -1529,6 +1935,7 @@ class Leader(Base):
     last_date = Column(Integer)  # estimated death / dismissal
     is_active = Column(Boolean, index=True)
     fleet_id = Column(ForeignKey("fleet.fleet_id"), nullable=True)
+    attributes_hash = Column(Integer, default=0)
 
     game = relationship("Game", back_populates="leaders")
     country = relationship(
@@ -1826,6 +2233,16 @@ class HistoricalEvent(Base):
     """
 
     __tablename__ = "historical_event"
+    __table_args__ = tuple(
+        # the history ledger lists the events of each country, leader, system, planet and war in this order
+        Index(
+            f"ix_historical_event_{column}_start_date_days",
+            column,
+            "start_date_days",
+            "event_type",
+        )
+        for column in ["country_id", "leader_id", "system_id", "planet_id", "war_id"]
+    )
     historical_event_id = Column(Integer, primary_key=True)
 
     event_type = Column(Enum(HistoricalEventType), nullable=False, index=True)
@@ -1833,8 +2250,8 @@ class HistoricalEvent(Base):
     event_is_known_to_player = Column(Boolean, nullable=False, default=False)
 
     # Any of the following columns may be undefined, depending on the event type.
-    country_id = Column(ForeignKey(Country.country_id), index=True)
-    leader_id = Column(ForeignKey(Leader.leader_id), nullable=True, index=True)
+    country_id = Column(ForeignKey(Country.country_id))
+    leader_id = Column(ForeignKey(Leader.leader_id), nullable=True)
     war_id = Column(ForeignKey(War.war_id), nullable=True)
     combat_id = Column(ForeignKey(Combat.combat_id), nullable=True)
     system_id = Column(ForeignKey(System.system_id), nullable=True)
@@ -1857,6 +2274,10 @@ class HistoricalEvent(Base):
     faction = relationship(PoliticalFaction, back_populates="historical_events")
     fleet = relationship(Fleet)
     db_description = relationship(SharedDescription)
+    # the countries returned by involved_countries(), stored in HistoricalEventParticipant
+    participants = relationship(
+        Country, secondary="historical_event_participant", viewonly=True
+    )
 
     def __str__(self):
         start_date = days_to_date(self.start_date_days)
@@ -1951,3 +2372,73 @@ class HistoricalEvent(Base):
             yield self.target_country
         if self.combat_id is not None:
             yield from self.combat.involved_countries()
+
+
+class HistoricalEventParticipant(Base):
+    """
+    Denormalized index of the countries involved in each historical event, such that the events of a country
+    can be found in SQL. The rows are written by update_historical_event_participants.
+    """
+
+    __tablename__ = "historical_event_participant"
+    __table_args__ = (
+        Index(
+            "ix_historical_event_participant_country_id_event_id",
+            "country_id",
+            "historical_event_id",
+        ),
+    )
+    historical_event_participant_id = Column(Integer, primary_key=True)
+
+    historical_event_id = Column(
+        ForeignKey(HistoricalEvent.historical_event_id), nullable=False, index=True
+    )
+    country_id = Column(ForeignKey(Country.country_id), nullable=False)
+
+
+def update_historical_event_participants(connection):
+    """
+    Insert the HistoricalEventParticipant rows of all events which were added since the last call, using the same
+    logic as HistoricalEvent.involved_countries(). Events are never re-assigned to other countries after they are
+    added, so only the events after the latest event in the participant table are considered.
+
+    :param connection: A session or connection
+    """
+    event = HistoricalEvent.__table__
+    latest_event_id = connection.execute(
+        sqlalchemy.select(
+            sqlalchemy.func.coalesce(
+                sqlalchemy.func.max(
+                    HistoricalEventParticipant.__table__.c.historical_event_id
+                ),
+                0,
+            )
+        )
+    ).scalar()
+    is_new = event.c.historical_event_id > latest_event_id
+    participants = sqlalchemy.union(
+        sqlalchemy.select(event.c.historical_event_id, event.c.country_id).where(
+            is_new, event.c.country_id.isnot(None)
+        ),
+        sqlalchemy.select(event.c.historical_event_id, event.c.target_country_id).where(
+            is_new, event.c.target_country_id.isnot(None)
+        ),
+        sqlalchemy.select(
+            event.c.historical_event_id, WarParticipant.__table__.c.country_id
+        )
+        .join(
+            CombatParticipant.__table__,
+            CombatParticipant.__table__.c.combat_id == event.c.combat_id,
+        )
+        .join(
+            WarParticipant.__table__,
+            WarParticipant.__table__.c.warparticipant_id
+            == CombatParticipant.__table__.c.war_participant_id,
+        )
+        .where(is_new, WarParticipant.__table__.c.country_id.isnot(None)),
+    )
+    connection.execute(
+        sqlalchemy.insert(HistoricalEventParticipant.__table__).from_select(
+            ["historical_event_id", "country_id"], participants
+        )
+    )
@@ -0,0 +1,256 @@
+"""
+Export of the tables of a game database for offline analysis, e.g. with pandas or DuckDB.
+
+Each table is written to one file in the export folder. The rows are streamed from the database in chunks,
+such that large games can be exported without loading whole tables into memory. Next to each reference to a
+SharedDescription, the description text is exported, and next to each reference to a country, the rendered
+country name. The packed budgets are exported with one row per budget item.
+
+The Parquet format requires pyarrow, which is not a dependency of the dashboard. The CSV format works without
+any additional packages.
+"""
+
+import csv
+import dataclasses
+import enum
+import logging
+import pathlib
+from typing import Any, List
+
+import numpy as np
+import sqlalchemy
+
+from stellarisdashboard import datamodel, game_info
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ["csv", "parquet"]
+
+CHUNK_SIZE = 10_000
+
+
+@dataclasses.dataclass
+class ExportColumn:
+    name: str
+    # one of "int", "float", "bool", "str", "text" (repeated strings, dictionary-encoded in Parquet), "datetime"
+    kind: str
+
+
+def export_game(
+    game_id: str, output_path: pathlib.Path, export_format: str = "csv"
+) -> List[pathlib.Path]:
+    """
+    Write all tables of the game to files in the output path.
+
+    :return: The paths of the written files
+    """
+    if export_format not in FORMATS:
+        raise ValueError(
+            f"Unknown export format {export_format}, expected one of {', '.join(FORMATS)}"
+        )
+    writer_class = _CsvWriter if export_format == "csv" else _get_parquet_writer_class()
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    files = []
+    with datamodel.get_db_session(game_id) as session:
+        country_names = {
+            country_id: game_info.render_name(country_name)
+            for country_id, country_name in session.query(
+                datamodel.Country.country_id, datamodel.Country.country_name
+            )
+        }
+        for table in datamodel.Base.metadata.sorted_tables:
+            path = output_path / f"{table.name}{writer_class.SUFFIX}"
+            logger.info(f"Exporting table {table.name} of game {game_id} to {path}")
+            if table is datamodel.PackedBudget.__table__:
+                _export_packed_budgets(
+                    session, writer_class(path, _PACKED_BUDGET_COLUMNS)
+                )
+            else:
+                _export_table(session, table, country_names, writer_class, path)
+            files.append(path)
+    return files
+
+
+def _export_table(session, table: sqlalchemy.Table, country_names, writer_class, path):
+    columns = []
+    selected = []
+    # functions computing exported values from the database values, by column index
+    converters = {}
+    outer_joins = []
+    for column in table.columns:
+        if isinstance(column.type, sqlalchemy.LargeBinary):
+            continue
+        columns.append(ExportColumn(column.name, _get_kind(column)))
+        selected.append(column)
+        if isinstance(column.type, sqlalchemy.Enum):
+            converters[len(selected) - 1] = _enum_name
+        referenced = {fk.column.table.name for fk in column.foreign_keys}
+        prefix = column.name.removesuffix("_id")
+        if datamodel.SharedDescription.__tablename__ in referenced:
+            description = datamodel.SharedDescription.__table__.alias(
+                f"{column.name}_description"
+            )
+            outer_joins.append((description, description.c.description_id == column))
+            columns.append(ExportColumn(f"{prefix}_text", "text"))
+            selected.append(description.c.text)
+        elif datamodel.Country.__tablename__ in referenced:
+            # country names are rendered once per country instead of once per row
+            columns.append(ExportColumn(f"{prefix}_name", "text"))
+            selected.append(column)
+            converters[len(selected) - 1] = country_names.get
+    if table is datamodel.Country.__table__:
+        columns.append(ExportColumn("rendered_name", "str"))
+        selected.append(table.c.country_id)
+        converters[len(selected) - 1] = country_names.get
+
+    select_from = table
+    for joined, condition in outer_joins:
+        select_from = select_from.outerjoin(joined, condition)
+    query = (
+        sqlalchemy.select(*selected)
+        .select_from(select_from)
+        .order_by(*table.primary_key.columns)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    writer = writer_class(path, columns)
+    try:
+        for rows in session.execute(query).partitions():
+            chunk = [list(values) for values in zip(*rows)]
+            for index, converter in converters.items():
+                chunk[index] = [
+                    converter(value) if value is not None else None
+                    for value in chunk[index]
+                ]
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+
+_PACKED_BUDGET_COLUMNS = [
+    ExportColumn("country_data_id", "int"),
+    ExportColumn("budget_item", "text"),
+] + [ExportColumn(resource, "float") for resource in datamodel.BUDGET_RESOURCES]
+
+
+def _export_packed_budgets(session, writer):
+    description_texts = dict(
+        session.query(
+            datamodel.SharedDescription.description_id,
+            datamodel.SharedDescription.text,
+        )
+    )
+    query = (
+        sqlalchemy.select(
+            datamodel.PackedBudget.country_data_id,
+            datamodel.PackedBudget.description_ids,
+            datamodel.PackedBudget.values,
+        )
+        .order_by(datamodel.PackedBudget.packed_budget_id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+    try:
+        for rows in session.execute(query).partitions():
+            country_data_ids = []
+            budget_items = []
+            value_matrices = []
+            for country_data_id, description_ids, values in rows:
+                description_ids = np.frombuffer(description_ids, dtype=np.int32)
+                country_data_ids.extend([country_data_id] * len(description_ids))
+                budget_items.extend(
+                    description_texts.get(d) for d in description_ids.tolist()
+                )
+                value_matrices.append(
+                    np.frombuffer(values, dtype=np.float32).reshape(
+                        len(description_ids), len(datamodel.BUDGET_RESOURCES)
+                    )
+                )
+            values = np.concatenate(value_matrices).astype(np.float64)
+            writer.write(
+                [country_data_ids, budget_items]
+                + [column.tolist() for column in values.T]
+            )
+    finally:
+        writer.close()
+
+
+def _get_kind(column: sqlalchemy.Column) -> str:
+    if isinstance(column.type, sqlalchemy.Boolean):
+        return "bool"
+    elif isinstance(column.type, sqlalchemy.Integer):
+        return "int"
+    elif isinstance(column.type, sqlalchemy.Float):
+        return "float"
+    elif isinstance(column.type, sqlalchemy.DateTime):
+        return "datetime"
+    elif isinstance(column.type, sqlalchemy.Enum):
+        return "text"
+    return "str"
+
+
+def _enum_name(value: enum.Enum) -> str:
+    return value.name
+
+
+class _CsvWriter:
+    SUFFIX = ".csv"
+
+    def __init__(self, path: pathlib.Path, columns: List[ExportColumn]):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([column.name for column in columns])
+
+    def write(self, chunk: List[List[Any]]):
+        self._writer.writerows(zip(*chunk))
+
+    def close(self):
+        self._file.close()
+
+
+def _get_parquet_writer_class():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Exporting to Parquet requires the pyarrow package. Install it with pip install "
+            "stellarisdashboard[parquet], or export to CSV instead."
+        ) from e
+
+    arrow_types = {
+        "int": pyarrow.int64(),
+        "float": pyarrow.float64(),
+        "bool": pyarrow.bool_(),
+        "str": pyarrow.string(),
+        "text": pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        "datetime": pyarrow.timestamp("us"),
+    }
+
+    class ParquetWriter:
+        SUFFIX = ".parquet"
+
+        def __init__(self, path: pathlib.Path, columns: List[ExportColumn]):
+            self._schema = pyarrow.schema(
+                [(column.name, arrow_types[column.kind]) for column in columns]
+            )
+            self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+        def write(self, chunk: List[List[Any]]):
+            arrays = [
+                (
+                    pyarrow.array(
+                        values, type=field.type.value_type
+                    ).dictionary_encode()
+                    if pyarrow.types.is_dictionary(field.type)
+                    else pyarrow.array(values, type=field.type)
+                )
+                for field, values in zip(self._schema, chunk)
+            ]
+            self._writer.write_batch(
+                pyarrow.RecordBatch.from_arrays(arrays, schema=self._schema)
+            )
+
+        def close(self):
+            self._writer.close()
+
+    return ParquetWriter
@@ -2,6 +2,7 @@ import abc
 import collections
 import dataclasses
 import datetime
+import hashlib
 import itertools
 import json
 import logging
@@ -11,7 +12,7 @@ from typing import Dict, Any, Set, Iterable, Optional, Union, List, Tuple, Colle
 
 import sqlalchemy
 
-from stellarisdashboard import datamodel, game_info, config
+from stellarisdashboard import datamodel, game_info, config, country_data_columns
 from stellarisdashboard.dashboard_app.visualization_data import clear_cached_country_colors
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,16 @@ def dump_name(name: dict):
     return json.dumps(name, sort_keys=True)
 
 
+def _digest(*values) -> int:
+    """
+    Compute a stable 64 bit digest of the given (JSON-serializable) values. Unlike the built-in hash,
+    the result does not depend on the process, so it can be stored in the database and compared in
+    later runs. Any sets should be sorted by the caller.
+    """
+    data = json.dumps(values, sort_keys=True, default=str).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True)
+
+
 def _extract_id(val, default: int = -1) -> int:
     """Normalize an in-game ID reference to an int.
 
@@ -36,10 +47,192 @@ def _extract_id(val, default: int = -1) -> int:
     return default
 
 
-# this is a naive cache for shared_descriptions, which helps to cut down on DB queries while processing
-# it needs to be cleared between processing saves (at the end of TimelineExtractor.process_gamestate)
-# the built-in @cache decorator was leaking memory, hanging on to references of processor instances
-_shared_description_cache: dict[str, datamodel.SharedDescription] = {}
+class SharedDescriptionCache:
+    """
+    Per-game dictionary of all shared description texts and their IDs. It is bulk-loaded from the
+    database once and kept across saves. Only the IDs are kept between saves, the
+    SharedDescription models are tied to the session of a single save, they are re-created
+    and attached to the current session with merge(load=False), which does not query the database.
+
+    New texts are added to the session and inserted together with the other changes of the save.
+    Their IDs are only remembered once the save is committed.
+    """
+
+    def __init__(self):
+        self._ids_by_text: Dict[str, int] = {}
+        self._max_id: Optional[int] = None
+        self._session = None
+        self._models_by_text: Dict[str, datamodel.SharedDescription] = {}
+        self._new_models: List[datamodel.SharedDescription] = []
+        self._flushed_ids: List[Tuple[str, int]] = []
+
+    def begin(self, session):
+        self._session = session
+        # reload if the table was changed from elsewhere, e.g. the database file was deleted and re-created
+        max_id = session.query(
+            sqlalchemy.func.max(datamodel.SharedDescription.description_id)
+        ).scalar()
+        if max_id != self._max_id:
+            self._ids_by_text = {
+                text: description_id
+                for description_id, text in session.query(
+                    datamodel.SharedDescription.description_id,
+                    datamodel.SharedDescription.text,
+                )
+            }
+            self._max_id = max_id
+
+    def get_or_add(self, text: str) -> datamodel.SharedDescription:
+        if text in self._models_by_text:
+            return self._models_by_text[text]
+        description_id = self._ids_by_text.get(text)
+        if description_id is not None:
+            description = datamodel.SharedDescription(
+                description_id=description_id, text=text
+            )
+            sqlalchemy.orm.make_transient_to_detached(description)
+            description = self._session.merge(description, load=False)
+        else:
+            description = datamodel.SharedDescription(text=text)
+            self._session.add(description)
+            self._new_models.append(description)
+        self._models_by_text[text] = description
+        return description
+
+    def flush(self):
+        """
+        Record the IDs of the new descriptions. Call this after the session is flushed and before it is
+        committed, as reading them after the commit would refresh each expired description from the database.
+        """
+        self._flushed_ids = []
+        for description in self._new_models:
+            identity = sqlalchemy.inspect(description).identity
+            if identity is not None:
+                self._flushed_ids.append((description.text, identity[0]))
+
+    def commit(self):
+        for text, description_id in self._flushed_ids:
+            self._ids_by_text[text] = description_id
+            self._max_id = max(self._max_id or 0, description_id)
+        self._end()
+
+    def rollback(self):
+        self._end()
+
+    def discard_expunged(self):
+        """
+        Forget the models which are no longer in the session, after a savepoint was rolled back. The
+        descriptions added within the savepoint were expunged, and must be added again when they are needed.
+        """
+        self._models_by_text = {
+            text: description
+            for text, description in self._models_by_text.items()
+            if description in self._session
+        }
+        self._new_models = [
+            description for description in self._new_models if description in self._session
+        ]
+
+    def _end(self):
+        self._session = None
+        self._models_by_text.clear()
+        self._new_models.clear()
+        self._flushed_ids = []
+
+
+_shared_description_caches: Dict[str, SharedDescriptionCache] = {}
+
+
+class SystemOwnershipCache:
+    """
+    Per-game dictionary of the open SystemOwnership of each owned system, mapping the system's database ID
+    to the IDs of the ownership row and of the owning country. It is loaded once and kept across saves, like
+    the SharedDescriptionCache. Changes made while processing a save are only applied once it is committed.
+    """
+
+    def __init__(self):
+        self._open_ownerships: Dict[int, Tuple[int, int]] = {}
+        self._max_id: Optional[int] = None
+        self._closed_system_ids: Set[int] = set()
+        self._new_ownerships: List[datamodel.SystemOwnership] = []
+        self._flushed_ownerships: List[Tuple[int, int, int]] = []
+
+    def begin(self, session):
+        # reload if the table was changed from elsewhere, e.g. the database file was deleted and re-created
+        max_id = session.query(
+            sqlalchemy.func.max(datamodel.SystemOwnership.system_ownership_id)
+        ).scalar()
+        if max_id == self._max_id:
+            return
+        self._open_ownerships = {}
+        latest_end_dates = {}
+        rows = (
+            session.query(
+                datamodel.SystemOwnership.system_id,
+                datamodel.SystemOwnership.system_ownership_id,
+                datamodel.SystemOwnership.owner_country_id,
+                datamodel.SystemOwnership.end_date_days,
+            )
+            .join(datamodel.System)
+            .filter(datamodel.System.country_id.isnot(None))
+        )
+        for system_id, ownership_id, country_id, end_date_days in rows:
+            end_date_days = end_date_days if end_date_days is not None else float("inf")
+            if end_date_days >= latest_end_dates.get(system_id, float("-inf")):
+                latest_end_dates[system_id] = end_date_days
+                self._open_ownerships[system_id] = (ownership_id, country_id)
+        self._max_id = max_id
+
+    def get_open_ownership(self, system_id: int) -> Optional[Tuple[int, int]]:
+        """Return the IDs of the open ownership row and its owner country, or None if the system is unowned."""
+        if system_id in self._closed_system_ids:
+            return None
+        return self._open_ownerships.get(system_id)
+
+    def open_ownership_ids(self) -> List[int]:
+        return [
+            ownership_id
+            for system_id, (ownership_id, _) in self._open_ownerships.items()
+            if system_id not in self._closed_system_ids
+        ]
+
+    def close(self, system_id: int):
+        self._closed_system_ids.add(system_id)
+
+    def add(self, ownership: datamodel.SystemOwnership):
+        self._new_ownerships.append(ownership)
+
+    def flush(self):
+        """
+        Record the IDs of the new ownerships. Call this after the session is flushed and before it is
+        committed, as reading them after the commit would refresh each expired ownership from the database.
+        """
+        self._flushed_ownerships = []
+        for ownership in self._new_ownerships:
+            identity = sqlalchemy.inspect(ownership).identity
+            if identity is not None:
+                self._flushed_ownerships.append(
+                    (ownership.system_id, identity[0], ownership.owner_country_id)
+                )
+
+    def commit(self):
+        for system_id in self._closed_system_ids:
+            self._open_ownerships.pop(system_id, None)
+        for system_id, ownership_id, country_id in self._flushed_ownerships:
+            self._open_ownerships[system_id] = (ownership_id, country_id)
+            self._max_id = max(self._max_id or 0, ownership_id)
+        self._end()
+
+    def rollback(self):
+        self._end()
+
+    def _end(self):
+        self._closed_system_ids.clear()
+        self._new_ownerships.clear()
+        self._flushed_ownerships = []
+
+
+_system_ownership_caches: Dict[str, SystemOwnershipCache] = {}
 
 @dataclasses.dataclass
 class BasicGameInfo:
@@ -54,6 +247,204 @@ class BasicGameInfo:
         return f"{self.game_id} {datamodel.days_to_date(self.date_in_days)}"
 
 
+class HistoricalEventIndex:
+    """
+    In-memory index of the historical events which are still open (or were closed recently)
+    for the event types that processors need to look up while processing a save. This replaces
+    a point query against the (fast-growing) historical_event table for every candidate event.
+
+    Events are loaded once per save. Events added to the session while processing are picked up
+    automatically and become visible to lookups after the next flush, like with a regular query.
+    """
+
+    # events which ended less than 5 years ago can still be re-used, e.g. by governors or terraforming
+    RECENT_EVENT_WINDOW_DAYS = 5 * 360
+    # event types whose events are re-used regardless of when they ended, e.g. when a faction leader returns
+    ALL_AGES_EVENT_TYPES = frozenset({datamodel.HistoricalEventType.faction_leader})
+
+    INDEXED_EVENT_TYPES = frozenset(
+        {
+            datamodel.HistoricalEventType.ruled_empire,
+            datamodel.HistoricalEventType.governed_sector,
+            datamodel.HistoricalEventType.governed_planet,
+            datamodel.HistoricalEventType.councilor,
+            datamodel.HistoricalEventType.faction_leader,
+            datamodel.HistoricalEventType.fleet_command,
+            datamodel.HistoricalEventType.researched_technology,
+            datamodel.HistoricalEventType.edict,
+            datamodel.HistoricalEventType.agenda_preparation,
+            datamodel.HistoricalEventType.colonization,
+            datamodel.HistoricalEventType.terraforming,
+            datamodel.HistoricalEventType.joined_galactic_community,
+            datamodel.HistoricalEventType.joined_galactic_council,
+            datamodel.HistoricalEventType.left_galactic_community,
+            datamodel.HistoricalEventType.left_galactic_council,
+            datamodel.HistoricalEventType.first_contact,
+            datamodel.HistoricalEventType.non_aggression_pact,
+            datamodel.HistoricalEventType.defensive_pact,
+            datamodel.HistoricalEventType.formed_federation,
+            datamodel.HistoricalEventType.commercial_pact,
+            datamodel.HistoricalEventType.research_agreement,
+            datamodel.HistoricalEventType.migration_treaty,
+            datamodel.HistoricalEventType.embassy,
+            datamodel.HistoricalEventType.closed_borders,
+            datamodel.HistoricalEventType.received_closed_borders,
+            datamodel.HistoricalEventType.sent_rivalry,
+            datamodel.HistoricalEventType.received_rivalry,
+            datamodel.HistoricalEventType.envoy_community,
+            datamodel.HistoricalEventType.envoy_federation,
+            datamodel.HistoricalEventType.envoy_improving_relations,
+            datamodel.HistoricalEventType.envoy_harming_relations,
+        }
+    )
+
+    # relationship name -> foreign key column on HistoricalEvent
+    _ATTRIBUTES = {
+        "country": "country_id",
+        "target_country": "target_country_id",
+        "leader": "leader_id",
+        "planet": "planet_id",
+        "system": "system_id",
+        "war": "war_id",
+        "faction": "faction_id",
+        "fleet": "fleet_id",
+        "db_description": "description_id",
+    }
+    # attributes which are used to bucket the events, most selective first
+    _ANCHORS = ("planet", "leader", "country", "db_description")
+
+    def __init__(self, session, date_in_days: int):
+        self._session = session
+        self._events_by_type: Dict[
+            datamodel.HistoricalEventType, List[datamodel.HistoricalEvent]
+        ] = collections.defaultdict(list)
+        self._events_by_anchor: Dict[Tuple, List[datamodel.HistoricalEvent]] = (
+            collections.defaultdict(list)
+        )
+        self._pending_events: List[datamodel.HistoricalEvent] = []
+
+        recent_window_start = date_in_days - self.RECENT_EVENT_WINDOW_DAYS
+        open_events = self._session.query(datamodel.HistoricalEvent).filter(
+            datamodel.HistoricalEvent.event_type.in_(self.INDEXED_EVENT_TYPES),
+            sqlalchemy.or_(
+                datamodel.HistoricalEvent.end_date_days.is_(None),
+                datamodel.HistoricalEvent.end_date_days >= recent_window_start,
+            ),
+        )
+        older_events = self._session.query(datamodel.HistoricalEvent).filter(
+            datamodel.HistoricalEvent.event_type.in_(self.ALL_AGES_EVENT_TYPES),
+            datamodel.HistoricalEvent.end_date_days < recent_window_start,
+        )
+        for event in itertools.chain(open_events, older_events):
+            self._insert(event)
+
+        # keep a reference, event.remove needs the identical callable
+        self._listener = self._on_transient_to_pending
+        sqlalchemy.event.listen(self._session, "transient_to_pending", self._listener)
+
+    def discard_expunged(self):
+        """Drop the events which are no longer in the session, after a savepoint was rolled back."""
+        for events in itertools.chain(
+            self._events_by_type.values(), self._events_by_anchor.values()
+        ):
+            events[:] = [e for e in events if e in self._session]
+        self._pending_events = [e for e in self._pending_events if e in self._session]
+
+    def close(self):
+        sqlalchemy.event.remove(self._session, "transient_to_pending", self._listener)
+        self._events_by_type.clear()
+        self._events_by_anchor.clear()
+        self._pending_events.clear()
+
+    def find(
+        self,
+        event_types: Union[
+            datamodel.HistoricalEventType, Collection[datamodel.HistoricalEventType]
+        ],
+        order_by: str = "start_date_days",
+        **criteria,
+    ) -> Optional[datamodel.HistoricalEvent]:
+        """Return the matching event with the latest value of the order_by attribute, or None."""
+        matches = self.find_all(event_types, **criteria)
+        return max(
+            matches,
+            key=lambda e: (getattr(e, order_by) is not None, getattr(e, order_by) or 0),
+            default=None,
+        )
+
+    def find_all(
+        self,
+        event_types: Union[
+            datamodel.HistoricalEventType, Collection[datamodel.HistoricalEventType]
+        ],
+        **criteria,
+    ) -> List[datamodel.HistoricalEvent]:
+        """
+        Return all indexed events of the given type(s) matching the criteria. Criteria are given as keyword
+        arguments like for session.query(...).filter_by(...), either by relationship (country=country_model)
+        or by column (end_date_days=None).
+        """
+        if isinstance(event_types, datamodel.HistoricalEventType):
+            event_types = (event_types,)
+        self._flush_if_necessary(criteria)
+        filters = [
+            (
+                (self._ATTRIBUTES[name], self._get_primary_key(value))
+                if name in self._ATTRIBUTES
+                else (name, value)
+            )
+            for name, value in criteria.items()
+        ]
+
+        anchor = next((a for a in self._ANCHORS if a in criteria), None)
+        result = []
+        for event_type in event_types:
+            if anchor is None:
+                candidates = self._events_by_type.get(event_type, [])
+            else:
+                key = (event_type, anchor, self._get_primary_key(criteria[anchor]))
+                candidates = self._events_by_anchor.get(key, [])
+            result.extend(
+                e
+                for e in candidates
+                if all(getattr(e, attr) == value for attr, value in filters)
+            )
+        return result
+
+    def _flush_if_necessary(self, criteria):
+        # mirror the autoflush of a regular query: new events and new models used as criteria need primary keys
+        needs_flush = bool(self._pending_events) or any(
+            self._get_primary_key(criteria[name]) is None
+            for name in self._ATTRIBUTES
+            if criteria.get(name) is not None
+        )
+        if needs_flush:
+            self._session.flush()
+        for event in self._pending_events:
+            self._insert(event)
+        self._pending_events.clear()
+
+    def _insert(self, event: datamodel.HistoricalEvent):
+        self._events_by_type[event.event_type].append(event)
+        for anchor in self._ANCHORS:
+            key = (event.event_type, anchor, getattr(event, self._ATTRIBUTES[anchor]))
+            self._events_by_anchor[key].append(event)
+
+    def _on_transient_to_pending(self, session, instance):
+        if (
+            isinstance(instance, datamodel.HistoricalEvent)
+            and instance.event_type in self.INDEXED_EVENT_TYPES
+        ):
+            self._pending_events.append(instance)
+
+    @staticmethod
+    def _get_primary_key(model) -> Optional[int]:
+        if model is None:
+            return None
+        identity = sqlalchemy.inspect(model).identity
+        return identity[0] if identity else None
+
+
 class TimelineExtractor:
     def __init__(self):
         self.basic_info: BasicGameInfo = None
@@ -67,6 +458,12 @@ class TimelineExtractor:
         self._read_basic_game_info(game_id)
         logger.info(f"{self.basic_info.logger_str} Processing Gamestate")
         t_start_gs = time.process_time()
+        description_cache = _shared_description_caches.setdefault(
+            game_id, SharedDescriptionCache()
+        )
+        ownership_cache = _system_ownership_caches.setdefault(
+            game_id, SystemOwnershipCache()
+        )
         with datamodel.get_db_session(game_id=game_id, write=True) as self._session:
             try:
                 db_game = self._get_or_add_game_to_db(game_id)
@@ -76,35 +473,175 @@ class TimelineExtractor:
                     )
                     self._session.rollback()
                     return
+                elif self._check_if_gamestate_was_removed(db_game):
+                    logger.info(
+                        f"{self.basic_info.logger_str} Gamestate for same date was removed due to the retention settings. Aborting..."
+                    )
+                    self._session.rollback()
+                    return
                 else:
-                    self._process_gamestate(db_game)
+                    description_cache.begin(self._session)
+                    ownership_cache.begin(self._session)
+                    db_game_state = self._process_gamestate(db_game)
                 logger.info(
                     f"{self.basic_info.logger_str} Processed Gamestate in {time.process_time() - t_start_gs:.3f} s, "
                     f"writing changes to database"
                 )
+                self._session.flush()
+                description_cache.flush()
+                ownership_cache.flush()
                 self._session.commit()
+                description_cache.commit()
+                ownership_cache.commit()
                 self.number_of_parsed_saves += 1
+                # the save is committed at this point, the following steps only update caches
+                self._update_game_catalog(game_id)
+                self._append_country_data_columns(game_id, db_game_state)
             except Exception as e:
                 self._session.rollback()
+                description_cache.rollback()
+                ownership_cache.rollback()
                 logger.exception(
                     f"{self.basic_info.logger_str} Rolling back changes to database..."
                 )
                 if config.CONFIG.debug_mode or isinstance(e, KeyboardInterrupt):
                     raise e
-                
-            # needs to be cleared between processing saves, see more notes at declaration
-            _shared_description_cache.clear()
+
+    def reprocess_gamestate(
+        self, game_id: str, gamestate_dict: Dict[str, Any], processor_ids: List[str]
+    ):
+        """
+        Re-run the given processors for a gamestate that is already in the database. The rows owned
+        by these processors are deleted and extracted again, all other data is left unchanged.
+
+        Dependencies of the processors are loaded from the database if possible, otherwise they are
+        re-run in a savepoint which is rolled back after their data was collected.
+        """
+        self.check_reprocessable(processor_ids)
+        self._gamestate_dict = gamestate_dict
+        self._read_basic_game_info(game_id)
+        logger.info(f"{self.basic_info.logger_str} Reprocessing Gamestate")
+        t_start_gs = time.process_time()
+        description_cache = _shared_description_caches.setdefault(
+            game_id, SharedDescriptionCache()
+        )
+        ownership_cache = _system_ownership_caches.setdefault(
+            game_id, SystemOwnershipCache()
+        )
+        with datamodel.get_db_session(game_id=game_id, write=True) as self._session:
+            try:
+                db_game = (
+                    self._session.query(datamodel.Game)
+                    .filter_by(game_name=game_id)
+                    .one_or_none()
+                )
+                db_game_state = None
+                if db_game is not None:
+                    db_game_state = (
+                        self._session.query(datamodel.GameState)
+                        .filter_by(game=db_game, date=self.basic_info.date_in_days)
+                        .one_or_none()
+                    )
+                if db_game_state is None:
+                    logger.info(
+                        f"{self.basic_info.logger_str} Gamestate for this date is not in the database. Skipping..."
+                    )
+                    self._session.rollback()
+                    return
+                description_cache.begin(self._session)
+                ownership_cache.begin(self._session)
+                event_index = HistoricalEventIndex(
+                    self._session, self.basic_info.date_in_days
+                )
+                try:
+                    self._rerun_data_processors(
+                        db_game, db_game_state, event_index, set(processor_ids)
+                    )
+                finally:
+                    event_index.close()
+                logger.info(
+                    f"{self.basic_info.logger_str} Reprocessed Gamestate in {time.process_time() - t_start_gs:.3f} s, "
+                    f"writing changes to database"
+                )
+                self._session.flush()
+                description_cache.flush()
+                self._session.commit()
+                description_cache.commit()
+                # ownership changes only happen in rolled back dependencies
+                ownership_cache.rollback()
+            except Exception as e:
+                self._session.rollback()
+                description_cache.rollback()
+                ownership_cache.rollback()
+                logger.exception(
+                    f"{self.basic_info.logger_str} Rolling back changes to database..."
+                )
+                if config.CONFIG.debug_mode or isinstance(e, KeyboardInterrupt):
+                    raise e
+
+    @classmethod
+    def check_reprocessable(cls, processor_ids: Iterable[str]):
+        reprocessable = sorted(
+            p.ID
+            for p in cls._data_processors()
+            if isinstance(p, ReprocessableProcessorMixin)
+        )
+        invalid = sorted(set(processor_ids) - set(reprocessable))
+        if invalid:
+            raise ValueError(
+                f"Cannot reprocess {', '.join(invalid)}. "
+                f"Processors that can be reprocessed: {', '.join(reprocessable)}"
+            )
 
     def _check_if_gamestate_exists(self, db_game):
         existing_dates = {gs.date for gs in db_game.game_states}
         return self.basic_info.date_in_days in existing_dates
 
+    def _check_if_gamestate_was_removed(self, db_game):
+        # importing the save again would add its events and system ownerships a second time
+        return self._session.query(
+            self._session.query(datamodel.RemovedGameState)
+            .filter_by(game_id=db_game.game_id, date=self.basic_info.date_in_days)
+            .exists()
+        ).scalar()
+
     def _process_gamestate(self, db_game):
         db_game_state = datamodel.GameState(
             game=db_game,
             date=self.basic_info.date_in_days,
         )
         self._session.add(db_game_state)
+        event_index = HistoricalEventIndex(self._session, self.basic_info.date_in_days)
+        try:
+            self._run_data_processors(db_game, db_game_state, event_index)
+        finally:
+            event_index.close()
+        datamodel.update_historical_event_participants(self._session)
+        return db_game_state
+
+    def _update_game_catalog(self, game_id: str):
+        # outdated catalog entries are re-read from the database, so a failure here is not fatal either
+        try:
+            datamodel.update_game_catalog(game_id, self._session)
+        except Exception:
+            logger.exception(
+                f"{self.basic_info.logger_str} Could not update the game catalog"
+            )
+
+    def _append_country_data_columns(self, game_id: str, db_game_state):
+        # the columns are only a cache for the dashboard, they are rebuilt when they are read if this fails
+        try:
+            country_data_columns.append_gamestate(
+                game_id,
+                self._session,
+                db_game_state.gamestate_id,
+            )
+        except Exception:
+            logger.exception(
+                f"{self.basic_info.logger_str} Could not update country data columns"
+            )
+
+    def _run_data_processors(self, db_game, db_game_state, event_index):
         all_dependencies = {}
         for data_processor in self._data_processors():
             t_start = time.process_time()
@@ -114,6 +651,7 @@ class TimelineExtractor:
                 db_game_state,
                 self.basic_info,
                 self._session,
+                event_index,
             )
 
             missing_dependencies = sorted(
@@ -139,6 +677,70 @@ class TimelineExtractor:
                     f"{self.basic_info.logger_str}         done ({time.process_time() - t_start:.3f} s)"
                 )
 
+    def _rerun_data_processors(
+        self, db_game, db_game_state, event_index, processor_ids: Set[str]
+    ):
+        data_processors = list(self._data_processors())
+        processors_by_id = {p.ID: p for p in data_processors}
+        required_ids = set()
+        to_visit = list(processor_ids)
+        while to_visit:
+            processor_id = to_visit.pop()
+            if processor_id in required_ids:
+                continue
+            required_ids.add(processor_id)
+            processor = processors_by_id[processor_id]
+            if processor_id in processor_ids or not isinstance(
+                processor, LoadableProcessorMixin
+            ):
+                to_visit.extend(processor.DEPENDENCIES)
+
+        all_dependencies = {}
+        for data_processor in data_processors:
+            if data_processor.ID not in required_ids:
+                continue
+            t_start = time.process_time()
+            data_processor.initialize(
+                db_game,
+                self._gamestate_dict,
+                db_game_state,
+                self.basic_info,
+                self._session,
+                event_index,
+            )
+            if data_processor.ID in processor_ids:
+                logger.info(
+                    f"{self.basic_info.logger_str}   - Reprocessing {data_processor.ID}"
+                )
+                data_processor.delete_gamestate_data()
+                data_processor.extract_data_from_gamestate(
+                    {key: all_dependencies[key] for key in data_processor.DEPENDENCIES}
+                )
+                self._session.flush()
+            elif isinstance(data_processor, LoadableProcessorMixin):
+                logger.info(
+                    f"{self.basic_info.logger_str}   - Loading {data_processor.ID}"
+                )
+                data_processor.load_gamestate_data()
+            else:
+                logger.info(
+                    f"{self.basic_info.logger_str}   - Processing dependency {data_processor.ID}"
+                )
+                savepoint = self._session.begin_nested()
+                data_processor.extract_data_from_gamestate(
+                    {key: all_dependencies[key] for key in data_processor.DEPENDENCIES}
+                )
+                self._session.flush()
+                savepoint.rollback()
+                # the models added in the savepoint were expunged, the processors which run next must not see them
+                _shared_description_caches[self.basic_info.game_id].discard_expunged()
+                _system_ownership_caches[self.basic_info.game_id].rollback()
+                event_index.discard_expunged()
+            all_dependencies[data_processor.ID] = data_processor.data()
+            logger.info(
+                f"{self.basic_info.logger_str}         done ({time.process_time() - t_start:.3f} s)"
+            )
+
     def _get_or_add_game_to_db(self, game_id: str):
         game = self._session.query(datamodel.Game).filter_by(game_name=game_id).first()
         player_country_id = self.basic_info.player_country_id
@@ -200,7 +802,8 @@ class TimelineExtractor:
         # observer mode
         return None
 
-    def _data_processors(self) -> Iterable["AbstractGamestateDataProcessor"]:
+    @staticmethod
+    def _data_processors() -> Iterable["AbstractGamestateDataProcessor"]:
         yield SystemProcessor()
         yield BypassProcessor()
         yield CountryProcessor()
@@ -247,6 +850,7 @@ class AbstractGamestateDataProcessor(abc.ABC):
         self._db_gamestate = None
         self._gamestate_dict = None
         self._session = None
+        self._event_index: Optional[HistoricalEventIndex] = None
 
     def initialize(
         self,
@@ -255,12 +859,14 @@ class AbstractGamestateDataProcessor(abc.ABC):
         gs: datamodel.GameState,
         basic_info: BasicGameInfo,
         db_session,
+        event_index: HistoricalEventIndex,
     ):
         self._basic_info = basic_info
         self._db_game = game
         self._db_gamestate = gs
         self._gamestate_dict = gamestate_dict
         self._session = db_session
+        self._event_index = event_index
         self.initialize_data()
 
     def initialize_data(self):
@@ -274,18 +880,46 @@ class AbstractGamestateDataProcessor(abc.ABC):
         pass
 
     def _get_or_add_shared_description(self, text: str) -> datamodel.SharedDescription:
-        if text in _shared_description_cache:
-            return _shared_description_cache[text]
-        matching_description = (
-            self._session.query(datamodel.SharedDescription)
-            .filter_by(text=text)
-            .one_or_none()
-        )
-        if matching_description is None:
-            matching_description = datamodel.SharedDescription(text=text)
-            self._session.add(matching_description)
-        _shared_description_cache[text] = matching_description
-        return matching_description
+        return _shared_description_caches[self._basic_info.game_id].get_or_add(text)
+
+    def _check_and_update_digest(self, model, digest_attribute: str, *values) -> bool:
+        """
+        Compare the digest of the given source values against the digest stored in the model's
+        digest_attribute, and store the new digest if it changed.
+
+        :return: True, if the values changed since the last save and the model needs to be updated
+        """
+        current_digest = _digest(*values)
+        if current_digest == getattr(model, digest_attribute):
+            return False
+
+        setattr(model, digest_attribute, current_digest)
+        self._session.add(model)
+        return True
+
+
+class ReprocessableProcessorMixin(abc.ABC):
+    """
+    Processors whose rows belong to a single GameState. They can be re-run for existing gamestates
+    with the reprocess command.
+    """
+
+    @abc.abstractmethod
+    def delete_gamestate_data(self):
+        """Delete the rows written by this processor for the current gamestate, before it is reprocessed."""
+        pass
+
+
+class LoadableProcessorMixin(abc.ABC):
+    """
+    Processors whose data can be loaded from an existing GameState, instead of being re-run when they
+    are a dependency of a reprocessed processor.
+    """
+
+    @abc.abstractmethod
+    def load_gamestate_data(self):
+        """Load the data of this processor from the current gamestate, instead of extracting it again."""
+        pass
 
 
 class SystemProcessor(AbstractGamestateDataProcessor):
@@ -533,9 +1167,11 @@ class SystemOwnershipProcessor(AbstractGamestateDataProcessor):
     def __init__(self):
         super().__init__()
         self.systems_by_owner_country_id: Dict[int, Set[datamodel.System]] = None
+        self._closed_ownership_ids: List[int] = None
 
     def initialize_data(self):
         self.systems_by_owner_country_id = collections.defaultdict(set)
+        self._closed_ownership_ids = []
 
     def data(self) -> Dict[int, Set[datamodel.System]]:
         return self.systems_by_owner_country_id
@@ -589,6 +1225,24 @@ class SystemOwnershipProcessor(AbstractGamestateDataProcessor):
                 continue
             self._update_owner(None, system_model)
 
+        self._update_ownership_end_dates()
+
+    def _update_ownership_end_dates(self):
+        ownership_cache = _system_ownership_caches[self._basic_info.game_id]
+        # extend all open ownerships with one UPDATE, and close the ones of systems that changed hands
+        for ownership_ids, end_date_days in [
+            (ownership_cache.open_ownership_ids(), self._basic_info.date_in_days + 1),
+            (self._closed_ownership_ids, self._basic_info.date_in_days - 1),
+        ]:
+            if not ownership_ids:
+                continue
+            self._session.execute(
+                sqlalchemy.update(datamodel.SystemOwnership)
+                .where(datamodel.SystemOwnership.system_ownership_id.in_(ownership_ids))
+                .values(end_date_days=end_date_days)
+                .execution_options(synchronize_session=False)
+            )
+
     def _update_owner(
         self, current_owner: Optional[datamodel.Country], system_model: datamodel.System
     ):
@@ -609,17 +1263,18 @@ class SystemOwnershipProcessor(AbstractGamestateDataProcessor):
             system_model.country = current_owner
             self._session.add(system_model)
 
-            ownership = (
-                self._session.query(datamodel.SystemOwnership)
-                .filter_by(system=system_model)
-                .order_by(datamodel.SystemOwnership.end_date_days.desc())
-                .first()
-            )
-            if ownership is not None:
-                ownership.end_date_days = self._basic_info.date_in_days - 1
-                self._session.add(ownership)
-
-                target_country = ownership.country
+            ownership_cache = _system_ownership_caches[self._basic_info.game_id]
+            open_ownership = ownership_cache.get_open_ownership(system_model.system_id)
+            if open_ownership is not None:
+                ownership_id, previous_owner_id = open_ownership
+                ownership_cache.close(system_model.system_id)
+                self._closed_ownership_ids.append(ownership_id)
+
+                target_country = (
+                    self._session.get(datamodel.Country, previous_owner_id)
+                    if previous_owner_id is not None
+                    else None
+                )
                 if target_country is not None:
                     is_visible = target_country.has_met_player() or (
                         current_owner is not None and current_owner.has_met_player()
@@ -635,14 +1290,14 @@ class SystemOwnershipProcessor(AbstractGamestateDataProcessor):
                         )
                     )
             if current_owner is not None:
-                self._session.add(
-                    datamodel.SystemOwnership(
-                        start_date_days=self._basic_info.date_in_days,
-                        end_date_days=self._basic_info.date_in_days + 1,
-                        country=current_owner,
-                        system=system_model,
-                    )
+                ownership = datamodel.SystemOwnership(
+                    start_date_days=self._basic_info.date_in_days,
+                    end_date_days=self._basic_info.date_in_days + 1,
+                    country=current_owner,
+                    system=system_model,
                 )
+                self._session.add(ownership)
+                ownership_cache.add(ownership)
                 is_visible = current_owner.has_met_player() or (
                     target_country is not None and target_country.has_met_player()
                 )
@@ -817,7 +1472,7 @@ class SensorLinkProcessor(AbstractGamestateDataProcessor):
             )
 
 
-class CountryDataProcessor(AbstractGamestateDataProcessor):
+class CountryDataProcessor(LoadableProcessorMixin, AbstractGamestateDataProcessor):
     ID = "country_data"
     DEPENDENCIES = [
         CountryProcessor.ID,
@@ -836,6 +1491,12 @@ class CountryDataProcessor(AbstractGamestateDataProcessor):
     def data(self):
         return self.country_data_dict
 
+    def load_gamestate_data(self):
+        self.country_data_dict = {
+            country_data.country.country_id_in_game: country_data
+            for country_data in self._db_gamestate.country_data
+        }
+
     def extract_data_from_gamestate(self, dependencies):
         countries_dict = dependencies[CountryProcessor.ID]
         sensor_links = dependencies[SensorLinkProcessor.ID]
@@ -976,6 +1637,8 @@ class CountryDataProcessor(AbstractGamestateDataProcessor):
             return
 
         country = country_data.country
+        store_budget = country.is_player or config.CONFIG.read_all_countries
+        budget_items = []
         for item_name, values in budget_dict.items():
             if item_name == "none":
                 continue
@@ -1018,36 +1681,32 @@ class CountryDataProcessor(AbstractGamestateDataProcessor):
             )
             country_data.net_biomass += resources.get("biomass", 0.0)
 
-            if country.is_player or config.CONFIG.read_all_countries:
-                self._session.add(
-                    datamodel.BudgetItem(
-                        country_data=country_data,
-                        db_budget_item_name=self._get_or_add_shared_description(
-                            item_name
-                        ),
-                        net_energy=resources.get("energy"),
-                        net_minerals=resources.get("minerals"),
-                        net_food=resources.get("food"),
-                        net_alloys=resources.get("alloys"),
-                        net_consumer_goods=resources.get("consumer_goods"),
-                        net_trade=resources.get("trade", 0.0),
-                        net_unity=resources.get("unity"),
-                        net_influence=resources.get("influence"),
-                        net_volatile_motes=values.get("volatile_motes", 0.0),
-                        net_exotic_gases=values.get("exotic_gases", 0.0),
-                        net_rare_crystals=values.get("rare_crystals", 0.0),
-                        net_living_metal=values.get("living_metal", 0.0),
-                        net_zro=values.get("zro", 0.0),
-                        net_dark_matter=values.get("dark_matter", 0.0),
-                        net_nanites=values.get("nanites", 0.0),
-                        net_minor_artifacts=values.get("minor_artifacts", 0.0),
-                        net_astral_threads=values.get("astral_threads", 0.0),
-                        net_biomass=values.get("biomass", 0.0),
-                        net_physics_research=resources.get("physics_research"),
-                        net_society_research=resources.get("society_research"),
-                        net_engineering_research=resources.get("engineering_research"),
-                    )
+            if store_budget:
+                for resource in [
+                    "volatile_motes",
+                    "exotic_gases",
+                    "rare_crystals",
+                    "living_metal",
+                    "zro",
+                    "dark_matter",
+                    "nanites",
+                    "minor_artifacts",
+                    "astral_threads",
+                ]:
+                    resources[resource] = values.get(resource, 0.0)
+                budget_items.append(
+                    (self._get_or_add_shared_description(item_name), resources)
                 )
+
+        if budget_items:
+            if any(description.description_id is None for description, _ in budget_items):
+                # new descriptions need their IDs before they can be packed
+                self._session.flush()
+            self._session.add(
+                datamodel.PackedBudget.from_items(
+                    budget_items, country_data=country_data
+                )
+            )
         self._session.add(country_data)  # update
 
 
@@ -1059,6 +1718,7 @@ class SpeciesProcessor(AbstractGamestateDataProcessor):
         super().__init__()
 
         self._species_by_ingame_id: Dict[int, datamodel.Species] = None
+        self._known_species_by_ingame_id: Dict[int, datamodel.Species] = None
         self._robot_species: Set[int] = None
 
     def initialize_data(self):
@@ -1069,6 +1729,11 @@ class SpeciesProcessor(AbstractGamestateDataProcessor):
         return self._species_by_ingame_id, self._robot_species
 
     def extract_data_from_gamestate(self, dependencies):
+        # known species never change, so they are loaded at once instead of being queried one by one
+        self._known_species_by_ingame_id = {
+            s.species_id_in_game: s
+            for s in self._session.query(datamodel.Species).filter_by(game=self._db_game)
+        }
         for species_ingame_id, species_dict in sorted(
             self._gamestate_dict.get("species_db", {}).items()
         ):
@@ -1079,11 +1744,7 @@ class SpeciesProcessor(AbstractGamestateDataProcessor):
 
     def _get_or_add_species(self, species_id_in_game: int, species_data: Dict):
         species_name = dump_name(species_data.get("name", "Unnamed Species"))
-        species = (
-            self._session.query(datamodel.Species)
-            .filter_by(game=self._db_game, species_id_in_game=species_id_in_game)
-            .one_or_none()
-        )
+        species = self._known_species_by_ingame_id.get(species_id_in_game)
         if species is None:
             species = datamodel.Species(
                 game=self._db_game,
@@ -1266,9 +1927,24 @@ class LeaderProcessor(AbstractGamestateDataProcessor):
         first_name, second_name = self.get_leader_name(leader_dict)
         level = leader_dict.get("level", -1)
         species_id = _extract_id(leader_dict.get("species", -1))
-        leader_species = self._species_dict.get(species_id)
         subclass, leader_traits = self._get_leader_traits(leader_dict)
         ethic = leader_dict.get("ethic", "ethic_neutral")
+        attributes_changed = self._check_and_update_digest(
+            leader,
+            "attributes_hash",
+            first_name,
+            second_name,
+            leader_class,
+            subclass,
+            leader_gender,
+            species_id,
+            leader_traits,
+            country.country_id_in_game if country is not None else None,
+            ethic,
+        )
+        if not attributes_changed:
+            return
+        leader_species = self._species_dict.get(species_id)
         if leader_species is None:
             logger.warning(
                 f"{self._basic_info.logger_str} Invalid species ID {species_id} for leader {leader_dict}"
@@ -1539,8 +2215,8 @@ class PlanetProcessor(AbstractGamestateDataProcessor):
 
         current_entity_counter = collections.Counter(current_entities)
 
-        entities_changed = self._check_and_update_hash(
-            planet_model, current_entity_counter, entity_hash_attribute
+        entities_changed = self._check_and_update_digest(
+            planet_model, entity_hash_attribute, sorted(current_entity_counter.items())
         )
         if not entities_changed:
             return False
@@ -1570,8 +2246,8 @@ class PlanetProcessor(AbstractGamestateDataProcessor):
         """Modifiers are represented differently, hence a new function."""
         current_modifiers = dict(_all_planetary_modifiers(planet_dict))
 
-        modifiers_changed = self._check_and_update_hash(
-            planet_model, current_modifiers, "modifiers_hash"
+        modifiers_changed = self._check_and_update_digest(
+            planet_model, "modifiers_hash", sorted(current_modifiers.items())
         )
         if not modifiers_changed:
             return False
@@ -1609,17 +2285,6 @@ class PlanetProcessor(AbstractGamestateDataProcessor):
                 result.append(d_dict.get("type", "deposit_unknown"))
         return result
 
-    def _check_and_update_hash(
-        self, planet_model: datamodel.Planet, entity_dict, hash_attribute: str
-    ) -> bool:
-        current_hash = hash(frozenset(entity_dict.items()))
-        if current_hash == getattr(planet_model, hash_attribute):
-            return False
-
-        setattr(planet_model, hash_attribute, current_hash)
-        self._session.add(planet_model)
-        return True
-
 
 class SectorColonyEventProcessor(AbstractGamestateDataProcessor):
     ID = "sectors_colonies"
@@ -1789,13 +2454,9 @@ class SectorColonyEventProcessor(AbstractGamestateDataProcessor):
             # set the planet's colonization flag and allow updating the event one last time
             planet_model.colonized_date = colonization_end_date
             self._session.add(planet_model)
-        event = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(
-                event_type=datamodel.HistoricalEventType.colonization,
-                planet=planet_model,
-            )
-            .one_or_none()
+        event = self._event_index.find(
+            datamodel.HistoricalEventType.colonization,
+            planet=planet_model,
         )
         if event is None:
             event = datamodel.HistoricalEvent(
@@ -1834,16 +2495,11 @@ class SectorColonyEventProcessor(AbstractGamestateDataProcessor):
             return
         text = f"{current_pc},{target_pc}"
         matching_description = self._get_or_add_shared_description(text)
-        matching_event = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(
-                event_type=datamodel.HistoricalEventType.terraforming,
-                db_description=matching_description,
-                system=system_model,
-                planet=planet_model,
-            )
-            .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-            .first()
+        matching_event = self._event_index.find(
+            datamodel.HistoricalEventType.terraforming,
+            db_description=matching_description,
+            system=system_model,
+            planet=planet_model,
         )
         if (
             matching_event is None
@@ -1874,14 +2530,10 @@ class SectorColonyEventProcessor(AbstractGamestateDataProcessor):
     ):
         event_type = datamodel.HistoricalEventType.governed_sector if sector_capital == planet else datamodel.HistoricalEventType.governed_planet
         # check if governor was ruling same planet/sector before => update date and return
-        event = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(
-                event_type=event_type,
-                db_description=sector_description,
-            )
-            .order_by(datamodel.HistoricalEvent.end_date_days.desc())
-            .first()
+        event = self._event_index.find(
+            event_type,
+            order_by="end_date_days",
+            db_description=sector_description,
         )
         if (
             event is not None
@@ -2014,15 +2666,10 @@ class RulerEventProcessor(AbstractGamestateDataProcessor):
         self._session.add(country_model)
 
         if previous_ruler is not None:
-            previous_ruler_event = (
-                self._session.query(datamodel.HistoricalEvent)
-                .filter_by(
-                    event_type=datamodel.HistoricalEventType.ruled_empire,
-                    country=country_model,
-                    leader=previous_ruler,
-                )
-                .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-                .first()
+            previous_ruler_event = self._event_index.find(
+                datamodel.HistoricalEventType.ruled_empire,
+                country=country_model,
+                leader=previous_ruler,
             )
             if previous_ruler_event is not None:
                 previous_ruler_event.end_date_days = self._basic_info.date_in_days - 1
@@ -2113,15 +2760,11 @@ class RulerEventProcessor(AbstractGamestateDataProcessor):
             else:
                 expiry_date = datamodel.date_to_days(expiry_date)
             description = self._get_or_add_shared_description(text=edict.get("edict"))
-            matching_event = (
-                self._session.query(datamodel.HistoricalEvent)
-                .filter_by(
-                    event_type=datamodel.HistoricalEventType.edict,
-                    country=country_model,
-                    db_description=description,
-                    end_date_days=expiry_date,
-                )
-                .one_or_none()
+            matching_event = self._event_index.find(
+                datamodel.HistoricalEventType.edict,
+                country=country_model,
+                db_description=description,
+                end_date_days=expiry_date,
             )
             if matching_event is None:
                 country_data = country_model.get_most_recent_data()
@@ -2160,6 +2803,7 @@ class CouncilProcessor(AbstractGamestateDataProcessor):
           return
         
         active_council_positions = set() # used to check if any open HistoricalEvents need to be closed
+        positions_by_country = collections.defaultdict(list)
         for cp_id, council_position in sorted(
             self._gamestate_dict["council_positions"]["council_positions"].items()
         ):
@@ -2171,19 +2815,40 @@ class CouncilProcessor(AbstractGamestateDataProcessor):
             if not all([country_model, leader_model, councilor_type]):
                 logger.debug(f"No councilor assigned: %s", council_position)
                 continue
-            desc = self._get_or_add_shared_description(councilor_type)
             active_council_positions.add(f"{country_model.country_id}-{leader_model.leader_id}-{councilor_type}")
+            positions_by_country[country_model].append((leader_model, councilor_type))
+
+        # also check countries without any positions, so the digest is reset when the council is vacated
+        for country_model in countries_by_id.values():
+            positions = positions_by_country.get(country_model, [])
+            council_changed = self._check_and_update_digest(
+                country_model,
+                "council_hash",
+                # the in-game ID is set even for leaders which were added in this save and are not flushed yet
+                sorted((l.leader_id_in_game, c_type) for l, c_type in positions),
+                country_model.has_met_player(),
+            )
+            if council_changed:
+                self._update_councilor_events(country_model, positions)
 
-            previous_event = (
-                self._session.query(datamodel.HistoricalEvent)
-                .filter_by(
-                    event_type=datamodel.HistoricalEventType.councilor,
-                    country=country_model,
-                    db_description=desc,
-                    end_date_days=None,
-                )
-                .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-                .first()
+        # check if there are any open events that need to be closed (eg the position doesn't exist anymore)
+        open_councilor_events = self._event_index.find_all(
+            datamodel.HistoricalEventType.councilor, end_date_days=None
+        )
+        for event in open_councilor_events:
+            key = f"{event.country_id}-{event.leader_id}-{event.db_description.text}"
+            if key not in active_council_positions:
+                event.end_date_days = self._basic_info.date_in_days - 1
+                self._session.add(event)
+
+    def _update_councilor_events(self, country_model: datamodel.Country, positions):
+        for leader_model, councilor_type in positions:
+            desc = self._get_or_add_shared_description(councilor_type)
+            previous_event = self._event_index.find(
+                datamodel.HistoricalEventType.councilor,
+                country=country_model,
+                db_description=desc,
+                end_date_days=None,
             )
             add_new_event = True
             if previous_event is not None:
@@ -2206,18 +2871,6 @@ class CouncilProcessor(AbstractGamestateDataProcessor):
                     )
                 )
 
-        # check if there are any open events that need to be closed (eg the position doesn't exist anymore)
-        open_councilor_events = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(event_type=datamodel.HistoricalEventType.councilor, end_date_days=None)
-        )
-        for event in open_councilor_events:
-            key = f"{event.country_id}-{event.leader_id}-{event.db_description.text}"
-            if key not in active_council_positions:
-                event.end_date_days = self._basic_info.date_in_days - 1
-                self._session.add(event)
-
-
     def _update_council_agenda(self, countries_by_id, rulers_by_id):
         for country_id, country_model in countries_by_id.items():
             gov_dict = self._gamestate_dict["country"][country_id].get("government")
@@ -2245,14 +2898,9 @@ class CouncilProcessor(AbstractGamestateDataProcessor):
                 if unresolved_db_agenda is None
                 else unresolved_db_agenda.db_name.text
             )
-            last_prep_event: Optional[datamodel.HistoricalEvent] = (
-                self._session.query(datamodel.HistoricalEvent)
-                .filter_by(
-                    country=country_model,
-                    event_type=datamodel.HistoricalEventType.agenda_preparation,
-                )
-                .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-                .first()
+            last_prep_event: Optional[datamodel.HistoricalEvent] = self._event_index.find(
+                datamodel.HistoricalEventType.agenda_preparation,
+                country=country_model,
             )
             if unresolved_db_agenda is None:
                 if in_progress_agenda is not None:
@@ -2342,6 +2990,7 @@ class GovernmentProcessor(AbstractGamestateDataProcessor):
         countries_dict = dependencies[CountryProcessor.ID]
         rulers_dict = dependencies[RulerEventProcessor.ID]
 
+        unchanged_country_ids = []
         for country_id, country_model in countries_dict.items():
             country_dict = self._gamestate_dict["country"][country_id]
             gov_name = dump_name(country_dict.get("name", "Unnamed Country"))
@@ -2359,6 +3008,18 @@ class GovernmentProcessor(AbstractGamestateDataProcessor):
             gov_type = gov_dict.get("type", "other")
             gov_was_reformed = False
 
+            government_changed = self._check_and_update_digest(
+                country_model,
+                "government_hash",
+                gov_name,
+                gov_type,
+                sorted(ethics),
+                sorted(civics),
+            )
+            if not government_changed:
+                unchanged_country_ids.append(country_model.country_id)
+                continue
+
             prev_gov = (
                 self._session.query(datamodel.Government)
                 .filter(
@@ -2425,6 +3086,30 @@ class GovernmentProcessor(AbstractGamestateDataProcessor):
                         event_is_known_to_player=country_model.has_met_player(),
                     )
                 )
+        self._extend_current_governments(unchanged_country_ids)
+
+    def _extend_current_governments(self, country_ids: List[int]):
+        """Extend the current government of each unchanged country with one UPDATE statement."""
+        if not country_ids:
+            return
+        previous_gov = sqlalchemy.orm.aliased(datamodel.Government)
+        current_gov_start_date = (
+            sqlalchemy.select(sqlalchemy.func.max(previous_gov.start_date_days))
+            .where(
+                previous_gov.country_id == datamodel.Government.country_id,
+                previous_gov.start_date_days <= self._basic_info.date_in_days,
+            )
+            .scalar_subquery()
+        )
+        self._session.execute(
+            sqlalchemy.update(datamodel.Government)
+            .where(
+                datamodel.Government.country_id.in_(country_ids),
+                datamodel.Government.start_date_days == current_gov_start_date,
+            )
+            .values(end_date_days=self._basic_info.date_in_days - 1)
+            .execution_options(synchronize_session=False)
+        )
 
 
 class PolicyProcessor(AbstractGamestateDataProcessor):
@@ -2437,6 +3122,16 @@ class PolicyProcessor(AbstractGamestateDataProcessor):
 
         for country_id, country_model in countries_dict.items():
             current_stance_per_policy = self._get_current_policies(country_id)
+            policies_changed = self._check_and_update_digest(
+                country_model,
+                "policies_hash",
+                sorted(
+                    (str(policy), str(selected))
+                    for policy, (selected, _) in current_stance_per_policy.items()
+                ),
+            )
+            if not policies_changed:
+                continue
 
             previous_policy_by_name = self._load_previous_policies(country_model)
 
@@ -2550,6 +3245,7 @@ class FactionProcessor(AbstractGamestateDataProcessor):
     def __init__(self):
         super().__init__()
         self.faction_by_ingame_id: Dict[int, datamodel.Leader] = None
+        self._known_factions: Dict[Tuple[int, int], datamodel.PoliticalFaction] = None
         self._leaders_dict = None
 
     def initialize_data(self):
@@ -2561,6 +3257,11 @@ class FactionProcessor(AbstractGamestateDataProcessor):
     def extract_data_from_gamestate(self, dependencies):
         countries_dict = dependencies[CountryProcessor.ID]
         self._leaders_dict = dependencies[LeaderProcessor.ID]
+        # known factions never change, so they are loaded at once instead of being queried one by one
+        self._known_factions = {
+            (f.country_id, f.faction_id_in_game): f
+            for f in self._session.query(datamodel.PoliticalFaction)
+        }
 
         for faction_id, faction_dict in sorted(
             self._gamestate_dict.get("pop_factions", {}).items()
@@ -2599,11 +3300,8 @@ class FactionProcessor(AbstractGamestateDataProcessor):
         country_model: datamodel.Country,
         faction_type: str,
     ):
-        faction = (
-            self._session.query(datamodel.PoliticalFaction)
-            .filter_by(faction_id_in_game=faction_id_in_game, country=country_model)
-            .one_or_none()
-        )
+        key = (country_model.country_id, faction_id_in_game)
+        faction = self._known_factions.get(key)
         if faction is None:
             faction = datamodel.PoliticalFaction(
                 country=country_model,
@@ -2612,6 +3310,7 @@ class FactionProcessor(AbstractGamestateDataProcessor):
                 db_faction_type=self._get_or_add_shared_description(faction_type),
             )
             self._session.add(faction)
+            self._known_factions[key] = faction
             if faction_id_in_game not in FactionProcessor.NO_FACTION_ID_MAP.values():
                 self._session.add(
                     datamodel.HistoricalEvent(
@@ -2640,15 +3339,11 @@ class FactionProcessor(AbstractGamestateDataProcessor):
             )
             logger.debug(f"{self._basic_info.logger_str}     {faction_dict}")
             return
-        matching_event = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(
-                country=country_model,
-                leader=leader,
-                event_type=datamodel.HistoricalEventType.faction_leader,
-                faction=faction_model,
-            )
-            .one_or_none()
+        matching_event = self._event_index.find(
+            datamodel.HistoricalEventType.faction_leader,
+            country=country_model,
+            leader=leader,
+            faction=faction_model,
         )
         is_known = country_model.has_met_player()
         if matching_event is None:
@@ -2830,22 +3525,29 @@ class DiplomacyUpdatesProcessor(AbstractGamestateDataProcessor):
         country: datamodel.Country,
         target_country: datamodel.Country,
     ) -> Optional[datamodel.HistoricalEvent]:
-        return (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(
-                event_type=event_type,
-                country=country,
-                target_country=target_country,
-            )
-            .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-            .first()
+        return self._event_index.find(
+            event_type,
+            country=country,
+            target_country=target_country,
         )
 
 
-class GalacticMarketProcessor(AbstractGamestateDataProcessor):
+class GalacticMarketProcessor(
+    ReprocessableProcessorMixin, AbstractGamestateDataProcessor
+):
     ID = "galactic_market"
     DEPENDENCIES = []
 
+    def delete_gamestate_data(self):
+        self._session.execute(
+            sqlalchemy.delete(datamodel.GalacticMarketResource)
+            .where(
+                datamodel.GalacticMarketResource.game_state_id
+                == self._db_gamestate.gamestate_id
+            )
+            .execution_options(synchronize_session=False)
+        )
+
     def extract_data_from_gamestate(self, dependencies):
         market = self._gamestate_dict.get("market", {})
         resource_list = market.get("galactic_market_resources", [])
@@ -2889,10 +3591,19 @@ class GalacticMarketProcessor(AbstractGamestateDataProcessor):
             )
 
 
-class InternalMarketProcessor(AbstractGamestateDataProcessor):
+class InternalMarketProcessor(
+    ReprocessableProcessorMixin, AbstractGamestateDataProcessor
+):
     ID = "internal_market"
     DEPENDENCIES = [CountryDataProcessor.ID]
 
+    def delete_gamestate_data(self):
+        _delete_country_data_rows(
+            self._session,
+            self._db_gamestate,
+            datamodel.InternalMarketResource.country_data_id,
+        )
+
     def extract_data_from_gamestate(self, dependencies):
         country_data_dict = dependencies[CountryDataProcessor.ID]
 
@@ -3000,15 +3711,10 @@ class GalacticCommunityProcessor(AbstractGamestateDataProcessor):
             )
             return
         event_is_known = country.has_met_player()
-        previous_event = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter(
-                datamodel.HistoricalEvent.event_type.in_(matching_event_types),
-                datamodel.HistoricalEvent.country == country,
-                datamodel.HistoricalEvent.end_date_days.is_(None),
-            )
-            .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-            .first()
+        previous_event = self._event_index.find(
+            matching_event_types,
+            country=country,
+            end_date_days=None,
         )
         if previous_event is None and new_event_type in (
             datamodel.HistoricalEventType.left_galactic_community,
@@ -3127,14 +3833,10 @@ class ScientistEventProcessor(AbstractGamestateDataProcessor):
 
     def _get_matching_historical_event(self, country_model, tech_name):
         matching_description = self._get_or_add_shared_description(text=tech_name)
-        matching_event = (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter_by(
-                event_type=datamodel.HistoricalEventType.researched_technology,
-                country=country_model,
-                db_description=matching_description,
-            )
-            .one_or_none()
+        matching_event = self._event_index.find(
+            datamodel.HistoricalEventType.researched_technology,
+            country=country_model,
+            db_description=matching_description,
         )
         return matching_event
 
@@ -3222,22 +3924,15 @@ class EnvoyEventProcessor(AbstractGamestateDataProcessor):
         # officials now do some assignments (galcom, federation) that envoys did previously
         # however, the previous assignment logic breaks when officials then do other things (like being a councilor)
         # to prevent this, we only consider actual envoy assignment events
-        return (
-            self._session.query(datamodel.HistoricalEvent)
-            .filter(datamodel.HistoricalEvent.end_date_days.is_(None))
-            .filter(
-                datamodel.HistoricalEvent.event_type.in_(
-                    {
-                        datamodel.HistoricalEventType.envoy_community,
-                        datamodel.HistoricalEventType.envoy_federation,
-                        datamodel.HistoricalEventType.envoy_improving_relations,
-                        datamodel.HistoricalEventType.envoy_harming_relations,
-                    }
-                )
-            )
-            .filter_by(leader=envoy)
-            .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-            .first()
+        return self._event_index.find(
+            {
+                datamodel.HistoricalEventType.envoy_community,
+                datamodel.HistoricalEventType.envoy_federation,
+                datamodel.HistoricalEventType.envoy_improving_relations,
+                datamodel.HistoricalEventType.envoy_harming_relations,
+            },
+            leader=envoy,
+            end_date_days=None,
         )
 
 
@@ -3355,14 +4050,9 @@ class FleetInfoProcessor(AbstractGamestateDataProcessor):
             if new_fleet_command == leader_model.fleet_command:
                 continue
 
-            previous_event = (
-                self._session.query(datamodel.HistoricalEvent)
-                .filter_by(
-                    event_type=datamodel.HistoricalEventType.fleet_command,
-                    leader=leader_model,
-                )
-                .order_by(datamodel.HistoricalEvent.start_date_days.desc())
-                .first()
+            previous_event = self._event_index.find(
+                datamodel.HistoricalEventType.fleet_command,
+                leader=leader_model,
             )
             if previous_event is not None:
                 if previous_event.fleet == new_fleet_command:
@@ -3744,7 +4434,7 @@ class TruceProcessor(AbstractGamestateDataProcessor):
                 )
 
 
-class PopStatsProcessor(AbstractGamestateDataProcessor):
+class PopStatsProcessor(ReprocessableProcessorMixin, AbstractGamestateDataProcessor):
     ID = "pop_stats"
     DEPENDENCIES = [
         CountryProcessor.ID,
@@ -3757,6 +4447,19 @@ class PopStatsProcessor(AbstractGamestateDataProcessor):
         super().__init__()
         self.country_by_planet_id = None
 
+    def delete_gamestate_data(self):
+        for country_data_column in [
+            datamodel.PopStatsBySpecies.country_data_id,
+            datamodel.PopStatsByFaction.country_data_id,
+            datamodel.PopStatsByJob.country_data_id,
+            datamodel.PopStatsByStratum.country_data_id,
+            datamodel.PopStatsByEthos.country_data_id,
+            datamodel.PlanetStats.countrydata_id,
+        ]:
+            _delete_country_data_rows(
+                self._session, self._db_gamestate, country_data_column
+            )
+
     def initialize_data(self):
         self._initialize_planet_owner_dict()
 
@@ -4024,6 +4727,21 @@ class PopStatsProcessor(AbstractGamestateDataProcessor):
                 self.country_by_planet_id[planet_id] = country_id
 
 
+def _delete_country_data_rows(session, db_gamestate, country_data_column):
+    """Delete the rows of the column's table which belong to the CountryData of the given gamestate."""
+    session.execute(
+        sqlalchemy.delete(country_data_column.class_)
+        .where(
+            country_data_column.in_(
+                sqlalchemy.select(datamodel.CountryData.country_data_id).where(
+                    datamodel.CountryData.game_state_id == db_gamestate.gamestate_id
+                )
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
 def _all_planetary_modifiers(planet_dict) -> Iterable[Tuple[str, int]]:
     modifiers = planet_dict.get("timed_modifier", [])
     if not isinstance(modifiers, list):
@@ -1,13 +1,56 @@
+from typing import Any, Dict
+
 import pytest
 
 from stellarisdashboard import config as dashboard_config
 
+import generated_game_db
+
 
 @pytest.fixture(scope="session", autouse=True)
 def initialize_config():
     dashboard_config.initialize()
 
 
+@pytest.fixture(scope="module")
+def game_db(request, tmp_path_factory):
+    """
+    The database of generated_game_db. Each module gets its own game ID, as the database engines are
+    kept per game ID.
+    """
+    game_id = f"generatedgame_123_{request.module.__name__}"
+    original_output_path = dashboard_config.CONFIG.base_output_path
+    dashboard_config.CONFIG.base_output_path = tmp_path_factory.mktemp("output")
+    dashboard_config.CONFIG.db_path.mkdir(parents=True, exist_ok=True)
+    generated_game_db.generate(game_id)
+    yield game_id
+    dashboard_config.CONFIG.base_output_path = original_output_path
+
+
+@pytest.fixture
+def isolated_game_id(request, tmp_path, monkeypatch):
+    """A game ID of the current test, whose database is written to the tmp_path of the test."""
+    monkeypatch.setattr(dashboard_config.CONFIG, "base_output_path", tmp_path)
+    dashboard_config.CONFIG.db_path.mkdir(parents=True, exist_ok=True)
+    return f"{request.module.__name__}_{request.node.name}"
+
+
+def get_minimal_gamestate_dict(date: str) -> Dict[str, Any]:
+    """A save with only the player country, which has just enough data to be processed."""
+    return {
+        "date": date,
+        "player": [{"name": "player", "country": 0}],
+        "country": {0: {"name": {"key": "Player Empire"}, "type": "default"}},
+        "galaxy": {},
+        "galactic_object": {},
+        "ships": {},
+        "fleet": {},
+        "leaders": {},
+        "pop_jobs": {},
+        "pop_groups": {},
+    }
+
+
 def pytest_configure(config):
     config.addinivalue_line(
         "markers", "skip_github_actions: mark tests to only run locally"
@@ -0,0 +1,125 @@
+import pytest
+import sqlalchemy
+
+from stellarisdashboard import config, country_data_columns, datamodel
+from stellarisdashboard.dashboard_app import visualization_data
+
+PLAYER_ID = 1
+MET_ID = 2
+UNMET_ID = 3
+
+
+@pytest.fixture
+def game_db(isolated_game_id, monkeypatch):
+    """A game with the player, a country the player has met, and a country the player has not met yet."""
+    game_id = isolated_game_id
+    monkeypatch.setattr(config.CONFIG, "show_everything", False)
+    monkeypatch.setattr(config.CONFIG, "include_id_in_names", False)
+    with datamodel.get_db_session(game_id, write=True) as session:
+        session.execute(
+            sqlalchemy.insert(datamodel.Game),
+            [dict(game_id=1, game_name=game_id)],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.Country),
+            [
+                dict(
+                    country_id=c,
+                    game_id=1,
+                    country_id_in_game=c,
+                    country_name=f'{{"key": "Country {c}"}}',
+                    country_type="default" if c != UNMET_ID else "fallen_empire",
+                    is_player=c == PLAYER_ID,
+                    first_player_contact_date=0 if c == MET_ID else None,
+                )
+                for c in [PLAYER_ID, MET_ID, UNMET_ID]
+            ],
+        )
+        session.commit()
+    add_gamestate(game_id, gamestate_id=1, date=0)
+    return game_id
+
+
+def add_gamestate(game_id: str, gamestate_id: int, date: int):
+    with datamodel.get_db_session(game_id, write=True) as session:
+        session.execute(
+            sqlalchemy.insert(datamodel.GameState),
+            [dict(gamestate_id=gamestate_id, game_id=1, date=date)],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.CountryData),
+            [
+                dict(country_id=c, game_state_id=gamestate_id, date=date)
+                for c in [PLAYER_ID, MET_ID, UNMET_ID]
+            ],
+        )
+        session.commit()
+
+
+def get_row(info: visualization_data.CountryColumnInfo, date: int, country_id: int):
+    return [
+        i
+        for i, (d, c) in enumerate(zip(info.dates, info.country_ids))
+        if d == date and c == country_id
+    ][0]
+
+
+def test_country_column_info_is_extended(game_db):
+    previous = visualization_data.CountryColumnInfo.load(
+        game_db, country_data_columns.load(game_db)
+    )
+    assert len(previous.names) == 3
+    assert previous.is_hidden[get_row(previous, 0, UNMET_ID)]
+    assert not previous.is_hidden[get_row(previous, 0, MET_ID)]
+
+    # the player meets the country, and it is renamed
+    with datamodel.get_db_session(game_db, write=True) as session:
+        session.execute(
+            sqlalchemy.update(datamodel.Country)
+            .where(datamodel.Country.country_id == UNMET_ID)
+            .values(first_player_contact_date=100, country_name='{"key": "Renamed"}')
+        )
+        session.commit()
+    add_gamestate(game_db, gamestate_id=2, date=100)
+
+    columns = country_data_columns.load(game_db)
+    extended = visualization_data.CountryColumnInfo.load(game_db, columns, previous)
+    assert len(extended.names) == len(columns) == 6
+    # the rows of the first gamestate are kept as they were
+    old_row = get_row(extended, 0, UNMET_ID)
+    assert extended.is_hidden[old_row]
+    assert extended.names[old_row] == previous.names[get_row(previous, 0, UNMET_ID)]
+    new_row = get_row(extended, 100, UNMET_ID)
+    assert not extended.is_hidden[new_row]
+    assert extended.names[new_row] == "Renamed"
+    assert extended.country_ids_in_game[new_row] == UNMET_ID
+    assert not extended.is_default_type[new_row]
+    assert extended.is_player[get_row(extended, 100, PLAYER_ID)]
+    assert not extended.is_player[get_row(extended, 100, MET_ID)]
+
+    # the new rows match the info that is loaded from scratch
+    expected = visualization_data.CountryColumnInfo.load(game_db, columns)
+    assert extended.names[3:] == expected.names[3:]
+    for attribute in [
+        "country_ids_in_game",
+        "is_player",
+        "is_default_type",
+        "is_hidden",
+    ]:
+        assert (getattr(extended, attribute) == getattr(expected, attribute))[3:].all()
+
+
+def test_country_column_info_is_reloaded_for_rebuilt_columns(game_db):
+    previous = visualization_data.CountryColumnInfo.load(
+        game_db, country_data_columns.load(game_db)
+    )
+    # columns which no longer start with the known rows, e.g. after gamestates were removed
+    columns = country_data_columns.CountryDataColumns(
+        {
+            "date": previous.dates[::-1].copy() + 100,
+            "country_id": previous.country_ids[::-1].copy(),
+        }
+    )
+    reloaded = visualization_data.CountryColumnInfo.load(game_db, columns, previous)
+    assert list(reloaded.country_ids) == list(columns["country_id"])
+    assert list(reloaded.dates) == list(columns["date"])
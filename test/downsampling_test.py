@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from stellarisdashboard.dashboard_app import visualization_data
+
+
+class LineDataContainer(visualization_data.AbstractPlotDataContainer):
+    def extract_data_from_gamestate(self, context):
+        pass
+
+
+def _fill_container(values_by_key):
+    container = LineDataContainer(country_perspective=None)
+    num_dates = len(next(iter(values_by_key.values())))
+    for date in range(num_dates):
+        container._append_date(date * 360)
+        for key, values in values_by_key.items():
+            if not np.isnan(values[date]):
+                container._add_new_value(key, values[date])
+    return container
+
+
+@pytest.mark.parametrize("num_points", [3, 10, 100])
+def test_lttb_keeps_endpoints_and_spikes(num_points):
+    rng = np.random.default_rng(0)
+    x = np.arange(1000, dtype=float)
+    y = rng.normal(size=1000)
+    y[437] = 100.0
+
+    indices = visualization_data._lttb_indices(x, y, num_points)
+
+    assert len(indices) == num_points
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+
+
+def test_lttb_keeps_short_traces():
+    x = np.arange(5, dtype=float)
+    indices = visualization_data._lttb_indices(x, x, 10)
+    assert indices.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsampled_line_keeps_gaps():
+    y = np.arange(200, dtype=float)
+    y[50:80] = np.nan
+    container = _fill_container({"a": y})
+
+    [(key, dates, values)] = container.iterate_traces(num_points=20)
+
+    assert len(values) == 21
+    gap = [i for i, v in enumerate(values) if np.isnan(v)]
+    assert len(gap) == 1
+    assert dates[gap[0]] == 50.0
+    assert dates[0] == 0.0 and dates[-1] == 199.0
+
+
+def test_downsampled_stacked_traces_share_dates():
+    rng = np.random.default_rng(1)
+    container = _fill_container(
+        {"a": rng.uniform(size=300), "b": rng.uniform(size=300)}
+    )
+
+    traces = list(container.iterate_traces(num_points=30, shared_dates=True))
+
+    assert len(traces) == 2
+    assert traces[0][1] == traces[1][1]
+    assert len(traces[0][1]) == 30
+
+
+def test_no_downsampling_below_num_points():
+    container = _fill_container({"a": np.arange(10, dtype=float)})
+    [(_, dates, values)] = container.iterate_traces(num_points=10)
+    assert values == list(range(10))
+    assert len(dates) == 10
@@ -0,0 +1,78 @@
+import csv
+
+import numpy as np
+import pytest
+
+from stellarisdashboard import datamodel, export
+
+from generated_game_db import MAX_BUDGET_ITEMS
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def get_expected_budget_rows(game_id):
+    with datamodel.get_db_session(game_id) as session:
+        return sum(
+            len(np.frombuffer(description_ids, dtype=np.int32))
+            for description_ids, in session.query(
+                datamodel.PackedBudget.description_ids
+            )
+        )
+
+
+def test_export_csv(game_db, tmp_path):
+    files = export.export_game(game_db, tmp_path, "csv")
+
+    expected_names = {
+        f"{table.name}.csv" for table in datamodel.Base.metadata.sorted_tables
+    }
+    assert {f.name for f in files} == expected_names
+    assert {f.name for f in tmp_path.iterdir()} == expected_names
+
+    events = read_csv(tmp_path / "historical_event.csv")
+    assert events
+    for event in events:
+        if event["description_id"]:
+            assert event["description_text"] == f"Description {event['description_id']}"
+        else:
+            assert event["description_text"] == ""
+        assert event["country_name"] == f"Country {event['country_id']}"
+        assert event["event_type"] in datamodel.HistoricalEventType.__members__
+
+    countries = read_csv(tmp_path / "country.csv")
+    assert all(c["rendered_name"] == f"Country {c['country_id']}" for c in countries)
+
+    budget = read_csv(tmp_path / "packed_budget.csv")
+    assert len(budget) == get_expected_budget_rows(game_db)
+    assert {row["budget_item"] for row in budget} == {
+        f"Description {d}" for d in range(1, MAX_BUDGET_ITEMS + 1)
+    }
+    # the fixture fills each budget with its country data ID
+    for row in budget:
+        assert all(
+            float(row[resource]) == float(row["country_data_id"])
+            for resource in datamodel.BUDGET_RESOURCES
+        )
+
+
+def test_export_parquet(game_db, tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    files = export.export_game(game_db, tmp_path, "parquet")
+
+    assert {f.name for f in files} == {
+        f"{table.name}.parquet" for table in datamodel.Base.metadata.sorted_tables
+    }
+    events = pyarrow.parquet.read_table(tmp_path / "historical_event.parquet")
+    assert {"description_text", "country_name"} <= set(events.column_names)
+    budget = pyarrow.parquet.read_table(tmp_path / "packed_budget.parquet")
+    assert budget.num_rows == get_expected_budget_rows(game_db)
+
+
+def test_export_unknown_format(game_db, tmp_path):
+    with pytest.raises(ValueError):
+        export.export_game(game_db, tmp_path, "xlsx")
@@ -0,0 +1,186 @@
+"""
+A generated game database which is large enough for the SQLite query planner to prefer indexes,
+shared by the test modules through the game_db fixture in conftest.py.
+"""
+
+import random
+
+import numpy as np
+import sqlalchemy
+
+from stellarisdashboard import datamodel
+
+NUM_COUNTRIES = 40
+NUM_GAMESTATES = 200
+NUM_SYSTEMS = 1000
+NUM_LEADERS = 400
+NUM_PLANETS = 500
+NUM_WARS = 50
+NUM_EVENTS = 20000
+NUM_DESCRIPTIONS = 1000
+# every this many gamestates, the countries have a packed budget with up to this many items
+BUDGET_INTERVAL = 10
+MAX_BUDGET_ITEMS = 5
+
+
+def generate(game_id: str):
+    """Fill the database of the game, which must not exist yet."""
+    rng = random.Random(0)
+    with datamodel.get_db_session(game_id, write=True) as session:
+        session.execute(
+            sqlalchemy.insert(datamodel.Game),
+            [
+                dict(
+                    game_id=1,
+                    game_name=game_id,
+                    player_country_name='{"key": "Player"}',
+                )
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.Country),
+            [
+                dict(
+                    country_id=c,
+                    game_id=1,
+                    country_id_in_game=c,
+                    country_name=f'{{"key": "Country {c}"}}',
+                    country_type="default",
+                    is_player=c == 1,
+                )
+                for c in range(1, NUM_COUNTRIES + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.GameState),
+            [
+                dict(gamestate_id=g, game_id=1, date=30 * g)
+                for g in range(1, NUM_GAMESTATES + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.CountryData),
+            [
+                dict(
+                    country_data_id=_get_country_data_id(g, c),
+                    country_id=c,
+                    game_state_id=g,
+                    date=30 * g,
+                )
+                for g in range(1, NUM_GAMESTATES + 1)
+                for c in range(1, NUM_COUNTRIES + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.SharedDescription),
+            [
+                dict(description_id=d, text=f"Description {d}")
+                for d in range(1, NUM_DESCRIPTIONS + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.PackedBudget),
+            [
+                _packed_budget(_get_country_data_id(g, c), c % MAX_BUDGET_ITEMS + 1)
+                for g in range(BUDGET_INTERVAL, NUM_GAMESTATES + 1, BUDGET_INTERVAL)
+                for c in range(1, NUM_COUNTRIES + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.System),
+            [
+                dict(
+                    system_id=s,
+                    game_id=1,
+                    system_id_in_game=s,
+                    country_id=rng.randint(1, NUM_COUNTRIES) if s % 2 else None,
+                    coordinate_x=0.0,
+                    coordinate_y=0.0,
+                )
+                for s in range(1, NUM_SYSTEMS + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.SystemOwnership),
+            [
+                dict(
+                    system_id=s,
+                    owner_country_id=rng.randint(1, NUM_COUNTRIES),
+                    start_date_days=1000 * i,
+                    end_date_days=1000 * i + 999,
+                )
+                for s in range(1, NUM_SYSTEMS + 1)
+                for i in range(3)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.Leader),
+            [
+                dict(
+                    leader_id=l,
+                    game_id=1,
+                    country_id=rng.randint(1, NUM_COUNTRIES),
+                    leader_id_in_game=l,
+                )
+                for l in range(1, NUM_LEADERS + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.Planet),
+            [
+                dict(
+                    planet_id=p,
+                    planet_id_in_game=p,
+                    system_id=rng.randint(1, NUM_SYSTEMS),
+                )
+                for p in range(1, NUM_PLANETS + 1)
+            ],
+        )
+        session.execute(
+            sqlalchemy.insert(datamodel.War),
+            [
+                dict(war_id=w, game_id=1, war_id_in_game=w, start_date_days=10 * w)
+                for w in range(1, NUM_WARS + 1)
+            ],
+        )
+        event_types = list(datamodel.HistoricalEventType)
+        session.execute(
+            sqlalchemy.insert(datamodel.HistoricalEvent),
+            [
+                dict(
+                    event_type=rng.choice(event_types),
+                    start_date_days=rng.randint(0, 30 * NUM_GAMESTATES),
+                    end_date_days=rng.choice(
+                        [None, rng.randint(0, 30 * NUM_GAMESTATES)]
+                    ),
+                    event_is_known_to_player=True,
+                    country_id=rng.randint(1, NUM_COUNTRIES),
+                    leader_id=rng.choice([None, rng.randint(1, NUM_LEADERS)]),
+                    system_id=rng.choice([None, rng.randint(1, NUM_SYSTEMS)]),
+                    planet_id=rng.choice([None, rng.randint(1, NUM_PLANETS)]),
+                    war_id=rng.choice([None] * 9 + [rng.randint(1, NUM_WARS)]),
+                    description_id=rng.choice([None, rng.randint(1, NUM_DESCRIPTIONS)]),
+                )
+                for _ in range(NUM_EVENTS)
+            ],
+        )
+        datamodel.update_historical_event_participants(session)
+        session.commit()
+    # the dashboard runs on analyzed databases, see datamodel.maintain_db
+    datamodel.maintain_db(game_id, analyze=True)
+
+
+def _get_country_data_id(gamestate_id: int, country_id: int) -> int:
+    return (gamestate_id - 1) * NUM_COUNTRIES + country_id
+
+
+def _packed_budget(country_data_id: int, num_items: int):
+    """A budget with the first descriptions as item names, and the country data ID as every value."""
+    values = np.full(
+        (num_items, len(datamodel.BUDGET_RESOURCES)), country_data_id, dtype=np.float32
+    )
+    return dict(
+        country_data_id=country_data_id,
+        description_ids=np.arange(1, num_items + 1, dtype=np.int32).tobytes(),
+        values=values.tobytes(),
+    )
@@ -0,0 +1,104 @@
+import pytest
+import sqlalchemy
+
+from stellarisdashboard import datamodel
+from stellarisdashboard.parsing import timeline
+
+DATE = 100 * 360
+WINDOW = timeline.HistoricalEventIndex.RECENT_EVENT_WINDOW_DAYS
+
+
+@pytest.fixture
+def session(isolated_game_id):
+    with datamodel.get_db_session(isolated_game_id, write=True) as session:
+        game = datamodel.Game(game_name=isolated_game_id)
+        session.add(datamodel.Country(game=game, country_id_in_game=0))
+        session.commit()
+        yield session
+
+
+def get_country(session) -> datamodel.Country:
+    return session.query(datamodel.Country).one()
+
+
+def add_event(session, event_type, end_date_days=None, **kwargs):
+    event = datamodel.HistoricalEvent(
+        event_type=event_type,
+        country=get_country(session),
+        start_date_days=DATE - 2 * WINDOW,
+        end_date_days=end_date_days,
+        **kwargs,
+    )
+    session.add(event)
+    return event
+
+
+def test_pending_event_is_found_after_implicit_flush(session):
+    event_index = timeline.HistoricalEventIndex(session, DATE)
+    # queried before the event is added, such that the query does not flush it
+    country = get_country(session)
+    event = add_event(session, datamodel.HistoricalEventType.ruled_empire)
+    assert event.historical_event_id is None
+
+    found = event_index.find(
+        datamodel.HistoricalEventType.ruled_empire, country=country
+    )
+    assert found is event
+    assert event.historical_event_id is not None
+    event_index.close()
+
+
+def test_new_criterion_model_forces_flush(session):
+    event_index = timeline.HistoricalEventIndex(session, DATE)
+    new_country = datamodel.Country(game=get_country(session).game)
+    # not a pending event, so only the criterion can make the index flush
+    session.add(new_country)
+    assert sqlalchemy.inspect(new_country).identity is None
+
+    found = event_index.find(
+        datamodel.HistoricalEventType.ruled_empire, country=new_country
+    )
+    assert found is None
+    assert sqlalchemy.inspect(new_country).identity is not None
+    event_index.close()
+
+
+def test_discard_expunged_after_savepoint_rollback(session):
+    event_index = timeline.HistoricalEventIndex(session, DATE)
+    kept = add_event(session, datamodel.HistoricalEventType.edict)
+    savepoint = session.begin_nested()
+    add_event(session, datamodel.HistoricalEventType.edict)
+    assert len(event_index.find_all(datamodel.HistoricalEventType.edict)) == 2
+
+    savepoint.rollback()
+    event_index.discard_expunged()
+    assert event_index.find_all(datamodel.HistoricalEventType.edict) == [kept]
+    event_index.close()
+
+
+def test_events_closed_before_the_recent_window_are_excluded(session):
+    open_event = add_event(session, datamodel.HistoricalEventType.councilor)
+    recent_event = add_event(
+        session, datamodel.HistoricalEventType.councilor, DATE - WINDOW
+    )
+    add_event(session, datamodel.HistoricalEventType.councilor, DATE - WINDOW - 1)
+    # faction leaders are re-used regardless of when their event ended
+    faction_leader_event = add_event(
+        session, datamodel.HistoricalEventType.faction_leader, DATE - 2 * WINDOW
+    )
+    session.commit()
+
+    event_index = timeline.HistoricalEventIndex(session, DATE)
+    found = event_index.find_all(
+        datamodel.HistoricalEventType.councilor, country=get_country(session)
+    )
+    assert sorted(e.historical_event_id for e in found) == sorted(
+        [open_event.historical_event_id, recent_event.historical_event_id]
+    )
+    assert (
+        event_index.find(
+            datamodel.HistoricalEventType.faction_leader, country=get_country(session)
+        )
+        is faction_leader_event
+    )
+    event_index.close()
@@ -0,0 +1,153 @@
+import contextlib
+import re
+
+import networkx as nx
+import pytest
+import sqlalchemy
+
+from stellarisdashboard import config, datamodel
+from stellarisdashboard.dashboard_app import history_ledger, visualization_data
+from stellarisdashboard.parsing import timeline
+
+from generated_game_db import NUM_GAMESTATES, NUM_SYSTEMS
+
+# the query plan of a full table scan, e.g. "SCAN historical_event"
+# or "SCAN historical_event USING INDEX ..."
+FULL_SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+# scanning an index is fine if the query stops after the first few rows,
+# e.g. for the most recent gamestate
+INDEX_SCAN_PATTERN = re.compile(r"^SCAN \w+ USING (COVERING )?INDEX")
+# tables with at most a few hundred rows, which SQLite may read completely
+# instead of looking up many keys
+SMALL_TABLES = {"game", "country"}
+
+
+@contextlib.contextmanager
+def capture_statements():
+    """Collect the SELECT, UPDATE and DELETE statements executed by any engine."""
+    statements = []
+
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        if not executemany and statement.lstrip().upper().startswith(
+            ("SELECT", "UPDATE", "DELETE")
+        ):
+            statements.append((statement, parameters))
+
+    sqlalchemy.event.listen(
+        sqlalchemy.engine.Engine, "before_cursor_execute", before_cursor_execute
+    )
+    try:
+        yield statements
+    finally:
+        sqlalchemy.event.remove(
+            sqlalchemy.engine.Engine, "before_cursor_execute", before_cursor_execute
+        )
+
+
+def assert_indexed_query_plans(game_id, statements, allowed_scans=()):
+    """
+    Check the query plan of each statement for full table scans and temporary
+    B-trees for sorting.
+
+    :param allowed_scans: Tables that the statements intentionally read completely
+    """
+    assert statements
+    with datamodel.get_db_session(game_id) as session:
+        cursor = session.connection().connection.driver_connection.cursor()
+        for statement, parameters in statements:
+            plan = [
+                row[-1]
+                for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            ]
+            for step in plan:
+                match = FULL_SCAN_PATTERN.match(step)
+                if match is not None and match.group(1) not in SMALL_TABLES | set(
+                    allowed_scans
+                ):
+                    assert INDEX_SCAN_PATTERN.match(step) and "LIMIT" in statement, (
+                        statement,
+                        plan,
+                    )
+                assert "TEMP B-TREE" not in step, (statement, plan)
+
+
+@pytest.mark.parametrize(
+    "filter_kwargs",
+    [
+        dict(country_filter=5),
+        dict(leader_filter=7),
+        dict(system_filter=11),
+        dict(planet_filter=13),
+        dict(war_filter=3),
+    ],
+)
+def test_history_ledger_event_queries(game_db, filter_kwargs, monkeypatch):
+    # only the queries are checked here, not the rendering of the events
+    collected_events = []
+    monkeypatch.setattr(
+        history_ledger.EventTemplateDictBuilder,
+        "collect_event_dicts",
+        lambda self, event_list, key: collected_events.extend(event_list),
+    )
+    event_filter = history_ledger.EventFilter(**filter_kwargs)
+    with capture_statements() as statements:
+        with datamodel.get_db_session(game_db) as session:
+            builder = history_ledger.EventTemplateDictBuilder(
+                session, game_db, event_filter
+            )
+            builder.get_event_and_link_dicts()
+    assert collected_events
+    assert_indexed_query_plans(game_db, statements)
+
+
+def test_galaxy_map_system_owners(game_db, monkeypatch):
+    monkeypatch.setattr(config.CONFIG, "show_everything", True)
+    galaxy_map_data = visualization_data.GalaxyMapData(game_db)
+    galaxy_map_data.galaxy_graph = nx.Graph()
+    with capture_statements() as statements:
+        systems_by_owner = galaxy_map_data._get_system_ids_by_owner(1500)
+    assert len(systems_by_owner) > 1
+    # the galaxy map shows all systems and needs their complete ownership history
+    assert_indexed_query_plans(
+        game_db, statements, allowed_scans={"system", "system_ownership"}
+    )
+
+
+def test_system_ownership_cache(game_db):
+    cache = timeline.SystemOwnershipCache()
+    with capture_statements() as statements:
+        with datamodel.get_db_session(game_db) as session:
+            cache.begin(session)
+    assert len(cache.open_ownership_ids()) == NUM_SYSTEMS // 2
+    assert_indexed_query_plans(game_db, statements, allowed_scans={"system"})
+
+
+def test_historical_event_index(game_db):
+    with capture_statements() as statements:
+        with datamodel.get_db_session(game_db) as session:
+            event_index = timeline.HistoricalEventIndex(session, 30 * NUM_GAMESTATES)
+            event_index.close()
+    assert_indexed_query_plans(game_db, statements)
+
+
+def test_plot_data_tables(game_db):
+    dates = [30 * g for g in range(NUM_GAMESTATES - 20, NUM_GAMESTATES + 1)]
+    tables = visualization_data.PlotDataTables(game_db, dates, country_perspective=None)
+    assert (tables.player_rows >= 0).all()
+    with capture_statements() as statements:
+        tables.player_budgets
+        tables.budgets
+        for model in [
+            datamodel.PopStatsBySpecies,
+            datamodel.PopStatsByFaction,
+            datamodel.PopStatsByJob,
+            datamodel.PopStatsByStratum,
+            datamodel.PopStatsByEthos,
+            datamodel.PlanetStats,
+        ]:
+            tables.get_pop_stats(model)
+        tables.galactic_market
+        tables.internal_market
+    assert_indexed_query_plans(game_db, statements)
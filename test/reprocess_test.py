@@ -0,0 +1,207 @@
+import pytest
+import sqlalchemy
+
+from stellarisdashboard import config, datamodel
+from stellarisdashboard.parsing import timeline
+
+from conftest import get_minimal_gamestate_dict
+
+SAVE_DATES = ["2200.01.01", "2200.07.01", "2201.01.01"]
+PROCESSOR_IDS = ["pop_stats", "internal_market"]
+# the ethic of the leader in each save, the ethic of the first save is not the description of any event
+LEADER_ETHICS = ["ethic_militarist", "ethic_spiritualist", "ethic_materialist"]
+
+REPROCESSED_TABLES = [
+    datamodel.PopStatsBySpecies,
+    datamodel.PopStatsByFaction,
+    datamodel.PopStatsByJob,
+    datamodel.PopStatsByStratum,
+    datamodel.PopStatsByEthos,
+    datamodel.PlanetStats,
+    datamodel.InternalMarketResource,
+]
+# tables written by the dependencies, which are re-run and rolled back
+UNCHANGED_TABLES = [
+    datamodel.HistoricalEvent,
+    datamodel.SystemOwnership,
+    datamodel.SharedDescription,
+    datamodel.Leader,
+    datamodel.CountryData,
+]
+
+
+@pytest.fixture(autouse=True)
+def debug_mode(monkeypatch):
+    monkeypatch.setattr(config.CONFIG, "debug_mode", True)
+
+
+def get_gamestate_dict(save_index: int, pop_ethic: str = "ethic_pacifist"):
+    """
+    A save of the player with one planet and one pop group. The leader changes their ethic
+    in every save, and the size of the pop group grows.
+    """
+    gamestate = get_minimal_gamestate_dict(SAVE_DATES[save_index])
+    gamestate["country"][0].update(
+        owned_planets=[1],
+        owned_leaders=[60],
+        fleets_manager={"owned_fleets": [{"fleet": 30}]},
+    )
+    gamestate.update(
+        {
+            "galactic_object": {
+                5: {
+                    "name": {"key": "Sol"},
+                    "coordinate": {"x": 1.0, "y": 2.0},
+                    "planet": [1],
+                    "starbases": [50],
+                }
+            },
+            "planets": {
+                "planet": {
+                    1: {
+                        "name": {"key": "Earth"},
+                        "owner": 0,
+                        "coordinate": {"origin": 5},
+                        "planet_class": "pc_continental",
+                        "stability": 50.0 + save_index,
+                    }
+                }
+            },
+            "species_db": {
+                0: {
+                    "name": {"key": "Humans"},
+                    "class": "HUM",
+                    "traits": {"trait": ["trait_adaptive"]},
+                }
+            },
+            "ships": {40: {"fleet": 30}},
+            "starbase_mgr": {"starbases": {50: {"station": 40}}},
+            "leaders": {
+                60: {
+                    "name": {"full_names": {"key": "Ruler"}},
+                    "class": "official",
+                    "country": 0,
+                    "species": 0,
+                    "level": 1,
+                    "ethic": LEADER_ETHICS[save_index],
+                    "date_added": "2199.01.01",
+                }
+            },
+            "pop_factions": {
+                70: {
+                    "type": "totalitarian",
+                    "country": 0,
+                    "name": {"key": "Faction"},
+                    "leader": 60,
+                    "support": 0.4,
+                    "faction_approval": 0.7,
+                }
+            },
+            "pop_groups": {
+                10: {
+                    "planet": 1,
+                    "size": 5 + save_index,
+                    "happiness": 0.5,
+                    "crime": 1.0,
+                    "power": 2.0,
+                    "key": {
+                        "species": 0,
+                        "category": "worker",
+                        "ethos": {"ethic": pop_ethic},
+                        "pop_faction": 70,
+                    },
+                }
+            },
+            "pop_jobs": {
+                20: {"type": "miner", "pop_groups": [{"pop_group": 10, "amount": 3}]}
+            },
+            "market": {
+                "internal_market_fluctuations": {
+                    "country": [0],
+                    "resources": [{"minerals": 1.5, "food": -2.0 - save_index}],
+                }
+            },
+        }
+    )
+    return gamestate
+
+
+def process_saves(game_id: str):
+    for save_index in range(len(SAVE_DATES)):
+        tle = timeline.TimelineExtractor()
+        tle.process_gamestate(game_id, get_gamestate_dict(save_index))
+        assert tle.number_of_parsed_saves == 1
+
+
+def get_rows(game_id: str, model):
+    """All rows of the table without their primary key, which changes when rows are inserted again."""
+    columns = [c for c in model.__table__.columns if not c.primary_key]
+    with datamodel.get_db_session(game_id) as session:
+        return sorted(
+            session.execute(sqlalchemy.select(*columns)).all(),
+            key=repr,
+        )
+
+
+def test_reprocess_keeps_rows(isolated_game_id):
+    process_saves(isolated_game_id)
+    rows_before = {
+        model: get_rows(isolated_game_id, model) for model in REPROCESSED_TABLES
+    }
+    unchanged_before = {
+        model: get_rows(isolated_game_id, model) for model in UNCHANGED_TABLES
+    }
+    assert all(rows_before.values())
+    assert all(
+        unchanged_before[model]
+        for model in [datamodel.HistoricalEvent, datamodel.SystemOwnership]
+    )
+
+    # the older saves are reprocessed after the newer ones, when the dependencies see a different state
+    for save_index in range(len(SAVE_DATES)):
+        tle = timeline.TimelineExtractor()
+        tle.reprocess_gamestate(
+            isolated_game_id, get_gamestate_dict(save_index), PROCESSOR_IDS
+        )
+
+    for model in REPROCESSED_TABLES:
+        assert get_rows(isolated_game_id, model) == rows_before[model], model
+    for model in UNCHANGED_TABLES:
+        assert get_rows(isolated_game_id, model) == unchanged_before[model], model
+
+
+def test_reprocess_adds_description_of_rolled_back_dependency(isolated_game_id):
+    process_saves(isolated_game_id)
+    # The leader changes back to the ethic of the first save, so the rolled back LeaderProcessor adds a
+    # description for it before the pop stats are extracted again with the same (new) text.
+    ethic = LEADER_ETHICS[0]
+    with datamodel.get_db_session(isolated_game_id) as session:
+        assert (
+            session.query(datamodel.SharedDescription).filter_by(text=ethic).count()
+            == 0
+        )
+
+    tle = timeline.TimelineExtractor()
+    tle.reprocess_gamestate(
+        isolated_game_id, get_gamestate_dict(0, pop_ethic=ethic), PROCESSOR_IDS
+    )
+
+    with datamodel.get_db_session(isolated_game_id) as session:
+        descriptions = (
+            session.query(datamodel.SharedDescription).filter_by(text=ethic).all()
+        )
+        assert len(descriptions) == 1
+        stats = (
+            session.query(datamodel.PopStatsByEthos)
+            .join(datamodel.CountryData)
+            .filter(datamodel.CountryData.date == 0)
+            .one()
+        )
+        assert stats.db_ethos_description == descriptions[0]
+        # no leader_changed_ethic event of the rolled back dependency was kept
+        assert (
+            session.query(datamodel.HistoricalEvent)
+            .filter_by(db_description=descriptions[0])
+            .count()
+            == 0
+        )
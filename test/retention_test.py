@@ -0,0 +1,82 @@
+import contextlib
+import sqlite3
+
+import pytest
+
+from stellarisdashboard import config, datamodel
+from stellarisdashboard.parsing import timeline
+
+from conftest import get_minimal_gamestate_dict
+
+# the value of PRAGMA auto_vacuum for incremental vacuum
+INCREMENTAL_VACUUM = 2
+
+# two saves per year for ten years
+SAVE_DATES = [f"{2200 + year}.{month:02}.01" for year in range(10) for month in [1, 7]]
+
+
+@pytest.fixture(autouse=True)
+def retention_settings(monkeypatch):
+    monkeypatch.setattr(config.CONFIG, "retention_full_resolution_years", 2)
+    monkeypatch.setattr(config.CONFIG, "retention_saves_per_year", 1)
+
+
+def parse_saves(game_id: str) -> int:
+    number_of_parsed_saves = 0
+    for date in SAVE_DATES:
+        tle = timeline.TimelineExtractor()
+        tle.process_gamestate(game_id, get_minimal_gamestate_dict(date))
+        number_of_parsed_saves += tle.number_of_parsed_saves
+    return number_of_parsed_saves
+
+
+def get_dates(game_id: str):
+    return datamodel.get_gamestate_dates_since(game_id, -1)
+
+
+def test_removed_gamestates_are_not_imported_again(isolated_game_id):
+    assert parse_saves(isolated_game_id) == len(SAVE_DATES)
+    assert len(get_dates(isolated_game_id)) == len(SAVE_DATES)
+
+    num_removed = datamodel.apply_retention_policy(isolated_game_id)
+    # one of the two saves of each year before the last two years is removed
+    assert num_removed == 7
+    dates_after_compaction = get_dates(isolated_game_id)
+    assert len(dates_after_compaction) == len(SAVE_DATES) - num_removed
+
+    assert parse_saves(isolated_game_id) == 0
+    assert get_dates(isolated_game_id) == dates_after_compaction
+    assert datamodel.apply_retention_policy(isolated_game_id) == 0
+
+
+def get_auto_vacuum(game_id: str) -> int:
+    # the pooled connections of the dashboard keep the value which they read when they were opened
+    with contextlib.closing(
+        sqlite3.connect(config.CONFIG.db_path / f"{game_id}.db")
+    ) as connection:
+        return connection.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+
+def test_new_databases_use_incremental_vacuum(isolated_game_id):
+    with datamodel.get_db_session(isolated_game_id, write=True):
+        pass
+    assert get_auto_vacuum(isolated_game_id) == INCREMENTAL_VACUUM
+
+
+def test_legacy_databases_are_only_vacuumed_by_maintain(isolated_game_id):
+    game_id = isolated_game_id
+    # a database of an older version, created without incremental auto-vacuum
+    with contextlib.closing(
+        sqlite3.connect(config.CONFIG.db_path / f"{game_id}.db")
+    ) as connection:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE legacy (legacy_id INTEGER PRIMARY KEY)")
+    assert parse_saves(game_id) == len(SAVE_DATES)
+    assert get_auto_vacuum(game_id) == 0
+
+    # the compaction in the background does not block the game's DB with a full VACUUM
+    assert datamodel.apply_retention_policy(game_id) > 0
+    assert get_auto_vacuum(game_id) == 0
+
+    datamodel.maintain_db(game_id, enable_vacuum=True)
+    assert get_auto_vacuum(game_id) == INCREMENTAL_VACUUM